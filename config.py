@@ -12,6 +12,7 @@ RESOURCES_DIR_PATH = os.path.join(BASE_DIR, 'resources')
 TOWNCENTRE_DATASET_PATH = os.path.join(DATASETS_PATH, 'TownCentre')
 GROUNDTRUTH_FILE_PATH = os.path.join(TOWNCENTRE_DATASET_PATH, 'TownCentre-groundtruth.top')
 PREDICTIONS_FILE_PATH = os.path.join(RESULTS_DIR_PATH, 'TownCentre-predictions.top')
+PREDICTIONS_ARRAY_FILE_PATH = os.path.join(RESULTS_DIR_PATH, 'TownCentre-predictions.npz')
 CAMERA_PARAMETERS_FILE_PATH = os.path.join(TOWNCENTRE_DATASET_PATH, 'TownCentre-calibration.ci')
 VIDEO_PATH = os.path.join(TOWNCENTRE_DATASET_PATH, 'TownCentreXVID.mp4')
 
@@ -24,4 +25,14 @@ YOLO_V8_X_PATH = os.path.join(YOLO_DIR_PATH, 'yolov8x.pt')
 DISTANCE_THRESHOLD = 2
 LAST_FRAMES = 8
 VIOLATION_PERCENTAGE = 0.8 # 4/5 frames to consider as violation
+VIOLATION_WINDOW_SECONDS = LAST_FRAMES / 25  # The window of LAST_FRAMES frames of the 25 FPS TownCentre video, in seconds
 SOCIAL_DISTANCE_METRICS_RESULTS_PATH = os.path.join(RESULTS_DIR_PATH, 'social_distance_metrics.csv')
+
+# Multi-camera processing
+MULTI_CAMERA_REPORT_PATH = os.path.join(RESULTS_DIR_PATH, 'multi_camera_report.json')
+
+# Benchmarks
+BENCHMARK_REPORT_PATH = os.path.join(RESULTS_DIR_PATH, 'benchmark_report.json')
+
+# Instrumentation
+INSTRUMENTATION_TRACE_PATH = os.path.join(RESULTS_DIR_PATH, 'instrumentation_trace.csv')
@@ -0,0 +1,80 @@
+import time
+
+import supervision as sv
+
+from src.service.byte_track_yolo_tracker import ByteTrackYOLOTracker
+from src.service.mot_metrics_service import MotMetricsService
+from src.service.towncentre_video_service import TowncentreVideoService
+from src.utils.detection_utils import DetectionUtils
+from src.utils.instrumentation import Instrumentation
+
+# The tracker parameters of the compared modes: the detector on every frame, fixed strides and an adaptive stride
+DEFAULT_CONFIGURATIONS = (
+    {'detection_stride': 1},
+    {'detection_stride': 2},
+    {'detection_stride': 3},
+    {'detection_stride': 5},
+    {'detection_stride': 5, 'max_motion': 0.1, 'max_uncertainty': 0.1},
+)
+
+
+def measure_configuration(video_path, groundtruth_dict, frames_count, tracker_params) -> dict:
+    """
+    Tracks the first frames_count frames of the video with the tracker created with tracker_params. Only the
+    update_tracker calls are timed, not the decoding. The predictions are evaluated against the groundtruth
+    of the same frames
+    """
+    instrumentation = Instrumentation(enabled=True, window_size=frames_count)
+    tracker = ByteTrackYOLOTracker(instrumentation=instrumentation, **tracker_params)
+
+    pred_detections_dict = {}
+    seconds = 0.0
+    frames_generator = sv.get_video_frames_generator(video_path, end=frames_count)
+    for frame_index, frame in enumerate(frames_generator):
+        start = time.perf_counter()
+        sv_detections = tracker.update_tracker(frame, frame_index)
+        seconds += time.perf_counter() - start
+        pred_detections_dict[frame_index] = DetectionUtils.convert_detections_from_sv_to_row(sv_detections)
+        instrumentation.end_frame(frame_index)
+
+    counters = instrumentation.get_summary()['counters']
+    predicted_frames = counters['predicted_frames']['total'] if 'predicted_frames' in counters else 0
+    frames_groundtruth_dict = {
+        frame_index: detections for frame_index, detections in groundtruth_dict.items()
+        if frame_index in pred_detections_dict
+    }
+    return {
+        'tracker_params': tracker_params,
+        'frames': len(pred_detections_dict),
+        'detected_frames': len(pred_detections_dict) - predicted_frames,
+        'fps': len(pred_detections_dict) / seconds if seconds > 0 else 0.0,
+        **MotMetricsService(pred_detections_dict, frames_groundtruth_dict).calculate_metrics(),
+    }
+
+
+def benchmark(frames_count=500, configurations=DEFAULT_CONFIGURATIONS) -> list:
+    """
+    Compares the throughput and the MOT metrics of the tracker on the TownCentre video when the detector runs on every
+    frame and when it runs only on some frames (detection_stride, max_motion and max_uncertainty of the tracker).
+    The speedup is relative to the first configuration
+    """
+    dataset_service = TowncentreVideoService()
+    groundtruth_dict = dataset_service.get_groundtruth_dict()
+
+    results = [
+        measure_configuration(dataset_service.get_video_path(), groundtruth_dict, frames_count, tracker_params)
+        for tracker_params in configurations
+    ]
+
+    print(f'{"configuration":<58} {"detected":>9} {"fps":>7} {"speedup":>8} {"MOTA":>7} {"MOTP":>7} '
+          f'{"IDF1":>7} {"switches":>9}')
+    for result in results:
+        configuration = ', '.join(f'{name}={value}' for name, value in result['tracker_params'].items())
+        print(f'{configuration:<58} {result["detected_frames"] / result["frames"]:>9.0%} {result["fps"]:>7.1f} '
+              f'{result["fps"] / results[0]["fps"]:>7.2f}x {result["mota"]:>7.3f} {result["motp"]:>7.3f} '
+              f'{result["idf1"]:>7.3f} {result["num_switches"]:>9}')
+    return results
+
+
+if __name__ == '__main__':
+    benchmark()
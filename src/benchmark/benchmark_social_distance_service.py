@@ -0,0 +1,44 @@
+import time
+
+from config import DISTANCE_THRESHOLD, LAST_FRAMES, VIOLATION_PERCENTAGE
+from src.benchmark.crowd_generator import generate_crowd_frames
+from src.service.social_distance_service import SocialDistanceService
+
+
+def measure_service(distance_service, frames) -> (float, list):
+    violation_pairs = []
+    start = time.perf_counter()
+    for frame_index, people_coordinates in enumerate(frames):
+        all_curr_violation_pairs, _ = distance_service.update_violation_pairs(frame_index, people_coordinates)
+        violation_pairs.append(all_curr_violation_pairs)
+    seconds_per_frame = (time.perf_counter() - start) / len(frames)
+    return seconds_per_frame, violation_pairs
+
+
+def benchmark(people_counts=(10, 25, 50, 100, 200, 400, 800), frames_count=20, max_dense_people_count=200):
+    """
+    Compares the dense and the sparse modes of the SocialDistanceService for growing crowds.
+    The dense mode is skipped for crowds bigger than max_dense_people_count because it scales quadratically
+    """
+    print(f'{"people":>8} {"dense, ms/frame":>16} {"sparse, ms/frame":>17} {"speedup":>8}')
+    for people_count in people_counts:
+        frames = generate_crowd_frames(people_count, frames_count)
+
+        sparse_service = SocialDistanceService(DISTANCE_THRESHOLD, LAST_FRAMES, VIOLATION_PERCENTAGE, sparse=True)
+        sparse_time, sparse_violation_pairs = measure_service(sparse_service, frames)
+
+        if people_count > max_dense_people_count:
+            print(f'{people_count:>8} {"-":>16} {sparse_time * 1000:>17.2f} {"-":>8}')
+            continue
+
+        dense_service = SocialDistanceService(DISTANCE_THRESHOLD, LAST_FRAMES, VIOLATION_PERCENTAGE)
+        dense_time, dense_violation_pairs = measure_service(dense_service, frames)
+        if dense_violation_pairs != sparse_violation_pairs:
+            raise AssertionError(f'Dense and sparse violation pairs differ for {people_count} people')
+
+        print(f'{people_count:>8} {dense_time * 1000:>16.2f} {sparse_time * 1000:>17.2f} '
+              f'{dense_time / sparse_time:>7.1f}x')
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,221 @@
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from config import BENCHMARK_REPORT_PATH, DISTANCE_THRESHOLD, LAST_FRAMES, VIOLATION_PERCENTAGE
+from src.benchmark.crowd_generator import CAMERA_PARAMETERS, generate_crowd_positions, generate_crowd_detections_dict
+from src.service.coordinates_converter import CoordinatesConverter
+from src.service.mot_metrics_service import MotMetricsService
+from src.service.social_distance_service import SocialDistanceService, PeopleCoordinates
+from src.utils.detection_utils import DetectionUtils
+from src.utils.detections_store import DetectionsStore
+
+
+def measure(create_function, inputs, items_count=None) -> dict:
+    """
+    Calls the function created by create_function for every input and measures the latency of every call.
+    Then the calls are repeated with a new function under tracemalloc to measure the peak memory, separately so that
+    tracing does not slow down the timed calls. items_count is the number of processed items (frames, detections) of
+    all calls, it defaults to the number of calls
+    """
+    function = create_function()
+    latencies = np.empty(len(inputs))
+    for i, item in enumerate(inputs):
+        start = time.perf_counter()
+        function(item)
+        latencies[i] = time.perf_counter() - start
+
+    function = create_function()
+    tracemalloc.start()
+    try:
+        for item in inputs:
+            function(item)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total_seconds = float(latencies.sum())
+    items_count = len(inputs) if items_count is None else items_count
+    return {
+        'calls': len(inputs),
+        'items': items_count,
+        'total_seconds': total_seconds,
+        'calls_per_second': len(inputs) / total_seconds if total_seconds > 0 else None,
+        'items_per_second': items_count / total_seconds if total_seconds > 0 else None,
+        'latency_ms': {
+            'mean': float(latencies.mean() * 1000),
+            'p50': float(np.percentile(latencies, 50) * 1000),
+            'p90': float(np.percentile(latencies, 90) * 1000),
+            'p99': float(np.percentile(latencies, 99) * 1000),
+            'max': float(latencies.max() * 1000),
+        },
+        'peak_memory_bytes': peak_memory,
+    }
+
+
+def run_benchmarks(people_count=50, frames_count=200, density=0.1, step=0.3, motion='random', visibility=0.9,
+                   repeat=5, seed=0) -> dict:
+    """
+    Runs the benchmarks of the pipeline components on a synthetic crowd and returns the report.
+    The per-frame components are called once per frame, the components which process the whole video (file IO and
+    MOT metrics) are called repeat times
+    """
+    coordinates_converter = CoordinatesConverter(CAMERA_PARAMETERS)
+    side = np.sqrt(people_count / density)
+    # The crowd is centered at the origin of the scene, in the field of view of the camera
+    positions = generate_crowd_positions(people_count, frames_count, density, step, motion, seed) - side / 2
+
+    true_detections_dict = generate_crowd_detections_dict(coordinates_converter, positions, seed=seed)
+    pred_positions = positions + np.random.default_rng(seed + 1).normal(0, 0.1, size=positions.shape)
+    pred_detections_dict = generate_crowd_detections_dict(
+        coordinates_converter, pred_positions, visibility=visibility, seed=seed + 1
+    )
+
+    frame_indices = sorted(pred_detections_dict.keys())
+    detections_count = sum(len(detections) for detections in pred_detections_dict.values())
+    row_detections = [pred_detections_dict[frame_index] for frame_index in frame_indices]
+    array_detections = [np.array(detections, dtype=np.float64).reshape(-1, 9) for detections in row_detections]
+    sv_detections = [DetectionUtils.convert_detections_from_array_to_sv(detections) for detections in array_detections]
+    image_points = [detections[:, 5:7] for detections in array_detections]
+    scene_points = [np.column_stack((points, np.zeros(len(points)))) for points in positions]
+    people_coordinates = [
+        PeopleCoordinates(detections[:, 0], coordinates_converter.convert_coordinates_to_scene_batch(points))
+        for detections, points in zip(array_detections, image_points)
+    ]
+    violator_sets = [set(detections[::2, 0].tolist()) for detections in array_detections]
+
+    def create_distance_service_function(sparse):
+        distance_service = SocialDistanceService(DISTANCE_THRESHOLD, LAST_FRAMES, VIOLATION_PERCENTAGE, sparse=sparse)
+        return lambda item: distance_service.update_violation_pairs(*item)
+
+    temp_dir = tempfile.TemporaryDirectory()
+    csv_file_path = os.path.join(temp_dir.name, 'predictions.csv')
+    npz_file_path = os.path.join(temp_dir.name, 'predictions.npz')
+    DetectionUtils.write_predictions_dict(pred_detections_dict, csv_file_path)
+    DetectionsStore.from_dict(pred_detections_dict).save(npz_file_path)
+    single_calls = [None] * repeat
+
+    benchmarks = {}
+    try:
+        benchmarks['coordinates_converter.convert_coordinates_to_scene_batch'] = measure(
+            lambda: coordinates_converter.convert_coordinates_to_scene_batch, image_points, detections_count
+        )
+        benchmarks['coordinates_converter.convert_coordinates_to_image_batch'] = measure(
+            lambda: coordinates_converter.convert_coordinates_to_image_batch,
+            scene_points,
+            people_count * frames_count
+        )
+        benchmarks['social_distance_service.update_violation_pairs'] = measure(
+            lambda: create_distance_service_function(sparse=False), list(enumerate(people_coordinates))
+        )
+        benchmarks['social_distance_service.update_violation_pairs.sparse'] = measure(
+            lambda: create_distance_service_function(sparse=True), list(enumerate(people_coordinates))
+        )
+        benchmarks['detection_utils.convert_detections_from_row_to_sv'] = measure(
+            lambda: DetectionUtils.convert_detections_from_row_to_sv, row_detections, detections_count
+        )
+        benchmarks['detection_utils.convert_detections_from_sv_to_row'] = measure(
+            lambda: DetectionUtils.convert_detections_from_sv_to_row, sv_detections, detections_count
+        )
+        benchmarks['detection_utils.convert_detections_from_array_to_sv'] = measure(
+            lambda: DetectionUtils.convert_detections_from_array_to_sv, array_detections, detections_count
+        )
+        benchmarks['detection_utils.filter_detections_by_tracker_ids'] = measure(
+            lambda: lambda item: DetectionUtils.filter_detections_by_tracker_ids(*item),
+            list(zip(sv_detections, violator_sets)),
+            detections_count
+        )
+        benchmarks['detection_utils.write_predictions_dict'] = measure(
+            lambda: lambda _: DetectionUtils.write_predictions_dict(pred_detections_dict, csv_file_path),
+            single_calls,
+            detections_count * repeat
+        )
+        benchmarks['detection_utils.read_predictions_dict'] = measure(
+            lambda: lambda _: DetectionUtils.read_predictions_dict(csv_file_path),
+            single_calls,
+            detections_count * repeat
+        )
+        benchmarks['detections_store.load'] = measure(
+            lambda: lambda _: DetectionsStore.load(npz_file_path),
+            single_calls,
+            detections_count * repeat
+        )
+        benchmarks['mot_metrics_service.calculate_metrics'] = measure(
+            lambda: lambda _: MotMetricsService(pred_detections_dict, true_detections_dict).calculate_metrics(),
+            single_calls,
+            frames_count * repeat
+        )
+    finally:
+        temp_dir.cleanup()
+
+    return {
+        'config': {
+            'people_count': people_count,
+            'frames_count': frames_count,
+            'density': density,
+            'step': step,
+            'motion': motion,
+            'visibility': visibility,
+            'repeat': repeat,
+            'seed': seed,
+            'detections_count': detections_count,
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+        },
+        'benchmarks': benchmarks,
+    }
+
+
+def find_regressions(baseline_report: dict, report: dict, tolerance=0.2) -> dict:
+    """
+    Compares the median latencies of the benchmarks of the report with the baseline report of the same configuration.
+    Returns benchmark name -> ratio of the latencies for the benchmarks more than tolerance slower than the baseline
+    """
+    regressions = {}
+    for name, result in report['benchmarks'].items():
+        baseline_result = baseline_report['benchmarks'].get(name)
+        if baseline_result is None or baseline_result['latency_ms']['p50'] <= 0:
+            continue
+        ratio = result['latency_ms']['p50'] / baseline_result['latency_ms']['p50']
+        if ratio > 1 + tolerance:
+            regressions[name] = ratio
+    return regressions
+
+
+def benchmark(report_path=BENCHMARK_REPORT_PATH, baseline_report_path=None, tolerance=0.2, **parameters):
+    """
+    Runs the benchmark suite, stores the JSON report in the file and prints the summary.
+    If the report of a previous run is given, the benchmarks slower than it by more than tolerance are printed
+    """
+    report = run_benchmarks(**parameters)
+
+    os.makedirs(os.path.dirname(report_path), exist_ok=True)
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f'{"benchmark":<58} {"items/s":>12} {"p50, ms":>9} {"p99, ms":>9} {"peak, KiB":>10}')
+    for name, result in report['benchmarks'].items():
+        print(f'{name:<58} {result["items_per_second"]:>12.0f} {result["latency_ms"]["p50"]:>9.3f} '
+              f'{result["latency_ms"]["p99"]:>9.3f} {result["peak_memory_bytes"] / 1024:>10.1f}')
+
+    if baseline_report_path is not None:
+        with open(baseline_report_path, 'r') as f:
+            baseline_report = json.load(f)
+        if baseline_report['config'] != report['config']:
+            print('The baseline report has another configuration, the latencies are not comparable')
+        for name, ratio in find_regressions(baseline_report, report, tolerance).items():
+            print(f'Regression: {name} is {ratio:.2f}x slower than the baseline')
+    return report
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,91 @@
+import numpy as np
+
+from src.service.coordinates_converter import CoordinatesConverter
+from src.service.social_distance_service import PeopleCoordinates
+
+MOTIONS = ('random', 'directed', 'static')
+
+# The calibration of the TownCentre camera, so that the benchmarks and the tests do not need the dataset
+CAMERA_PARAMETERS = {
+    'FocalLengthX': 2696.35888671875,
+    'FocalLengthY': 2696.35888671875,
+    'PrincipalPointX': 959.5,
+    'PrincipalPointY': 539.5,
+    'Skew': 0,
+    'TranslationX': -0.05988363921642303467,
+    'TranslationY': 3.83331298828125,
+    'TranslationZ': 12.39112186431884765625,
+    'RotationX': 0.69724917918208628720,
+    'RotationY': -0.43029624469563848566,
+    'RotationZ': 0.28876888503799524877,
+    'RotationW': 0.49527896681027261394,
+}
+
+
+def generate_crowd_positions(people_count, frames_count, density=0.1, step=0.3, motion='random', seed=0) -> np.ndarray:
+    """
+    Generates the scene coordinates of a crowd on a square ground plane, an array of shape (frames, people, 2).
+    The side of the square is chosen so that the crowd density (people per m²) does not depend on people count.
+
+    The motion is 'random' (every person makes a random step of about step meters every frame), 'directed' (every
+    person walks with the speed step in its own direction and turns back at the borders) or 'static'
+    """
+    if motion not in MOTIONS:
+        raise ValueError(f'Unknown motion: {motion}. Expected one of {MOTIONS}')
+
+    rng = np.random.default_rng(seed)
+    side = np.sqrt(people_count / density)
+    sb_xy = rng.uniform(0, side, size=(people_count, 2))
+    if motion == 'directed':
+        angles = rng.uniform(0, 2 * np.pi, size=people_count)
+        velocities = step * np.column_stack((np.cos(angles), np.sin(angles)))
+
+    positions = np.empty((frames_count, people_count, 2))
+    for frame_index in range(frames_count):
+        if motion == 'random':
+            sb_xy = np.clip(sb_xy + rng.normal(0, step, size=sb_xy.shape), 0, side)
+        elif motion == 'directed':
+            sb_xy = sb_xy + velocities + rng.normal(0, step / 10, size=sb_xy.shape)
+            outside = (sb_xy < 0) | (sb_xy > side)
+            velocities[outside] *= -1
+            sb_xy = np.clip(sb_xy, 0, side)
+        positions[frame_index] = sb_xy
+    return positions
+
+
+def generate_crowd_frames(people_count, frames_count, density=0.1, step=0.3, motion='random', seed=0) -> list:
+    """
+    Generates the PeopleCoordinates of a crowd for every frame, see generate_crowd_positions
+    """
+    object_ids = np.arange(people_count)
+    positions = generate_crowd_positions(people_count, frames_count, density, step, motion, seed)
+    return [PeopleCoordinates(object_ids, sb_xy) for sb_xy in positions]
+
+
+def generate_crowd_detections_dict(coordinates_converter: CoordinatesConverter, positions: np.ndarray,
+                                   box_size=(40, 120), visibility=1.0, seed=0) -> dict:
+    """
+    Projects the crowd positions to the image and generates the predictions dictionary of the crowd: frame index ->
+    detection rows (tracker_id, x1, y1, x2, y2, bdcx, bdcy, class_id, confidence) with the bottom centers at the
+    projected positions. Every detection is kept with the probability visibility
+    """
+    rng = np.random.default_rng(seed)
+    width, height = box_size
+    frames_count, people_count, _ = positions.shape
+    object_ids = np.arange(1, people_count + 1)
+
+    detections_dict = {}
+    for frame_index in range(frames_count):
+        image_points = coordinates_converter.convert_coordinates_to_image_batch(
+            np.column_stack((positions[frame_index], np.zeros(people_count)))
+        )
+        visible = rng.random(people_count) < visibility
+        bdcx, bdcy = image_points[visible, 0], image_points[visible, 1]
+        detections = np.column_stack((
+            object_ids[visible], bdcx - width / 2, bdcy - height, bdcx + width / 2, bdcy, bdcx, bdcy,
+            np.zeros(len(bdcx)), rng.uniform(0.5, 1, size=len(bdcx))
+        ))
+        detections_dict[frame_index] = [
+            (int(row[0]), *row[1:7], int(row[7]), row[8]) for row in detections.tolist()
+        ]
+    return detections_dict
@@ -20,12 +20,8 @@ def demo():
     y = np.linspace(-grid_size / 2, grid_size / 2, num_points)
     grid_x, grid_y = np.meshgrid(x, y)
 
-    image_points = np.zeros((num_points * num_points, 2))
-    for i in range(num_points):
-        for j in range(num_points):
-            scene_point = np.array([grid_x[i, j], grid_y[i, j], 0])
-            image_point = coordinates_converter.convert_coordinates_to_image(scene_point)
-            image_points[i * num_points + j, :] = image_point
+    scene_points = np.column_stack((grid_x.flatten(), grid_y.flatten(), np.zeros(num_points * num_points)))
+    image_points = coordinates_converter.convert_coordinates_to_image_batch(scene_points)
 
     # Draws the grid on the image
     for i in range(num_points):
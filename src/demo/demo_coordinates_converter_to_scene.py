@@ -20,7 +20,7 @@ def demo():
     image_points = np.column_stack((X.flatten(), Y.flatten()))
 
     # Convert image points to scene points
-    scene_points = [coordinates_converter.convert_coordinates_to_scene(point) for point in image_points]
+    scene_points = coordinates_converter.convert_coordinates_to_scene_batch(image_points)
 
     # Create 3D plot
     fig = plt.figure()
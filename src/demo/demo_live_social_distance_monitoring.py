@@ -0,0 +1,86 @@
+import os
+from contextlib import ExitStack
+
+import cv2
+import supervision as sv
+from supervision import Color
+
+from config import DISTANCE_THRESHOLD, VIOLATION_PERCENTAGE, VIOLATION_WINDOW_SECONDS, RESULTS_DIR_PATH
+from src.service.byte_track_yolo_tracker import ByteTrackYOLOTracker
+from src.service.coordinates_converter import CoordinatesConverter
+from src.service.live_frame_source import LiveFrameSource
+from src.service.live_monitoring_service import LiveMonitoringService
+from src.service.social_distance_service import SocialDistanceService
+from src.service.towncentre_video_service import TowncentreVideoService
+from src.utils.detection_utils import DetectionUtils
+from src.utils.instrumentation import Instrumentation
+from src.utils.metrics_exporter import MetricsExporter
+
+
+def demo(source=None, camera_parameters=None, result_video_path=None, realtime=True, frames_limit=None,
+         metrics_port=None):
+    """
+    Monitors the social distance on a live source: a video file played at its FPS (the TownCentre video by default),
+    an RTSP URL or a webcam index. The newest frame is always processed and the frames captured meanwhile are dropped.
+    The camera parameters default to the TownCentre calibration.
+    With result_video_path the processed frames are annotated and written to the video in the results directory.
+    With metrics_port the live metrics are served at http://127.0.0.1:<metrics_port>/metrics during the run.
+    The end-to-end latency and the drop rate are printed at the end
+    """
+    dataset_service = TowncentreVideoService()
+    if source is None:
+        source = dataset_service.get_video_path()
+    if camera_parameters is None:
+        camera_parameters = dataset_service.get_camera_parameters()
+
+    instrumentation = Instrumentation(enabled=metrics_port is not None)
+    metrics_exporter = None
+    if metrics_port is not None:
+        metrics_exporter = MetricsExporter(metrics_port)
+        instrumentation.add_listener(metrics_exporter.observe_frame)
+
+    monitoring_service = LiveMonitoringService(
+        ByteTrackYOLOTracker(instrumentation=instrumentation),
+        CoordinatesConverter(camera_parameters),
+        SocialDistanceService(DISTANCE_THRESHOLD, violation_percentage=VIOLATION_PERCENTAGE,
+                              instrumentation=instrumentation, window_seconds=VIOLATION_WINDOW_SECONDS),
+        instrumentation
+    )
+
+    box_annotator = sv.BoxAnnotator(thickness=2, text_thickness=1, text_scale=0.5, color=Color(r=0, g=50, b=255))
+    violation_annotator = sv.BoxAnnotator(thickness=4, text_thickness=1, text_scale=0.5, color=Color(r=255, g=0, b=0))
+    sink = None
+
+    def callback(live_frame, sv_detections, all_violation_pairs, new_violation_pairs):
+        violator_set = {tracker_id for pair in all_violation_pairs for tracker_id in pair}
+        violating_detections = DetectionUtils.filter_detections_by_tracker_ids(sv_detections, violator_set)
+
+        annotated_frame = box_annotator.annotate(scene=live_frame.frame.copy(), detections=sv_detections)
+        annotated_frame = violation_annotator.annotate(scene=annotated_frame, detections=violating_detections)
+        cv2.putText(annotated_frame, f'{live_frame.timestamp:.2f} s', (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1,
+                    (255, 255, 255), 2)
+        sink.write_frame(annotated_frame)
+
+    if metrics_exporter is not None:
+        metrics_exporter.start()
+    try:
+        with LiveFrameSource(source, realtime) as frame_source, ExitStack() as stack:
+            if result_video_path is not None:
+                width, height = frame_source.resolution
+                video_info = sv.VideoInfo(width=width, height=height, fps=round(frame_source.fps))
+                sink = stack.enter_context(sv.VideoSink(os.path.join(RESULTS_DIR_PATH, result_video_path), video_info))
+            report = monitoring_service.run(
+                frame_source,
+                callback=callback if sink is not None else None,
+                frames_limit=frames_limit
+            )
+    finally:
+        if metrics_exporter is not None:
+            metrics_exporter.stop()
+
+    print(LiveMonitoringService.format_report(report))
+    return report
+
+
+if __name__ == '__main__':
+    demo()
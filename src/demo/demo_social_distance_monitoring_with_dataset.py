@@ -2,7 +2,8 @@ import os
 
 import numpy as np
 
-from config import DISTANCE_THRESHOLD, VIOLATION_PERCENTAGE, LAST_FRAMES, RESULTS_DIR_PATH, PREDICTIONS_FILE_PATH
+from config import DISTANCE_THRESHOLD, VIOLATION_PERCENTAGE, LAST_FRAMES, RESULTS_DIR_PATH, \
+    PREDICTIONS_ARRAY_FILE_PATH, INSTRUMENTATION_TRACE_PATH
 from src.service.coordinates_converter import CoordinatesConverter
 from src.service.social_distance_service import SocialDistanceService, PeopleCoordinates
 from src.service.towncentre_video_service import TowncentreVideoService
@@ -11,14 +12,28 @@ import supervision as sv
 import cv2
 
 from src.utils.detection_utils import DetectionUtils
+from src.utils.detections_store import DetectionsStore
+from src.utils.instrumentation import Instrumentation
+from src.utils.metrics_exporter import MetricsExporter
 
 
-def demo(result_video_path='demo_social_distance_monitoring_with_dataset.mp4'):
+def demo(result_video_path='demo_social_distance_monitoring_with_dataset.mp4', profile=False, metrics_port=None):
+    """
+    With profile=True the time of every stage and the people, pairs and violations counters of every frame are
+    stored in the trace file, and their summary is printed at the end.
+    With metrics_port the live metrics are served at http://127.0.0.1:<metrics_port>/metrics during the run
+    """
     dataset_service = TowncentreVideoService()
     # true_detections_dict = dataset_service.get_groundtruth_dict()
-    pred_detections_dict = DetectionUtils.read_predictions_dict(PREDICTIONS_FILE_PATH)
-
-    distance_service = SocialDistanceService(DISTANCE_THRESHOLD, LAST_FRAMES, VIOLATION_PERCENTAGE)
+    pred_detections_dict = DetectionsStore.load(PREDICTIONS_ARRAY_FILE_PATH, mmap=True)
+    instrumentation = Instrumentation(enabled=profile or metrics_port is not None)
+    metrics_exporter = None
+    if metrics_port is not None:
+        metrics_exporter = MetricsExporter(metrics_port)
+        instrumentation.add_listener(metrics_exporter.observe_frame)
+
+    distance_service = SocialDistanceService(DISTANCE_THRESHOLD, LAST_FRAMES, VIOLATION_PERCENTAGE,
+                                             instrumentation=instrumentation)
     coordinates_converter = CoordinatesConverter(dataset_service.get_camera_parameters())
 
     pred_people_annotator = sv.EllipseAnnotator(thickness=2, start_angle=-45, end_angle=235,
@@ -30,15 +45,16 @@ def demo(result_video_path='demo_social_distance_monitoring_with_dataset.mp4'):
     def callback(frame: np.ndarray, index: int) -> np.ndarray:
 
         pred_detections = pred_detections_dict[index]
-        pred_sv_detections = DetectionUtils.convert_detections_from_row_to_sv(pred_detections)
+        pred_sv_detections = pred_detections_dict.get_sv_detections(index)
 
         # true_detections = true_detections_dict[index]
         # true_sv_detections = DetectionUtils.convert_detections_from_row_to_sv(true_detections)
         
-        pred_people_coordinates = PeopleCoordinates(
-            object_ids=np.array([detection[0] for detection in pred_detections]),
-            sb_xy=np.array([coordinates_converter.convert_coordinates_to_scene(detection[5:7]) for detection in pred_detections])
-        )
+        with instrumentation.stage('projection'):
+            pred_people_coordinates = PeopleCoordinates(
+                object_ids=pred_detections[:, 0],
+                sb_xy=coordinates_converter.convert_coordinates_to_scene_batch(pred_detections[:, 5:7])
+            )
 
         distance_service.update_violation_pairs(index, pred_people_coordinates)
 
@@ -46,38 +62,54 @@ def demo(result_video_path='demo_social_distance_monitoring_with_dataset.mp4'):
         violator_set = distance_service.get_all_current_violators_set(index)
         violating_detections = DetectionUtils.filter_detections_by_tracker_ids(pred_sv_detections, violator_set)
 
-        annotated_frame = frame.copy()
-        annotated_frame = pred_people_annotator.annotate(scene=annotated_frame, detections=pred_sv_detections)
-        annotated_frame = pred_dot_annotator.annotate(scene=annotated_frame, detections=pred_sv_detections)
-        annotated_frame = pred_box_annotator.annotate(scene=annotated_frame, detections=violating_detections)
+        with instrumentation.stage('annotation'):
+            annotated_frame = frame.copy()
+            annotated_frame = pred_people_annotator.annotate(scene=annotated_frame, detections=pred_sv_detections)
+            annotated_frame = pred_dot_annotator.annotate(scene=annotated_frame, detections=pred_sv_detections)
+            annotated_frame = pred_box_annotator.annotate(scene=annotated_frame, detections=violating_detections)
 
-        for pair in violator_pairs:
-            p1 = [(int((detection[0] + detection[2]) / 2), int(detection[3]))
-                  for detection, tracker_id
-                  in zip(pred_sv_detections.xyxy, pred_sv_detections.tracker_id)
-                  if tracker_id == pair[0]
-                  ][0]
+            for pair in violator_pairs:
+                p1 = [(int((detection[0] + detection[2]) / 2), int(detection[3]))
+                      for detection, tracker_id
+                      in zip(pred_sv_detections.xyxy, pred_sv_detections.tracker_id)
+                      if tracker_id == pair[0]
+                      ][0]
 
-            p2 = [(int((detection[0] + detection[2]) / 2), int(detection[3]))
-                  for detection, tracker_id
-                  in zip(pred_sv_detections.xyxy, pred_sv_detections.tracker_id)
-                  if tracker_id == pair[1]
-                  ][0]
+                p2 = [(int((detection[0] + detection[2]) / 2), int(detection[3]))
+                      for detection, tracker_id
+                      in zip(pred_sv_detections.xyxy, pred_sv_detections.tracker_id)
+                      if tracker_id == pair[1]
+                      ][0]
 
-            cv2.line(annotated_frame, p1, p2, (150, 0, 255), 2)
+                cv2.line(annotated_frame, p1, p2, (150, 0, 255), 2)
 
-            center = ((p1[0] + p2[0]) // 2, (p1[1] + p2[1]) // 2)
-            dist = distance_service.get_distance_for_pair(index, pair)
-            cv2.putText(annotated_frame, f"{dist:.2f} m", tuple(center), cv2.FONT_HERSHEY_SIMPLEX, 1,
-                        (150, 100, 255), 2)
+                center = ((p1[0] + p2[0]) // 2, (p1[1] + p2[1]) // 2)
+                dist = distance_service.get_distance_for_pair(index, pair)
+                cv2.putText(annotated_frame, f"{dist:.2f} m", tuple(center), cv2.FONT_HERSHEY_SIMPLEX, 1,
+                            (150, 100, 255), 2)
 
         return annotated_frame
 
-    sv.process_video(
-        source_path=dataset_service.get_video_path(),
-        target_path=os.path.join(RESULTS_DIR_PATH, result_video_path),
-        callback=callback
-    )
+    # The loop of sv.process_video, with the decoding and the encoding of the frames timed
+    video_path = dataset_service.get_video_path()
+    video_info = sv.VideoInfo.from_video_path(video_path)
+    if metrics_exporter is not None:
+        metrics_exporter.start()
+    try:
+        with sv.VideoSink(os.path.join(RESULTS_DIR_PATH, result_video_path), video_info) as sink:
+            frames_generator = instrumentation.iterate('decode', sv.get_video_frames_generator(video_path))
+            for index, frame in enumerate(frames_generator):
+                annotated_frame = callback(frame, index)
+                with instrumentation.stage('encode'):
+                    sink.write_frame(annotated_frame)
+                instrumentation.end_frame(index)
+    finally:
+        if metrics_exporter is not None:
+            metrics_exporter.stop()
+
+    if profile:
+        instrumentation.export_trace(INSTRUMENTATION_TRACE_PATH)
+        print(Instrumentation.format_summary(instrumentation.get_summary()))
 
 
 if __name__ == '__main__':
@@ -4,15 +4,15 @@ import numpy as np
 from supervision import Color, Position
 import supervision as sv
 
-from config import RESULTS_DIR_PATH, PREDICTIONS_FILE_PATH
+from config import RESULTS_DIR_PATH, PREDICTIONS_ARRAY_FILE_PATH
 from src.service.towncentre_video_service import TowncentreVideoService
-from src.utils.detection_utils import DetectionUtils
+from src.utils.detections_store import DetectionsStore
 
 
 def demo(result_video_path='demo_tracker_with_dataset.mp4'):
     dataset_service = TowncentreVideoService()
-    true_detections_dict = dataset_service.get_groundtruth_dict()
-    pred_detections_dict = DetectionUtils.read_predictions_dict(PREDICTIONS_FILE_PATH)
+    true_detections_store = dataset_service.get_groundtruth_store()
+    pred_detections_dict = DetectionsStore.load(PREDICTIONS_ARRAY_FILE_PATH, mmap=True)
 
     # Creating annotations
     pred_box_annotator = sv.BoxAnnotator(thickness=4, text_thickness=2, text_scale=1,
@@ -28,8 +28,7 @@ def demo(result_video_path='demo_tracker_with_dataset.mp4'):
 
     # This function processes each frame
     def callback(frame: np.ndarray, index: int) -> np.ndarray:
-        pred_detections = pred_detections_dict[index]
-        sv_pred_detections = DetectionUtils.convert_detections_from_row_to_sv(pred_detections)
+        sv_pred_detections = pred_detections_dict.get_sv_detections(index)
         
         annotated_frame = frame.copy()
         annotated_frame = trace_annotator.annotate(
@@ -37,14 +36,9 @@ def demo(result_video_path='demo_tracker_with_dataset.mp4'):
             detections=sv_pred_detections
         )
 
-        if index in true_detections_dict:
-            true_detections = true_detections_dict[index]
-            true_box_labels = [
-                f"#{tracker_id} TRUE"
-                for tracker_id, x1, y1, x2, y2, _, _, _, _
-                in true_detections
-            ]
-            sv_true_detections = DetectionUtils.convert_detections_from_row_to_sv(true_detections)
+        if index in true_detections_store:
+            sv_true_detections = true_detections_store.get_sv_detections(index)
+            true_box_labels = [f"#{tracker_id} TRUE" for tracker_id in sv_true_detections.tracker_id]
             annotated_frame = true_box_annotator.annotate(scene=annotated_frame,
                                                           detections=sv_true_detections,
                                                           labels=true_box_labels)
@@ -0,0 +1,24 @@
+import json
+import sys
+
+from config import MULTI_CAMERA_REPORT_PATH
+from src.service.multi_camera_service import MultiCameraService
+
+
+def log(directory_path, workers=None, frames_limit=None):
+    """
+    This function processes all camera videos of the directory concurrently and stores the report with the violation
+    events and the processing speed of every camera in the file
+    """
+    camera_streams = MultiCameraService.load_camera_streams(directory_path)
+    report = MultiCameraService(workers=workers, frames_limit=frames_limit).process(camera_streams)
+
+    with open(MULTI_CAMERA_REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for name, camera in report['cameras'].items():
+        print(f'{name}: {camera["frames"]} frames, {camera["fps"]:.1f} FPS, {camera["violation_events"]} violation events')
+
+
+if __name__ == '__main__':
+    log(sys.argv[1])
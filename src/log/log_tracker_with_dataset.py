@@ -1,30 +1,147 @@
 import supervision as sv
 
-from config import PREDICTIONS_FILE_PATH
+from config import PREDICTIONS_FILE_PATH, PREDICTIONS_ARRAY_FILE_PATH, INSTRUMENTATION_TRACE_PATH
 from src.service.byte_track_yolo_tracker import ByteTrackYOLOTracker
+from src.service.pipeline_service import PipelineService
+from src.service.sharded_tracking_service import ShardedTrackingService
 from src.service.towncentre_video_service import TowncentreVideoService
 from src.utils.detection_utils import DetectionUtils
+from src.utils.detections_store import DetectionsStore
+from src.utils.instrumentation import Instrumentation
+from src.utils.metrics_exporter import MetricsExporter
+from src.utils.predictions_writer import PredictionsWriter
 
 
-def log(frames_limit=None):
+def log(frames_limit=None, batch_size=1, pipelined=False, queue_size=8, workers=1, chunk_size=100, resume=False,
+        profile=False, metrics_port=None):
     """
-    This function performs the tracking algorithm on the dataset and stores the result predicted detections in the file
+    This function performs the tracking algorithm on the dataset and stores the result predicted detections in the file.
+    The detections are appended to the file in chunks of chunk_size frames as the tracking proceeds.
+    With resume=True an interrupted run is continued from the last frame stored in the file.
+    With batch_size > 1 the detector runs on batch_size frames at once.
+    With pipelined=True decoding, detection, tracking and serialization run in separate threads connected with
+    queues of queue_size batches, and the statistics of the stages are printed at the end.
+    With workers > 1 the video is split into segments tracked in parallel processes, batch_size, pipelined, resume,
+    profile and metrics_port are not supported then.
+    With profile=True the time of the decode, detect, track and serialize stages of every frame is stored in the trace
+    file and summarized at the end. The frames of a batch share the detection time, it is recorded in the first one.
+    With metrics_port the live metrics are served at http://127.0.0.1:<metrics_port>/metrics during the run
     """
-    pred_detections_dict = dict()
     dataset_service = TowncentreVideoService()
     dataset_video_path = dataset_service.get_video_path()
 
-    tracker = ByteTrackYOLOTracker()
+    if workers > 1:
+        if resume:
+            raise ValueError('Resuming is not supported with workers > 1')
+        if batch_size != 1 or pipelined:
+            raise ValueError('Batching and pipelining are not supported with workers > 1')
+        if profile:
+            raise ValueError('Profiling is not supported with workers > 1')
+        if metrics_port is not None:
+            raise ValueError('The live metrics are not supported with workers > 1')
+        # The serial loop stops after the frame frames_limit + 1
+        end = None if frames_limit is None else frames_limit + 2
+        pred_detections_dict = ShardedTrackingService(workers).track_video(dataset_video_path, end)
+        write_predictions(pred_detections_dict)
+        return
 
-    frames_generator = sv.get_video_frames_generator(dataset_video_path)
-    for frame_index, frame in enumerate(frames_generator):
-        sv_detections = tracker.update_tracker(frame, frame_index)
-        pred_detections_dict[frame_index] = DetectionUtils.convert_detections_from_sv_to_row(sv_detections)
+    instrumentation = Instrumentation(enabled=profile or metrics_port is not None)
+    tracker = ByteTrackYOLOTracker(instrumentation=instrumentation)
+    metrics_exporter = None
+    if metrics_port is not None:
+        metrics_exporter = MetricsExporter(metrics_port)
+        instrumentation.add_listener(metrics_exporter.observe_frame)
+        metrics_exporter.start()
 
-        if frames_limit is not None and frame_index > frames_limit:
-            break
+    try:
+        with PredictionsWriter(PREDICTIONS_FILE_PATH, chunk_size, resume) as writer:
+            start = writer.start_frame_index
+            if frames_limit is None or start <= frames_limit + 1:
+                frames_generator = instrumentation.iterate(
+                    'decode', sv.get_video_frames_generator(dataset_video_path, start=start)
+                )
+                frame_batches = get_frame_batches(frames_generator, batch_size, frames_limit, start)
+                if pipelined:
+                    stats = run_pipeline(frame_batches, tracker, writer, queue_size, instrumentation)
+                    print(PipelineService.format_stats(stats))
+                else:
+                    for frame_indices, frames in frame_batches:
+                        sv_detections_batch = tracker.update_tracker_batch(frames, frame_indices)
+                        for frame_index, sv_detections in zip(frame_indices, sv_detections_batch):
+                            with instrumentation.stage('serialize'):
+                                detections = DetectionUtils.convert_detections_from_sv_to_row(sv_detections)
+                                writer.write(frame_index, detections)
+                            instrumentation.end_frame(frame_index)
+    finally:
+        if metrics_exporter is not None:
+            metrics_exporter.stop()
 
+    # The predictions file is converted chunk by chunk, the memory does not grow with the video length
+    DetectionsStore.convert_csv(PREDICTIONS_FILE_PATH, PREDICTIONS_ARRAY_FILE_PATH)
+
+    if profile:
+        instrumentation.export_trace(INSTRUMENTATION_TRACE_PATH)
+        print(Instrumentation.format_summary(instrumentation.get_summary()))
+
+
+def write_predictions(pred_detections_dict: dict):
+    """
+    Stores the predicted detections both in the CSV file and in the binary columnar file
+    """
     DetectionUtils.write_predictions_dict(pred_detections_dict, PREDICTIONS_FILE_PATH)
+    DetectionsStore.from_dict(pred_detections_dict).save(PREDICTIONS_ARRAY_FILE_PATH)
+
+
+def run_pipeline(frame_batches, tracker: ByteTrackYOLOTracker, writer: PredictionsWriter, queue_size=8,
+                 instrumentation: Instrumentation = None) -> dict:
+    """
+    Runs decode -> detect -> track -> serialize stages in parallel threads and returns the pipeline statistics.
+    The instrumentation frames end when they are serialized, the stages of other frames running in parallel are
+    recorded into them, so only the totals of the stages are exact
+    """
+    if instrumentation is None:
+        instrumentation = Instrumentation()
+
+    def detect(frame_batch):
+        frame_indices, frames = frame_batch
+        return frame_indices, tracker.detect_batch(frames)
+
+    def track(detections_batch):
+        frame_indices, sv_detections_batch = detections_batch
+        return frame_indices, [tracker.track(sv_detections) for sv_detections in sv_detections_batch]
+
+    def serialize(detections_batch):
+        for frame_index, sv_detections in zip(*detections_batch):
+            with instrumentation.stage('serialize'):
+                writer.write(frame_index, DetectionUtils.convert_detections_from_sv_to_row(sv_detections))
+            instrumentation.end_frame(frame_index)
+
+    return PipelineService(queue_size).run(
+        source=frame_batches,
+        stages=[('detect', detect), ('track', track), ('serialize', serialize)],
+        source_name='decode'
+    )
+
+
+def get_frame_batches(frames_generator, batch_size, frames_limit=None, start=0):
+    """
+    Groups the frames into lists of batch_size frames with their indices, the first frame has the index start.
+    Like the serial loop, stops after the first frame with index greater than frames_limit
+    """
+    frame_indices, frames = [], []
+    for frame_index, frame in enumerate(frames_generator, start):
+        frame_indices.append(frame_index)
+        frames.append(frame)
+
+        is_last_frame = frames_limit is not None and frame_index > frames_limit
+        if len(frames) == batch_size or is_last_frame:
+            yield frame_indices, frames
+            frame_indices, frames = [], []
+        if is_last_frame:
+            return
+
+    if frames:
+        yield frame_indices, frames
 
 
 if __name__ == '__main__':
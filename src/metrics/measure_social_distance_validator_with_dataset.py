@@ -1,12 +1,13 @@
 import numpy as np
 
-from config import PREDICTIONS_FILE_PATH, DISTANCE_THRESHOLD, LAST_FRAMES, VIOLATION_PERCENTAGE, \
+from config import PREDICTIONS_ARRAY_FILE_PATH, DISTANCE_THRESHOLD, LAST_FRAMES, VIOLATION_PERCENTAGE, \
     SOCIAL_DISTANCE_METRICS_RESULTS_PATH
 from src.service.coordinates_converter import CoordinatesConverter
 from src.service.mot_metrics_service import MotMetricsService
 from src.service.social_distance_service import PeopleCoordinates, SocialDistanceService
 from src.service.towncentre_video_service import TowncentreVideoService
-from src.utils.detection_utils import DetectionUtils
+from src.service.violation_sweep_service import ViolationSweepService
+from src.utils.detections_store import DetectionsStore
 import pandas as pd
 
 
@@ -14,7 +15,7 @@ def measure():
     dataset_service = TowncentreVideoService()
     coordinates_converter = CoordinatesConverter(dataset_service.get_camera_parameters())
     true_detections_dict = dataset_service.get_groundtruth_dict()
-    pred_detections_dict = DetectionUtils.read_predictions_dict(PREDICTIONS_FILE_PATH)
+    pred_detections_dict = DetectionsStore.load(PREDICTIONS_ARRAY_FILE_PATH).to_dict()
 
     distance_service_pred = SocialDistanceService(DISTANCE_THRESHOLD, LAST_FRAMES, VIOLATION_PERCENTAGE)
     distance_service_true = SocialDistanceService(DISTANCE_THRESHOLD, LAST_FRAMES, VIOLATION_PERCENTAGE)
@@ -33,33 +34,24 @@ def measure():
     print('MOTA, MOTP for violators only: ', mot_metrics_service.calculate_mot_metrics())
 
 
-def measure_matrix():
+def measure_matrix(workers=None):
+    """
+    Measures the validator for the grid of last_frames and violation_percentage values.
+    The detections are projected and their distances are calculated once for the whole grid,
+    the grid cells are evaluated in workers parallel processes
+    """
     dataset_service = TowncentreVideoService()
     coordinates_converter = CoordinatesConverter(dataset_service.get_camera_parameters())
-    true_detections_dict = dataset_service.get_groundtruth_dict()
-    pred_detections_dict = DetectionUtils.read_predictions_dict(PREDICTIONS_FILE_PATH)
-
-    results = []
-
-    for last_frames in range(1, 11):
-        for violation_percentage in np.arange(0.1, 1.1, 0.1):
-            distance_service_pred = SocialDistanceService(DISTANCE_THRESHOLD, last_frames, violation_percentage)
-            distance_service_true = SocialDistanceService(DISTANCE_THRESHOLD, last_frames, violation_percentage)
-
-            true_violators_dict = get_violating_detections_dict(
-                true_detections_dict, distance_service_true, coordinates_converter
-            )
-            pred_violators_dict = get_violating_detections_dict(
-                pred_detections_dict, distance_service_pred, coordinates_converter
-            )
-
-            mot_metrics_service = MotMetricsService(
-                groundtruth_dict=true_violators_dict,
-                predictions_dict=pred_violators_dict
-            )
-            mota, motp = mot_metrics_service.calculate_mot_metrics()
-
-            results.append([last_frames, violation_percentage, mota, motp])
+    true_detections_store = dataset_service.get_groundtruth_store()
+    pred_detections_store = DetectionsStore.load(PREDICTIONS_ARRAY_FILE_PATH)
+
+    sweep_service = ViolationSweepService(coordinates_converter, DISTANCE_THRESHOLD, workers=workers)
+    results = sweep_service.sweep(
+        true_detections_store,
+        pred_detections_store,
+        last_frames_values=range(1, 11),
+        violation_percentages=np.arange(0.1, 1.1, 0.1)
+    )
 
     df = pd.DataFrame(results, columns=['last_frames', 'violation_percentage', 'MOTA', 'MOTP'])
     df.to_csv(SOCIAL_DISTANCE_METRICS_RESULTS_PATH, index=False)
@@ -75,7 +67,9 @@ def get_violating_detections_dict(
         # Convert detections to PeopleCoordinates
         people_coordinates = PeopleCoordinates(
             object_ids=np.array([detection[0] for detection in detections]),
-            sb_xy=np.array([coordinates_converter.convert_coordinates_to_scene(detection[5:7]) for detection in detections])
+            sb_xy=coordinates_converter.convert_coordinates_to_scene_batch(
+                np.array([detection[5:7] for detection in detections])
+            )
         )
 
         # Update violation pairs for the frame
@@ -1,8 +1,11 @@
 import numpy as np
 import supervision as sv
+from supervision.tracker.byte_tracker.basetrack import TrackState
+from supervision.tracker.byte_tracker.core import STrack
 from ultralytics import YOLO
 
 from config import YOLO_V8_N_PATH
+from src.utils.instrumentation import Instrumentation
 
 DEFAULT_YOLO_MODEL_PATH = YOLO_V8_N_PATH
 DEFAULT_BYTETRACK_PARAMS = {
@@ -16,14 +19,27 @@ DEFAULT_BYTETRACK_PARAMS = {
 class ByteTrackYOLOTracker:
     """
     This class implements YOLO + ByteTrack MOT
+
+    With detection_stride > 1 the detector runs only on every detection_stride-th frame of update_tracker. On the
+    frames between, the Kalman filters of the tracks are predicted one frame ahead, as ByteTrack would do before
+    matching, and the predicted boxes of the tracked tracks are returned, so every frame still gets its detections.
+    The detector runs earlier if the predicted box of a track moved more than max_motion of its height since the last
+    detection (max_motion), or if the standard deviation of the predicted box center exceeds max_uncertainty of its
+    height (max_uncertainty). New people are found only on the detection frames
     """
     def __init__(
             self,
             yolo_model_path=DEFAULT_YOLO_MODEL_PATH,
-            bytetrack_params=None
+            bytetrack_params=None,
+            instrumentation: Instrumentation = None,
+            detection_stride: int = 1,
+            max_motion: float = None,
+            max_uncertainty: float = None
     ):
         if bytetrack_params is None:
             bytetrack_params = DEFAULT_BYTETRACK_PARAMS
+        if detection_stride < 1:
+            raise ValueError(f'The detection stride must be at least 1, got {detection_stride}')
 
         self.__detection_model = YOLO(yolo_model_path)
         self.__byte_tracker = sv.ByteTrack(
@@ -32,21 +48,147 @@ class ByteTrackYOLOTracker:
             match_thresh=bytetrack_params['match_thresh'],
             frame_rate=bytetrack_params['frame_rate'],
         )
+        self.__frame_rate = bytetrack_params['frame_rate']
+        self.__last_timestamp = None
         self.__selected_classes = [0]  # pedestrians only
+        self.__detection_stride = detection_stride
+        self.__max_motion = max_motion
+        self.__max_uncertainty = max_uncertainty
+        self.__frames_since_detection = None  # None until the first detection
+        self.__detected_centers = {}  # track_id -> box center at the last detection, used with max_motion
+        # Times the 'detect', 'predict' and 'track' stages and counts the 'detections', the 'tracks' and the
+        # 'predicted_frames', disabled by default
+        self.__instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+
+    # With the timestamp of the frame in seconds, the frames skipped since the previous update count towards the time
+    # after which the lost tracks are removed, as if the tracker was updated at frame_rate
+    # With detection_stride > 1 the detector runs only on some frames, see the class description
+    def update_tracker(self, frame, frame_index, timestamp: float = None) -> sv.Detections:
+        if self.__frames_since_detection is not None and \
+                self.__frames_since_detection + 1 < self.__detection_stride:
+            sv_detections = self.__predict(timestamp)
+            if sv_detections is not None:
+                return sv_detections
 
-    def update_tracker(self, frame, frame_index) -> sv.Detections:
         sv_detections = self.__detect(frame)
-        sv_detections = self.__byte_tracker.update_with_detections(sv_detections)
+        return self.track(sv_detections, timestamp)
+
+    # Detects pedestrians on all frames with a single model call, then updates the tracker frame by frame.
+    # Frames must be given in the video order. With detection_stride > 1 the frames are updated one by one,
+    # to detect only on the frames chosen by update_tracker
+    def update_tracker_batch(self, frames, frame_indices) -> [sv.Detections]:
+        if len(frames) != len(frame_indices):
+            raise ValueError(f'Got {len(frames)} frames and {len(frame_indices)} frame indices')
+        if self.__detection_stride > 1:
+            return [self.update_tracker(frame, frame_index) for frame, frame_index in zip(frames, frame_indices)]
+
+        sv_detections_batch = self.detect_batch(frames)
+        return [self.track(sv_detections) for sv_detections in sv_detections_batch]
+
+    # Detects pedestrians on the list of frames at once, without updating the tracker
+    def detect_batch(self, frames) -> [sv.Detections]:
+        if len(frames) == 0:
+            return []
+        with self.__instrumentation.stage('detect'):
+            ultralytics_detections_batch = self.__detection_model(list(frames), verbose=False)
+            return [self.__convert_detections(ultralytics_detections)
+                    for ultralytics_detections in ultralytics_detections_batch]
+
+    # Updates the tracker with the detections of the next frame, see update_tracker for the timestamp
+    def track(self, sv_detections: sv.Detections, timestamp: float = None) -> sv.Detections:
+        if timestamp is not None:
+            self.__skip_frames(timestamp)
+        with self.__instrumentation.stage('track'):
+            sv_detections = self.__byte_tracker.update_with_detections(sv_detections)
+            self.__frames_since_detection = 0
+            if self.__max_motion is not None:
+                self.__detected_centers = {
+                    track.track_id: track.mean[:2].copy() for track in self.__byte_tracker.tracked_tracks
+                }
+        self.__instrumentation.count('tracks', len(sv_detections))
         return sv_detections
 
     # ============= Private methods =============
 
+    # Advances the frame counter of ByteTrack by the frames missing between the previous timestamp and this one
+    def __skip_frames(self, timestamp: float):
+        if self.__last_timestamp is not None:
+            skipped_frames = round((timestamp - self.__last_timestamp) * self.__frame_rate) - 1
+            self.__byte_tracker.frame_id += max(skipped_frames, 0)
+        self.__last_timestamp = timestamp
+
+    # Predicts the tracks one frame ahead and returns their boxes, or None if the frame needs the detector
+    def __predict(self, timestamp: float = None):
+        with self.__instrumentation.stage('predict'):
+            tracks = self.__byte_tracker.tracked_tracks + self.__byte_tracker.lost_tracks
+            if tracks:
+                means, covariances = self.__predict_states(tracks)
+                if self.__needs_detection(tracks, means, covariances):
+                    return None
+                for track, mean, covariance in zip(tracks, means, covariances):
+                    track.mean, track.covariance = mean, covariance
+
+            if timestamp is not None:
+                self.__skip_frames(timestamp)
+            self.__byte_tracker.frame_id += 1
+            self.__frames_since_detection += 1
+            sv_detections = self.__get_track_detections()
+        self.__instrumentation.count('predicted_frames')
+        self.__instrumentation.count('tracks', len(sv_detections))
+        return sv_detections
+
+    # Predicts the Kalman states of the tracks without changing them, like STrack.multi_predict
+    @staticmethod
+    def __predict_states(tracks) -> ():
+        means = np.array([track.mean for track in tracks])
+        covariances = np.array([track.covariance for track in tracks])
+        means[np.array([track.state != TrackState.Tracked for track in tracks]), 7] = 0
+        return STrack.shared_kalman.multi_predict(means, covariances)
+
+    # Whether a predicted tracked box moved or became too uncertain relatively to its height, see the class description
+    def __needs_detection(self, tracks, means, covariances) -> bool:
+        tracked = np.array([track.state == TrackState.Tracked and track.is_activated for track in tracks])
+        if not tracked.any():
+            return False
+        heights = means[tracked, 3]
+
+        if self.__max_uncertainty is not None:
+            center_variances = np.maximum(covariances[tracked, 0, 0], covariances[tracked, 1, 1])
+            if np.any(np.sqrt(center_variances) > self.__max_uncertainty * heights):
+                return True
+
+        if self.__max_motion is not None:
+            for track, mean in zip(tracks, means):
+                detected_center = self.__detected_centers.get(track.track_id)
+                if detected_center is not None and track.state == TrackState.Tracked and \
+                        np.linalg.norm(mean[:2] - detected_center) > self.__max_motion * mean[3]:
+                    return True
+        return False
+
+    # Converts the active tracked tracks to detections, like ByteTrack.update_with_detections
+    def __get_track_detections(self) -> sv.Detections:
+        tracks = [track for track in self.__byte_tracker.tracked_tracks if track.is_activated]
+        sv_detections = sv.Detections.empty()
+        if tracks:
+            sv_detections.xyxy = np.array([track.tlbr for track in tracks], dtype=np.float32)
+            sv_detections.class_id = np.array([int(track.class_ids) for track in tracks], dtype=int)
+            sv_detections.tracker_id = np.array([int(track.track_id) for track in tracks], dtype=int)
+            sv_detections.confidence = np.array([track.score for track in tracks], dtype=np.float32)
+        else:
+            sv_detections.tracker_id = np.array([], dtype=int)
+        return sv_detections
+
     # Detects pedestrians on the frame
     def __detect(self, frame) -> sv.Detections:
         # Detect objects on the frame
-        ultralytics_detections = self.__detection_model(frame, verbose=False)[0]
+        with self.__instrumentation.stage('detect'):
+            ultralytics_detections = self.__detection_model(frame, verbose=False)[0]
+            return self.__convert_detections(ultralytics_detections)
+
+    def __convert_detections(self, ultralytics_detections) -> sv.Detections:
         # Convert detections from ultralytics to supervision format
         sv_detections = sv.Detections.from_ultralytics(ultralytics_detections)
         # Consider class id from __selected_classes define above
         sv_detections = sv_detections[np.isin(sv_detections.class_id, self.__selected_classes)]
+        self.__instrumentation.count('detections', len(sv_detections))
         return sv_detections
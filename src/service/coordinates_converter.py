@@ -9,6 +9,8 @@ class CoordinatesConverter:
     def __init__(self, camera_parameters):
         self.parameters = camera_parameters
         self.camera_matrix, self.projection_matrix, self.transformation_matrix = self.__build_matrices(self.parameters)
+        self.ground_homography = self.__build_ground_homography(self.camera_matrix, self.transformation_matrix)
+        self.inverse_ground_homography = np.linalg.inv(self.ground_homography)
 
     """
     Returns 3D scene point, Z=0
@@ -52,6 +54,21 @@ class CoordinatesConverter:
         scene_point = np.array([X, Y, Z])
         return scene_point
 
+    """
+    Returns (N, 3) scene points, Z=0, for (N, 2) image points.
+    Uses the ground plane homography, so all points are projected in one pass
+    """
+    def convert_coordinates_to_scene_batch(self, image_points: np.ndarray) -> np.ndarray:
+        image_points = np.asarray(image_points, dtype=float).reshape(-1, 2)
+
+        # (x, y) -> (x, y, 1) and back-project to the ground plane
+        ground_points_homogeneous = image_points @ self.inverse_ground_homography[:, :2].T \
+            + self.inverse_ground_homography[:, 2]
+
+        scene_points = np.zeros((len(image_points), 3))
+        scene_points[:, :2] = ground_points_homogeneous[:, :2] / ground_points_homogeneous[:, 2:]
+        return scene_points
+
     """
     Returns 2D image point
     """
@@ -74,6 +91,18 @@ class CoordinatesConverter:
 
         return image_point
 
+    """
+    Returns (N, 2) image points for (N, 3) scene points
+    """
+    def convert_coordinates_to_image_batch(self, scene_points: np.ndarray) -> np.ndarray:
+        scene_points = np.asarray(scene_points, dtype=float).reshape(-1, 3)
+
+        # same chain as convert_coordinates_to_image: transformation, then projection
+        scene_to_image_matrix = self.projection_matrix @ self.transformation_matrix
+        projected_points = scene_points @ scene_to_image_matrix[:, :3].T + scene_to_image_matrix[:, 3]
+
+        return projected_points[:, :2] / projected_points[:, 2:3]
+
     """
     Builds & returns three matrices: camera_matrix, projection_matrix, transformation_matrix
     """
@@ -113,3 +142,11 @@ class CoordinatesConverter:
         # print('transformation_matrix:\n', transformation_matrix)
 
         return camera_matrix, projection_matrix, transformation_matrix
+
+    """
+    Builds & returns 3x3 homography mapping ground plane points (X, Y, 1), Z=0, to image points (x, y, 1)
+    """
+    @staticmethod
+    def __build_ground_homography(camera_matrix: np.ndarray, transformation_matrix: np.ndarray) -> np.ndarray:
+        # for Z=0 the third rotation column drops out: H = K [r1 r2 t]
+        return camera_matrix @ transformation_matrix[:3, [0, 1, 3]]
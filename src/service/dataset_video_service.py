@@ -1,6 +1,8 @@
 import os
 from abc import ABC, abstractmethod
 
+from src.utils.detections_store import DetectionsStore
+
 
 class DatasetVideoService(ABC):
     """
@@ -12,6 +14,7 @@ class DatasetVideoService(ABC):
         self.__groundtruth_file_path = groundtruth_file_path
         self.__camera_parameters_file_path = camera_parameters_file_path
         self.__groundtruth_dict = None
+        self.__groundtruth_store = None
         self.__camera_parameters = None
 
     def get_video_path(self):
@@ -28,6 +31,14 @@ class DatasetVideoService(ABC):
             self.__groundtruth_dict = self.load_groundtruth_dict()
         return self.__groundtruth_dict
 
+    def get_groundtruth_store(self) -> DetectionsStore:
+        """
+        Get the groundtruth detections as arrays, in the layout of the predictions
+        """
+        if self.__groundtruth_store is None:
+            self.__groundtruth_store = self.load_groundtruth_store()
+        return self.__groundtruth_store
+
     def get_camera_parameters(self):
         if self.__camera_parameters is None:
             self.__camera_parameters = self.load_camera_parameters()
@@ -37,12 +48,15 @@ class DatasetVideoService(ABC):
     def load_groundtruth_dict(self) -> dict:
         pass
 
+    def load_groundtruth_store(self) -> DetectionsStore:
+        return DetectionsStore.from_dict(self.get_groundtruth_dict())
+
     @abstractmethod
     def load_camera_parameters(self) -> dict:
         pass
 
     @staticmethod
-    def load_video_paths(self, video_file_extension='.mp4') -> []:
-        video_files = [f for f in os.listdir(self.__dataset_path) if f.endswith(video_file_extension)]
-        video_paths = [os.path.join(self.__dataset_path, f) for f in video_files]
+    def load_video_paths(directory_path: os.path, video_file_extension='.mp4') -> []:
+        video_files = sorted(f for f in os.listdir(directory_path) if f.endswith(video_file_extension))
+        video_paths = [os.path.join(directory_path, f) for f in video_files]
         return video_paths
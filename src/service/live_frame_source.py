@@ -0,0 +1,185 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+DEFAULT_FPS = 25  # The frame rate assumed for the streams which do not report it
+
+
+class LiveFrame:
+    def __init__(self, frame_index: int, timestamp: float, capture_time: float, frame: np.ndarray):
+        self.frame_index = frame_index  # The index of the frame in the stream, with gaps where frames were dropped
+        self.timestamp = timestamp  # The time of the frame in the stream, in seconds
+        self.capture_time = capture_time  # The time.monotonic() at which the frame was captured
+        self.frame = frame
+
+
+class LiveFrameSource:
+    """
+    This class reads frames from a video file, an RTSP stream or a webcam with OpenCV in a background thread and
+    always gives the newest frame. The frames captured while the consumer was busy are dropped, so a slow consumer
+    falls behind in frames, not in time.
+
+    A video file is played at its native FPS by default, as if it was a camera. The timestamp of a file frame is its
+    position in the video; the timestamp of a stream frame is the time since the start of the capture, and its index
+    is the timestamp times the FPS, so the frame indices of all sources measure time in frames.
+    """
+
+    def __init__(self, source, realtime: bool = True, fps: float = None):
+        """
+        Initialize the LiveFrameSource.
+
+        :param source: The path of a video file, the URL of a stream or the index of a webcam.
+        :param realtime: If True, a video file is played at its FPS. Otherwise the frames of a file are read as fast
+        as possible and none are dropped, the consumer is waited for. Streams are always read in real time.
+        :param fps: The frame rate of the source, by default the one reported by OpenCV or DEFAULT_FPS.
+        """
+        self.__source = source
+        self.__is_file = isinstance(source, (str, os.PathLike)) and os.path.isfile(source)
+        self.__realtime = realtime or not self.__is_file
+        self.__fps = fps
+        self.__resolution = None
+        self.__capture = None
+        self.__thread = None
+        self.__condition = threading.Condition()
+        self.__latest_frame = None
+        self.__ended = False
+        self.__stopped = False
+        self.__error = None
+        self.__captured_count = 0
+        self.__delivered_count = 0
+        self.__dropped_count = 0
+
+    @property
+    def fps(self) -> float:
+        """
+        The frame rate of the source, known after start.
+        """
+        return self.__fps
+
+    @property
+    def resolution(self) -> ():
+        """
+        The (width, height) of the frames, known after start.
+        """
+        return self.__resolution
+
+    def start(self):
+        """
+        Open the source and start capturing the frames in a background thread.
+        """
+        if self.__thread is not None:
+            raise RuntimeError('The frame source is already started')
+
+        self.__capture = cv2.VideoCapture(self.__source)
+        if not self.__capture.isOpened():
+            raise IOError(f'Cannot open the video source {self.__source}')
+        if self.__fps is None:
+            reported_fps = self.__capture.get(cv2.CAP_PROP_FPS)
+            self.__fps = reported_fps if reported_fps > 0 else DEFAULT_FPS
+        self.__resolution = (
+            int(self.__capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(self.__capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        )
+
+        self.__thread = threading.Thread(target=self.__capture_frames, name='frame-source', daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """
+        Stop capturing the frames and release the source.
+        """
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify_all()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        if self.__capture is not None:
+            self.__capture.release()
+            self.__capture = None
+
+    def read(self, timeout: float = None):
+        """
+        Wait for a frame newer than the previous one read and return it.
+
+        :param timeout: The maximal time to wait in seconds, forever by default.
+        :return: The newest LiveFrame, or None at the end of the source or after the timeout.
+        """
+        with self.__condition:
+            self.__condition.wait_for(
+                lambda: self.__latest_frame is not None or self.__ended or self.__stopped, timeout
+            )
+            if self.__error is not None:
+                raise self.__error
+            live_frame = self.__latest_frame
+            if live_frame is not None:
+                self.__latest_frame = None
+                self.__delivered_count += 1
+                self.__condition.notify_all()
+            return live_frame
+
+    def get_stats(self) -> dict:
+        """
+        Get the numbers of the captured, delivered and dropped frames, and the ratio of the dropped frames.
+        """
+        with self.__condition:
+            return {
+                'captured_frames': self.__captured_count,
+                'delivered_frames': self.__delivered_count,
+                'dropped_frames': self.__dropped_count,
+                'drop_rate': self.__dropped_count / self.__captured_count if self.__captured_count > 0 else 0.0,
+            }
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    # =================== Private methods ===================
+
+    def __capture_frames(self):
+        start_time = time.monotonic()
+        frame_index = -1
+        try:
+            while not self.__stopped:
+                success, frame = self.__capture.read()
+                if not success:
+                    break
+                capture_time = time.monotonic()
+
+                if self.__is_file:
+                    frame_index += 1
+                    timestamp = frame_index / self.__fps
+                    if self.__realtime:
+                        # Release the frame at the moment it would be shown
+                        delay = start_time + timestamp - capture_time
+                        if delay > 0:
+                            time.sleep(delay)
+                        capture_time = time.monotonic()
+                else:
+                    timestamp = capture_time - start_time
+                    frame_index = max(frame_index + 1, round(timestamp * self.__fps))
+
+                self.__publish(LiveFrame(frame_index, timestamp, capture_time, frame))
+        except Exception as error:
+            self.__error = error
+        finally:
+            with self.__condition:
+                self.__ended = True
+                self.__condition.notify_all()
+
+    def __publish(self, live_frame: LiveFrame):
+        with self.__condition:
+            if not self.__realtime:
+                self.__condition.wait_for(lambda: self.__latest_frame is None or self.__stopped)
+            if self.__latest_frame is not None:
+                self.__dropped_count += 1
+            self.__latest_frame = live_frame
+            self.__captured_count += 1
+            self.__condition.notify_all()
@@ -0,0 +1,134 @@
+import time
+
+import numpy as np
+
+from src.service.byte_track_yolo_tracker import ByteTrackYOLOTracker
+from src.service.coordinates_converter import CoordinatesConverter
+from src.service.live_frame_source import LiveFrameSource, LiveFrame
+from src.service.social_distance_service import SocialDistanceService, PeopleCoordinates
+from src.utils.detection_utils import DetectionUtils
+from src.utils.instrumentation import Instrumentation
+
+
+class LiveMonitoringService:
+    """
+    This class monitors the social distance on a live source: every frame given by the LiveFrameSource (the newest
+    one) is tracked, projected to the scene and checked for violations. The frames dropped by the source leave gaps in
+    the frame indices, the tracker and the SocialDistanceService get the frame timestamps, so the tracks and the
+    violation windows keep their duration in seconds when frames are dropped. The SocialDistanceService is expected
+    to have a window in seconds; with a window in frames it uses the stream frame indices, which measure time in
+    frames of the source.
+    """
+
+    def __init__(self, tracker: ByteTrackYOLOTracker, coordinates_converter: CoordinatesConverter,
+                 distance_service: SocialDistanceService, instrumentation: Instrumentation = None):
+        """
+        Initialize the LiveMonitoringService.
+
+        :param tracker: The tracker, updated with the frame timestamps.
+        :param coordinates_converter: The converter of the bottom centers of the people boxes to the scene.
+        :param distance_service: The service which finds the violation pairs.
+        :param instrumentation: The instrumentation which times the 'projection' and 'annotation' stages of every frame,
+        counts the 'skipped_frames' before it and ends the frames. Disabled by default.
+        """
+        self.__tracker = tracker
+        self.__coordinates_converter = coordinates_converter
+        self.__distance_service = distance_service
+        self.__instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+
+    def process_frame(self, live_frame: LiveFrame) -> ():
+        """
+        Track the people on the frame and find the violation pairs.
+
+        :param live_frame: The frame.
+        :return: A tuple with the tracked detections, all current violation pairs and new violation pairs.
+        """
+        sv_detections = self.__tracker.update_tracker(live_frame.frame, live_frame.frame_index, live_frame.timestamp)
+
+        with self.__instrumentation.stage('projection'):
+            detections = DetectionUtils.convert_detections_from_sv_to_array(sv_detections)
+            people_coordinates = PeopleCoordinates(
+                object_ids=detections[:, 0],
+                sb_xy=self.__coordinates_converter.convert_coordinates_to_scene_batch(detections[:, 5:7])
+            )
+
+        all_violation_pairs, new_violation_pairs = self.__distance_service.update_violation_pairs(
+            live_frame.frame_index,
+            people_coordinates,
+            live_frame.timestamp
+        )
+        return sv_detections, all_violation_pairs, new_violation_pairs
+
+    def run(self, frame_source: LiveFrameSource, callback=None, frames_limit: int = None) -> dict:
+        """
+        Process the newest frames of the started source until it ends.
+
+        :param frame_source: The started frame source.
+        :param callback: An optional function callback(live_frame, sv_detections, all_violation_pairs,
+        new_violation_pairs) called for every processed frame, e.g. to annotate and show it. It is timed as the
+        'annotation' stage and counts in the latency.
+        :param frames_limit: The maximal number of frames to process, all frames by default.
+        :return: The report, see build_report.
+        """
+        latencies = []
+        previous_frame_index = None
+        start_time = time.monotonic()
+        while frames_limit is None or len(latencies) < frames_limit:
+            live_frame = frame_source.read()
+            if live_frame is None:
+                break
+            if previous_frame_index is not None:
+                self.__instrumentation.count('skipped_frames', live_frame.frame_index - previous_frame_index - 1)
+            previous_frame_index = live_frame.frame_index
+
+            sv_detections, all_violation_pairs, new_violation_pairs = self.process_frame(live_frame)
+            if callback is not None:
+                with self.__instrumentation.stage('annotation'):
+                    callback(live_frame, sv_detections, all_violation_pairs, new_violation_pairs)
+
+            latencies.append(time.monotonic() - live_frame.capture_time)
+            self.__instrumentation.end_frame(live_frame.frame_index)
+
+        return self.build_report(frame_source.get_stats(), np.array(latencies), time.monotonic() - start_time)
+
+    @staticmethod
+    def build_report(source_stats: dict, latencies: np.ndarray, wall_seconds: float) -> dict:
+        """
+        Build the report of a run.
+
+        :param source_stats: The statistics of the frame source.
+        :param latencies: The time from the capture to the end of the processing of every processed frame, in seconds.
+        :param wall_seconds: The duration of the run.
+        :return: A dictionary with the number of processed frames, the processed frames per second, the end-to-end
+        latency statistics in milliseconds and the statistics of the source, including the drop rate.
+        """
+        latencies_ms = latencies * 1000
+        return {
+            'processed_frames': len(latencies),
+            'wall_seconds': wall_seconds,
+            'fps': len(latencies) / wall_seconds if wall_seconds > 0 else 0.0,
+            'latency_ms': {
+                'mean': float(latencies_ms.mean()) if len(latencies) > 0 else 0.0,
+                'p50': float(np.percentile(latencies_ms, 50)) if len(latencies) > 0 else 0.0,
+                'p95': float(np.percentile(latencies_ms, 95)) if len(latencies) > 0 else 0.0,
+                'max': float(latencies_ms.max()) if len(latencies) > 0 else 0.0,
+            },
+            **source_stats,
+        }
+
+    @staticmethod
+    def format_report(report: dict) -> str:
+        """
+        Format the report returned by run as a human-readable text.
+
+        :param report: The report.
+        :return: The formatted report.
+        """
+        latency_ms = report['latency_ms']
+        return '\n'.join([
+            f'processed frames: {report["processed_frames"]} of {report["captured_frames"]} captured, '
+            f'{report["fps"]:.1f} fps',
+            f'dropped frames: {report["dropped_frames"]} ({report["drop_rate"]:.0%})',
+            f'latency: mean {latency_ms["mean"]:.1f} ms, p50 {latency_ms["p50"]:.1f} ms, '
+            f'p95 {latency_ms["p95"]:.1f} ms, max {latency_ms["max"]:.1f} ms',
+        ])
@@ -1,36 +1,152 @@
 import motmetrics as mm
+import numpy as np
+
+from src.utils.detections_store import DetectionsStore
+
+MOT_METRICS = ['num_frames', 'mota', 'motp']
+EXTENDED_MOT_METRICS = MOT_METRICS + ['idf1', 'num_switches']
 
 
 class MotMetricsService:
-    def __init__(self, predictions_dict, groundtruth_dict):
+    """
+    This class calculates the MOT metrics of the predicted detections against the groundtruth detections.
+
+    The detections are given as a dictionary frame index -> rows (tracker_id, x1, y1, x2, y2, ...) or as
+    a DetectionsStore. By default the annotated part of the video is evaluated: the groundtruth frames and the
+    prediction frames between the first and the last groundtruth frame. The groundtruth objects of the frames without
+    predictions are misses and the predictions of the evaluated frames without groundtruth are false positives.
+    """
+
+    def __init__(self, predictions_dict, groundtruth_dict, max_iou: float = 0.5, frames=None):
+        """
+        Initialize the MotMetricsService.
+
+        :param predictions_dict: The predicted detections.
+        :param groundtruth_dict: The groundtruth detections.
+        :param max_iou: The maximum distance 1 - IoU of a prediction from a groundtruth object to match them.
+        :param frames: The indices of the evaluated frames, the annotated part of the video by default.
+        """
         self.predictions_dict = predictions_dict
         self.groundtruth_dict = groundtruth_dict
+        self.max_iou = max_iou
+        self.frames = frames
 
     def calculate_mot_metrics(self):
-        accumulator = mm.MOTAccumulator(auto_id=True)
+        summary = self.calculate_metrics(MOT_METRICS)
+        return summary['mota'], summary['motp']
 
-        for frame_id in self.groundtruth_dict:
-            if frame_id not in self.predictions_dict:
-                break
-
-            y_true = self.groundtruth_dict.get(frame_id, [])
-            y_pred = self.predictions_dict.get(frame_id, [])
-            if y_true and y_pred:
-                gt_ids = [gt[0] for gt in y_true]
-                pred_ids = [pred[0] for pred in y_pred]
-                gt_boxes = [gt[1:5] for gt in y_true]
-                pred_boxes = [pred[1:5] for pred in y_pred]
-                distances = mm.distances.iou_matrix(gt_boxes, pred_boxes, max_iou=0.5)
-                accumulator.update(
-                    gt_ids,  # Ground truth objects in this frame
-                    pred_ids,  # Detector hypotheses in this frame
-                    distances  # Distances from object to hypotheses
-                )
+    def calculate_metrics(self, metrics=EXTENDED_MOT_METRICS) -> dict:
+        """
+        Calculate the given motmetrics metrics in one pass, by default MOTA, MOTP, IDF1 and the number of ID switches.
 
+        :param metrics: The names of the motmetrics metrics.
+        :return: A dictionary metric name -> value.
+        """
         mh = mm.metrics.create()
-        summary = mh.compute(
-            accumulator,
-            metrics=['num_frames', 'mota', 'motp'],
-            name='acc'
+        summary = mh.compute(self.build_accumulator(), metrics=metrics, name='acc')
+        return {metric: summary[metric].iloc[0] for metric in metrics}
+
+    def build_accumulator(self) -> mm.MOTAccumulator:
+        """
+        Build the accumulator of the matches of all frames. The distances 1 - IoU of all groundtruth and predicted
+        boxes of all frames are calculated at once.
+        """
+        frames = self.get_frames()
+        gt_ids, gt_boxes, gt_offsets = self.__get_frame_arrays(self.groundtruth_dict, frames)
+        pred_ids, pred_boxes, pred_offsets = self.__get_frame_arrays(self.predictions_dict, frames)
+        distances, distance_offsets = self.__calculate_distances(gt_boxes, gt_offsets, pred_boxes, pred_offsets)
+
+        accumulator = mm.MOTAccumulator(auto_id=True)
+        for position in range(len(frames)):
+            gt_start, gt_end = gt_offsets[position], gt_offsets[position + 1]
+            pred_start, pred_end = pred_offsets[position], pred_offsets[position + 1]
+            accumulator.update(
+                gt_ids[gt_start:gt_end],  # Ground truth objects in this frame
+                pred_ids[pred_start:pred_end],  # Detector hypotheses in this frame
+                distances[distance_offsets[position]:distance_offsets[position + 1]].reshape(
+                    gt_end - gt_start, pred_end - pred_start
+                )  # Distances from object to hypotheses
+            )
+        return accumulator
+
+    def get_frames(self) -> list:
+        """
+        Get the sorted indices of the evaluated frames, see frames. Without groundtruth all prediction frames are
+        evaluated.
+        """
+        if self.frames is not None:
+            return sorted(self.frames)
+
+        groundtruth_frames = set(self.groundtruth_dict.keys())
+        if not groundtruth_frames:
+            return sorted(self.predictions_dict.keys())
+        first_frame, last_frame = min(groundtruth_frames), max(groundtruth_frames)
+        return sorted(groundtruth_frames | {
+            frame for frame in self.predictions_dict.keys() if first_frame <= frame <= last_frame
+        })
+
+    # ============= Private methods =============
+
+    @staticmethod
+    def __get_frame_arrays(detections_dict, frames) -> ():
+        """
+        Get the IDs and the boxes of the given frames one after another, and the offset of the first row of every
+        frame plus the total number of rows at the end. The frames missing in detections_dict are empty.
+        """
+        if isinstance(detections_dict, DetectionsStore):
+            frames = np.asarray(frames)
+            starts = np.zeros(len(frames), dtype=np.int64)
+            lengths = np.zeros(len(frames), dtype=np.int64)
+            if len(detections_dict) > 0:
+                positions = np.searchsorted(detections_dict.frame_indices, frames).clip(max=len(detections_dict) - 1)
+                found = detections_dict.frame_indices[positions] == frames
+                starts[found] = detections_dict.frame_offsets[positions[found]]
+                lengths[found] = detections_dict.frame_offsets[positions[found] + 1] - starts[found]
+            offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum(lengths)
+            rows = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+            detections = detections_dict.detections[rows]
+        else:
+            frame_rows = [np.asarray(detections_dict.get(frame, []), dtype=np.float64) for frame in frames]
+            detections = np.concatenate(
+                [rows[:, :5] for rows in frame_rows if len(rows) > 0] + [np.empty((0, 5))]
+            )
+            offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(rows) for rows in frame_rows])
+
+        return detections[:, 0].astype(np.int64), detections[:, 1:5], offsets
+
+    def __calculate_distances(self, gt_boxes, gt_offsets, pred_boxes, pred_offsets) -> ():
+        """
+        Calculate the distances 1 - IoU of every groundtruth and predicted box of the same frame, NaN for the pairs
+        further than max_iou. The distances of a frame are its (groundtruth, predictions) matrix flattened.
+
+        :return: The distances of all frames one after another and the offset of the distances of every frame plus
+        the total number of distances at the end.
+        """
+        gt_counts = np.diff(gt_offsets)
+        pred_counts = np.diff(pred_offsets)
+        pair_counts = gt_counts * pred_counts
+        distance_offsets = np.zeros(len(pair_counts) + 1, dtype=np.int64)
+        distance_offsets[1:] = np.cumsum(pair_counts)
+
+        # The groundtruth and the predicted box of every pair
+        pair_frames = np.repeat(np.arange(len(pair_counts)), pair_counts)
+        pair_positions = np.arange(distance_offsets[-1]) - distance_offsets[pair_frames]
+        frame_pred_counts = pred_counts[pair_frames]
+        gt_rows = gt_offsets[pair_frames] + pair_positions // np.maximum(frame_pred_counts, 1)
+        pred_rows = pred_offsets[pair_frames] + pair_positions % np.maximum(frame_pred_counts, 1)
+        boxes1 = gt_boxes[gt_rows]
+        boxes2 = pred_boxes[pred_rows]
+
+        intersection = np.prod(
+            np.clip(np.minimum(boxes1[:, 2:], boxes2[:, 2:]) - np.maximum(boxes1[:, :2], boxes2[:, :2]), 0, None),
+            axis=1
         )
-        return summary['mota'].iloc[0], summary['motp'].iloc[0]
\ No newline at end of file
+        union = np.prod(boxes1[:, 2:] - boxes1[:, :2], axis=1) + np.prod(boxes2[:, 2:] - boxes2[:, :2], axis=1) \
+            - intersection
+        iou = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+        distances = 1 - iou
+        distances[distances > self.max_iou] = np.nan
+        return distances, distance_offsets
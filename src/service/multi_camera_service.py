@@ -0,0 +1,176 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import supervision as sv
+
+from config import DISTANCE_THRESHOLD, LAST_FRAMES, VIOLATION_PERCENTAGE
+from src.service.byte_track_yolo_tracker import ByteTrackYOLOTracker, DEFAULT_YOLO_MODEL_PATH
+from src.service.coordinates_converter import CoordinatesConverter
+from src.service.dataset_video_service import DatasetVideoService
+from src.service.social_distance_service import SocialDistanceService, PeopleCoordinates
+from src.service.towncentre_video_service import TowncentreVideoService
+
+
+class CameraStream:
+    def __init__(self, name: str, video_path, camera_parameters: dict):
+        self.name = name
+        self.video_path = video_path
+        self.camera_parameters = camera_parameters
+
+
+class MultiCameraService:
+    """
+    This class processes many camera streams concurrently, one worker process per stream. Every stream gets its own
+    ByteTrackYOLOTracker, CoordinatesConverter and SocialDistanceService. The violation events and the processing speed
+    of all cameras are aggregated into one report.
+    """
+
+    def __init__(
+            self,
+            workers: int = None,
+            distance_threshold=DISTANCE_THRESHOLD,
+            last_frames: int = LAST_FRAMES,
+            violation_percentage: float = VIOLATION_PERCENTAGE,
+            yolo_model_path=DEFAULT_YOLO_MODEL_PATH,
+            bytetrack_params=None,
+            frames_limit: int = None
+    ):
+        """
+        Initialize the MultiCameraService.
+
+        :param workers: The maximal number of streams processed at the same time, defaults to the number of CPUs.
+        :param distance_threshold: The distance threshold of the SocialDistanceService of every stream.
+        :param last_frames: The number of last frames of the SocialDistanceService of every stream.
+        :param violation_percentage: The violation percentage of the SocialDistanceService of every stream.
+        :param yolo_model_path: The path of the YOLO model of every stream.
+        :param bytetrack_params: The ByteTrack parameters of every stream.
+        :param frames_limit: The maximal number of frames to process per stream, all frames by default.
+        """
+        self.__workers = workers if workers is not None else os.cpu_count()
+        self.__stream_params = {
+            'distance_threshold': distance_threshold,
+            'last_frames': last_frames,
+            'violation_percentage': violation_percentage,
+            'yolo_model_path': yolo_model_path,
+            'bytetrack_params': bytetrack_params,
+            'frames_limit': frames_limit,
+        }
+
+    def process(self, camera_streams: list) -> dict:
+        """
+        Process the camera streams concurrently.
+
+        :param camera_streams: A list of CameraStream objects with unique names.
+        :return: The aggregated report, see build_report.
+        """
+        names = [camera_stream.name for camera_stream in camera_streams]
+        if len(set(names)) != len(names):
+            raise ValueError(f'Camera names must be unique: {names}')
+
+        with ProcessPoolExecutor(max_workers=self.__workers) as executor:
+            futures = {
+                camera_stream.name: executor.submit(process_camera_stream, camera_stream, **self.__stream_params)
+                for camera_stream in camera_streams
+            }
+            camera_reports = {name: future.result() for name, future in futures.items()}
+
+        return self.build_report(camera_reports)
+
+    @staticmethod
+    def build_report(camera_reports: dict) -> dict:
+        """
+        Aggregate the reports of the cameras.
+
+        :param camera_reports: A dictionary camera name -> report returned by process_camera_stream.
+        :return: A dictionary with the per camera statistics (frames, seconds, fps, number of violation events),
+        all violation events ordered by camera and frame, and the totals.
+        """
+        cameras = {}
+        violation_events = []
+        for name, camera_report in camera_reports.items():
+            cameras[name] = {
+                'frames': camera_report['frames'],
+                'seconds': camera_report['seconds'],
+                'fps': camera_report['frames'] / camera_report['seconds'] if camera_report['seconds'] > 0 else 0.0,
+                'violation_events': len(camera_report['violation_events']),
+            }
+            violation_events += [{'camera': name, **event} for event in camera_report['violation_events']]
+
+        return {
+            'cameras': cameras,
+            'violation_events': violation_events,
+            'total_frames': sum(camera['frames'] for camera in cameras.values()),
+            'total_violation_events': len(violation_events),
+        }
+
+    @staticmethod
+    def load_camera_streams(directory_path, video_file_extension='.mp4', calibration_file_extension='.ci') -> list:
+        """
+        Create the camera streams for the videos of a directory. Every video must have the calibration file with the
+        same name next to it, like 'TownCentre-calibration.ci'; the camera is named after the video file.
+
+        :param directory_path: The directory with the videos.
+        :param video_file_extension: The extension of the video files.
+        :param calibration_file_extension: The extension of the calibration files.
+        :return: A list of CameraStream objects.
+        """
+        camera_streams = []
+        for video_path in DatasetVideoService.load_video_paths(directory_path, video_file_extension):
+            name = os.path.splitext(os.path.basename(video_path))[0]
+            calibration_file_path = os.path.splitext(video_path)[0] + calibration_file_extension
+            camera_parameters = TowncentreVideoService.parse_camera_parameters_file(calibration_file_path)
+            camera_streams.append(CameraStream(name, video_path, camera_parameters))
+        return camera_streams
+
+
+def process_camera_stream(
+        camera_stream: CameraStream,
+        distance_threshold=DISTANCE_THRESHOLD,
+        last_frames: int = LAST_FRAMES,
+        violation_percentage: float = VIOLATION_PERCENTAGE,
+        yolo_model_path=DEFAULT_YOLO_MODEL_PATH,
+        bytetrack_params=None,
+        frames_limit: int = None
+) -> dict:
+    """
+    Tracks people of one stream and checks the social distance. Runs in a worker process.
+    Returns the number of processed frames, the processing time and the new violation events
+    """
+    tracker = ByteTrackYOLOTracker(yolo_model_path, bytetrack_params)
+    coordinates_converter = CoordinatesConverter(camera_stream.camera_parameters)
+    distance_service = SocialDistanceService(distance_threshold, last_frames, violation_percentage)
+
+    end = None
+    if frames_limit is not None:
+        end = min(frames_limit, sv.VideoInfo.from_video_path(camera_stream.video_path).total_frames)
+
+    violation_events = []
+    frames = 0
+    start = time.perf_counter()
+    for frame_index, frame in enumerate(sv.get_video_frames_generator(camera_stream.video_path, end=end)):
+        sv_detections = tracker.update_tracker(frame, frame_index)
+        bottom_centers = np.column_stack((
+            (sv_detections.xyxy[:, 0] + sv_detections.xyxy[:, 2]) / 2,
+            sv_detections.xyxy[:, 3]
+        ))
+        people_coordinates = PeopleCoordinates(
+            object_ids=sv_detections.tracker_id,
+            sb_xy=coordinates_converter.convert_coordinates_to_scene_batch(bottom_centers)
+        )
+
+        _, new_violation_pairs = distance_service.update_violation_pairs(frame_index, people_coordinates)
+        for pair in sorted(new_violation_pairs):
+            violation_events.append({
+                'frame_index': frame_index,
+                'pair': (int(pair[0]), int(pair[1])),
+                'distance': distance_service.get_distance_for_pair(frame_index, pair),
+            })
+        frames += 1
+
+    return {
+        'frames': frames,
+        'seconds': time.perf_counter() - start,
+        'violation_events': violation_events,
+    }
@@ -0,0 +1,59 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import motmetrics as mm
+import pandas as pd
+
+from src.service.mot_metrics_service import MotMetricsService, EXTENDED_MOT_METRICS
+
+
+class MultiSequenceMotMetricsService:
+    """
+    This class calculates the MOT metrics of many sequences, for example of all recordings of a regression benchmark.
+    The accumulator of every sequence is built by MotMetricsService in a separate worker process, then the
+    accumulators are summarized together with the summary of every sequence and the overall summary.
+    """
+
+    def __init__(self, workers: int = None, max_iou: float = 0.5):
+        """
+        Initialize the MultiSequenceMotMetricsService.
+
+        :param workers: The number of worker processes, defaults to the number of CPUs. With 1 worker the sequences
+        are evaluated in the current process.
+        :param max_iou: The maximum distance 1 - IoU of a prediction from a groundtruth object to match them.
+        """
+        self.__workers = workers if workers is not None else os.cpu_count()
+        self.__max_iou = max_iou
+
+    def calculate_metrics(self, sequences: dict, metrics=EXTENDED_MOT_METRICS) -> pd.DataFrame:
+        """
+        Calculate the metrics of every sequence and of all sequences together.
+
+        :param sequences: A dictionary sequence name -> (predictions, groundtruth), the detections of a sequence are
+        given like to MotMetricsService.
+        :param metrics: The names of the motmetrics metrics.
+        :return: A data frame with a row per sequence and the 'OVERALL' row, and a column per metric.
+        """
+        if not sequences:
+            raise ValueError('No sequences to evaluate')
+
+        names = list(sequences.keys())
+        predictions = [sequences[name][0] for name in names]
+        groundtruths = [sequences[name][1] for name in names]
+        max_ious = [self.__max_iou] * len(names)
+
+        if self.__workers <= 1:
+            events = list(map(build_sequence_events, predictions, groundtruths, max_ious))
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.__workers, len(names))) as executor:
+                events = list(executor.map(build_sequence_events, predictions, groundtruths, max_ious))
+
+        mh = mm.metrics.create()
+        return mh.compute_many(events, metrics=metrics, names=names, generate_overall=True)
+
+
+def build_sequence_events(predictions, groundtruth, max_iou: float) -> pd.DataFrame:
+    """
+    Build the accumulator of one sequence and return its events, including the raw distances needed by IDF1.
+    """
+    return MotMetricsService(predictions, groundtruth, max_iou).build_accumulator().events
@@ -0,0 +1,176 @@
+import queue
+import threading
+import time
+
+_END_OF_STREAM = object()  # Marks the end of the items in a queue
+_POLL_SECONDS = 0.1  # How often the blocked threads check whether the pipeline was stopped
+
+
+class PipelineService:
+    """
+    This class runs a chain of processing stages, each one in its own thread. The stages are connected with bounded
+    queues: the work of neighbour stages overlaps (video decoding, torch inference and file I/O release the GIL),
+    and a slow stage makes the previous ones wait instead of buffering the whole video in memory.
+    """
+
+    def __init__(self, queue_size: int = 8):
+        """
+        Initialize the PipelineService.
+
+        :param queue_size: The maximal number of items waiting between two stages.
+        """
+        self.__queue_size = queue_size
+
+    def run(self, source, stages: list, source_name: str = 'source') -> dict:
+        """
+        Run the pipeline until the source is exhausted. The items keep their order through all stages.
+        If any stage raises an exception, the pipeline is stopped and the exception is re-raised here.
+
+        :param source: An iterable with the input items. It is iterated in its own thread, so the production of the items
+        (e.g. decoding of the video frames) is the first stage of the pipeline.
+        :param stages: A list of (name, function) tuples. Each function gets the item returned by the previous stage.
+        The result of the last stage is dropped, so it is expected to store or write the items.
+        :param source_name: The name of the source stage in the statistics.
+        :return: The statistics of the run: per stage number of items, busy time, throughput and utilization,
+        per queue mean and maximal occupancy, the wall time and the overall throughput.
+        """
+        if not stages:
+            raise ValueError('The pipeline needs at least one stage')
+
+        names = [source_name] + [name for name, _ in stages]
+        queues = [queue.Queue(maxsize=self.__queue_size) for _ in stages]
+        stage_stats = {name: {'items': 0, 'busy_seconds': 0.0} for name in names}
+        queue_stats = [{'samples': 0, 'occupancy_sum': 0, 'max_occupancy': 0} for _ in queues]
+        stop_event = threading.Event()
+        errors = []
+
+        def put(output_queue, item) -> bool:
+            while not stop_event.is_set():
+                try:
+                    output_queue.put(item, timeout=_POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(input_index):
+            occupancy = queues[input_index].qsize()
+            queue_stats[input_index]['samples'] += 1
+            queue_stats[input_index]['occupancy_sum'] += occupancy
+            queue_stats[input_index]['max_occupancy'] = max(queue_stats[input_index]['max_occupancy'], occupancy)
+
+            while not stop_event.is_set():
+                try:
+                    return queues[input_index].get(timeout=_POLL_SECONDS)
+                except queue.Empty:
+                    continue
+            return _END_OF_STREAM
+
+        def fail(error):
+            errors.append(error)
+            stop_event.set()
+
+        def run_source():
+            iterator = iter(source)
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                except Exception as error:
+                    fail(error)
+                    return
+                stage_stats[source_name]['busy_seconds'] += time.perf_counter() - start
+                stage_stats[source_name]['items'] += 1
+                if not put(queues[0], item):
+                    return
+            put(queues[0], _END_OF_STREAM)
+
+        def run_stage(index, name, function):
+            output_queue = queues[index + 1] if index + 1 < len(queues) else None
+            while True:
+                item = get(index)
+                if item is _END_OF_STREAM:
+                    break
+
+                start = time.perf_counter()
+                try:
+                    result = function(item)
+                except Exception as error:
+                    fail(error)
+                    return
+                stage_stats[name]['busy_seconds'] += time.perf_counter() - start
+                stage_stats[name]['items'] += 1
+
+                if output_queue is not None and not put(output_queue, result):
+                    return
+            if output_queue is not None:
+                put(output_queue, _END_OF_STREAM)
+
+        threads = [threading.Thread(target=run_source, name=source_name, daemon=True)]
+        threads += [
+            threading.Thread(target=run_stage, args=(index, name, function), name=name, daemon=True)
+            for index, (name, function) in enumerate(stages)
+        ]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.perf_counter() - start
+
+        if errors:
+            raise errors[0]
+
+        return self.__build_stats(names, stage_stats, queue_stats, wall_seconds)
+
+    @staticmethod
+    def format_stats(stats: dict) -> str:
+        """
+        Format the statistics returned by run as a human-readable table.
+
+        :param stats: The statistics of the run.
+        :return: The formatted statistics.
+        """
+        lines = [f'{"stage":<12} {"items":>8} {"busy, s":>9} {"items/s":>9} {"utilization":>12}']
+        for name, stage in stats['stages'].items():
+            lines.append(f'{name:<12} {stage["items"]:>8} {stage["busy_seconds"]:>9.2f} '
+                         f'{stage["items_per_second"]:>9.1f} {stage["utilization"]:>11.0%}')
+        lines.append(f'{"queue":<24} {"mean":>8} {"max":>5} {"size":>5}')
+        for name, queue_occupancy in stats['queues'].items():
+            lines.append(f'{name:<24} {queue_occupancy["mean_occupancy"]:>8.2f} '
+                         f'{queue_occupancy["max_occupancy"]:>5} {queue_occupancy["size"]:>5}')
+        lines.append(f'wall time: {stats["wall_seconds"]:.2f} s, throughput: {stats["items_per_second"]:.1f} items/s')
+        return '\n'.join(lines)
+
+    # =================== Private methods ===================
+
+    def __build_stats(self, names, stage_stats, queue_stats, wall_seconds) -> dict:
+        stages = {}
+        for name in names:
+            items, busy_seconds = stage_stats[name]['items'], stage_stats[name]['busy_seconds']
+            stages[name] = {
+                'items': items,
+                'busy_seconds': busy_seconds,
+                'items_per_second': items / busy_seconds if busy_seconds > 0 else float('inf'),
+                'utilization': busy_seconds / wall_seconds if wall_seconds > 0 else 0.0,
+            }
+
+        queues = {}
+        for index, queue_occupancy in enumerate(queue_stats):
+            samples = queue_occupancy['samples']
+            queues[f'{names[index]} -> {names[index + 1]}'] = {
+                'mean_occupancy': queue_occupancy['occupancy_sum'] / samples if samples > 0 else 0.0,
+                'max_occupancy': queue_occupancy['max_occupancy'],
+                'size': self.__queue_size,
+            }
+
+        last_stage_items = stage_stats[names[-1]]['items']
+        return {
+            'stages': stages,
+            'queues': queues,
+            'wall_seconds': wall_seconds,
+            'items_per_second': last_stage_items / wall_seconds if wall_seconds > 0 else 0.0,
+        }
@@ -0,0 +1,175 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import supervision as sv
+from scipy.optimize import linear_sum_assignment
+
+from src.service.byte_track_yolo_tracker import ByteTrackYOLOTracker, DEFAULT_YOLO_MODEL_PATH
+from src.utils.detection_utils import DetectionUtils
+
+
+class ShardedTrackingService:
+    """
+    This class tracks a long video in several worker processes. The video is split into consecutive segments, each
+    segment is tracked by its own ByteTrackYOLOTracker in a separate process. A worker starts segment_overlap frames
+    before its segment, and the tracks of these overlapping frames are matched by IoU with the tracks of the previous
+    segment, so the track IDs continue across the segment boundaries.
+    """
+
+    def __init__(
+            self,
+            workers: int = None,
+            segment_overlap: int = 30,
+            yolo_model_path=DEFAULT_YOLO_MODEL_PATH,
+            bytetrack_params=None,
+            iou_threshold: float = 0.5
+    ):
+        """
+        Initialize the ShardedTrackingService.
+
+        :param workers: The number of worker processes and video segments, defaults to the number of CPUs.
+        :param segment_overlap: The number of frames tracked by two neighbour workers, used to stitch the track IDs.
+        :param yolo_model_path: The path of the YOLO model of every worker.
+        :param bytetrack_params: The ByteTrack parameters of every worker.
+        :param iou_threshold: The minimal IoU of two boxes of the overlapping frames to consider them the same person.
+        """
+        self.__workers = workers if workers is not None else os.cpu_count()
+        self.__segment_overlap = segment_overlap
+        self.__yolo_model_path = yolo_model_path
+        self.__bytetrack_params = bytetrack_params
+        self.__iou_threshold = iou_threshold
+
+    def track_video(self, video_path, end: int = None) -> dict:
+        """
+        Track the video in parallel.
+
+        :param video_path: The path of the video.
+        :param end: The index of the frame to stop before, the whole video by default.
+        :return: A dictionary frame index -> list of detection rows, like DetectionUtils.convert_detections_from_sv_to_row.
+        """
+        total_frames = sv.VideoInfo.from_video_path(video_path).total_frames
+        if end is not None:
+            total_frames = min(total_frames, end)
+
+        boundaries = self.get_segment_boundaries(total_frames)
+        with ProcessPoolExecutor(max_workers=self.__workers) as executor:
+            futures = [
+                executor.submit(
+                    track_segment,
+                    video_path,
+                    self.__get_warmup_start(boundaries, segment_index),
+                    boundaries[segment_index + 1],
+                    self.__yolo_model_path,
+                    self.__bytetrack_params
+                )
+                for segment_index in range(len(boundaries) - 1)
+            ]
+            segment_detections = [future.result() for future in futures]
+
+        return self.stitch_segments(segment_detections, boundaries)
+
+    def get_segment_boundaries(self, total_frames: int) -> list:
+        """
+        Split the frames into one segment per worker.
+
+        :param total_frames: The number of frames.
+        :return: A list of segment boundaries: segment i covers frames boundaries[i] <= index < boundaries[i + 1].
+        """
+        segments_count = max(1, min(self.__workers, total_frames))
+        return np.linspace(0, total_frames, segments_count + 1).round().astype(int).tolist()
+
+    def stitch_segments(self, segment_detections: list, boundaries: list) -> dict:
+        """
+        Merge the detections of the segments into one dictionary with consistent track IDs. Every segment keeps the frames
+        of its own range; its overlap with the previous segment is only used to match the track IDs.
+
+        :param segment_detections: For each segment, a dictionary frame index -> list of detection rows, covering the
+        segment and its warm-up frames.
+        :param boundaries: The segment boundaries as returned by get_segment_boundaries.
+        :return: A dictionary frame index -> list of detection rows.
+        """
+        stitched_detections = {}
+        next_tracker_id = 1
+        for segment_index, detections_dict in enumerate(segment_detections):
+            start, end = boundaries[segment_index], boundaries[segment_index + 1]
+            overlap_frames = range(self.__get_warmup_start(boundaries, segment_index), start)
+            id_map = self.__match_tracks(stitched_detections, detections_dict, overlap_frames)
+
+            for frame_index in range(start, end):
+                rows = []
+                for row in detections_dict.get(frame_index, []):
+                    tracker_id = row[0]
+                    if tracker_id not in id_map:
+                        id_map[tracker_id] = next_tracker_id
+                    next_tracker_id = max(next_tracker_id, id_map[tracker_id] + 1)
+                    rows.append((id_map[tracker_id], *row[1:]))
+                stitched_detections[frame_index] = rows
+
+        return stitched_detections
+
+    # =================== Private methods ===================
+
+    def __get_warmup_start(self, boundaries: list, segment_index: int) -> int:
+        """
+        Get the first frame tracked by the worker of the segment: up to segment_overlap frames of the previous segment.
+        """
+        if segment_index == 0:
+            return boundaries[0]
+        return max(boundaries[segment_index - 1], boundaries[segment_index] - self.__segment_overlap)
+
+    def __match_tracks(self, stitched_detections: dict, detections_dict: dict, overlap_frames) -> dict:
+        """
+        Match the track IDs of a segment with the already stitched track IDs using the overlapping frames.
+        A pair of tracks gets a vote for every overlapping frame where their boxes are matched with IoU above
+        the threshold; a segment track is matched if it got votes in at least half of its overlapping frames.
+
+        :return: A dictionary segment track ID -> stitched track ID.
+        """
+        votes = {}  # (stitched ID, segment ID) -> number of frames
+        frames_count = {}  # segment ID -> number of overlapping frames with the track
+        for frame_index in overlap_frames:
+            stitched_rows = stitched_detections.get(frame_index, [])
+            rows = detections_dict.get(frame_index, [])
+            for row in rows:
+                frames_count[row[0]] = frames_count.get(row[0], 0) + 1
+            if not stitched_rows or not rows:
+                continue
+
+            iou_matrix = DetectionUtils.calculate_iou_matrix(
+                [stitched_row[1:5] for stitched_row in stitched_rows],
+                [row[1:5] for row in rows]
+            )
+            for i, j in zip(*linear_sum_assignment(-iou_matrix)):
+                if iou_matrix[i, j] >= self.__iou_threshold:
+                    pair = (stitched_rows[i][0], rows[j][0])
+                    votes[pair] = votes.get(pair, 0) + 1
+
+        if not votes:
+            return {}
+
+        stitched_ids = sorted({stitched_id for stitched_id, _ in votes})
+        segment_ids = sorted({segment_id for _, segment_id in votes})
+        votes_matrix = np.zeros((len(stitched_ids), len(segment_ids)))
+        for (stitched_id, segment_id), count in votes.items():
+            votes_matrix[stitched_ids.index(stitched_id), segment_ids.index(segment_id)] = count
+
+        id_map = {}
+        for i, j in zip(*linear_sum_assignment(-votes_matrix)):
+            if votes_matrix[i, j] >= frames_count[segment_ids[j]] / 2:
+                id_map[segment_ids[j]] = stitched_ids[i]
+        return id_map
+
+
+def track_segment(video_path, start: int, end: int, yolo_model_path=DEFAULT_YOLO_MODEL_PATH,
+                  bytetrack_params=None) -> dict:
+    """
+    Tracks the frames start <= index < end of the video with a new tracker. Runs in a worker process
+    """
+    tracker = ByteTrackYOLOTracker(yolo_model_path, bytetrack_params)
+    detections_dict = {}
+    frames_generator = sv.get_video_frames_generator(video_path, start=start, end=end)
+    for frame_index, frame in enumerate(frames_generator, start=start):
+        sv_detections = tracker.update_tracker(frame, frame_index)
+        detections_dict[frame_index] = DetectionUtils.convert_detections_from_sv_to_row(sv_detections)
+    return detections_dict
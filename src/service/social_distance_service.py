@@ -1,22 +1,61 @@
+from collections import deque
+
 import numpy as np
+from scipy.spatial import cKDTree
+from scipy.spatial.distance import pdist, squareform
+
+from src.utils.instrumentation import Instrumentation
+
+_EPSILON = 1e-9  # The tolerance of the comparisons of the timestamps, and of the time-weighted violation ratios
 
 
 class DistanceMatrix:
     """
-    This class represents a distance matrix for a set of objects. The distance matrix is a 2D array where each element
-    represents the distance between two objects. The objects are identified by their IDs.
+    This class represents a distance matrix for a set of objects. The objects are identified by their IDs, which are
+    kept in a sorted array and found with a binary search. Only the upper triangle of the matrix is stored, in
+    a condensed float32 buffer (the layout of scipy's pdist), so N objects take N * (N - 1) / 2 * 4 bytes.
     """
 
     def __init__(self, object_ids):
         """
-        Initialize the DistanceMatrix with the given object IDs. The IDs are used to map the objects to their indices
+        Initialize the DistanceMatrix with the given object IDs. The sorted IDs define the order of the objects
         in the distance matrix.
 
         :param object_ids: A list of object IDs.
         """
-        self.id_index_map = {id: index for index, id in enumerate(object_ids)}
-        size = len(self.id_index_map)
-        self.matrix = np.zeros((size, size))
+        self.object_ids = np.unique(np.asarray(object_ids))
+        size = len(self.object_ids)
+        self.distances = np.zeros(size * (size - 1) // 2, dtype=np.float32)
+
+    @classmethod
+    def from_points(cls, object_ids, points):
+        """
+        Create the DistanceMatrix with the Euclidean distances between the given points.
+
+        :param object_ids: A list of object IDs.
+        :param points: An array with the point of each object, in the order of object_ids.
+        :return: The distance matrix.
+        """
+        distance_matrix = cls(object_ids)
+        if len(distance_matrix.object_ids) > 1:
+            # pdist of the points in the sorted IDs order is exactly the condensed buffer
+            _, first_indices = np.unique(np.asarray(object_ids), return_index=True)
+            distance_matrix.distances[:] = pdist(np.asarray(points, dtype=float)[first_indices])
+        return distance_matrix
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """
+        The full square distance matrix, the objects are in the order of the sorted IDs.
+        """
+        return squareform(self.distances)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The number of bytes used by the stored distances.
+        """
+        return self.distances.nbytes
 
     def add_distance(self, id1, id2, distance):
         """
@@ -26,11 +65,11 @@ class DistanceMatrix:
         :param id2: The ID of the second object.
         :param distance: The distance between the two objects.
         """
-        index1 = self.id_index_map[id1]
-        index2 = self.id_index_map[id2]
-
-        self.matrix[index1, index2] = distance
-        self.matrix[index2, index1] = distance
+        (index1, index2), found = self.__find_indices([id1, id2])
+        if not found.all():
+            raise KeyError((id1, id2))
+        if index1 != index2:
+            self.distances[self.__get_condensed_indices(index1, index2)] = distance
 
     def get_distance(self, id1, id2):
         """
@@ -40,25 +79,212 @@ class DistanceMatrix:
         :param id2: The ID of the second object.
         :return: The distance between the two objects.
         """
-        if (id1 not in self.id_index_map.keys()) or (id2 not in self.id_index_map.keys()):
-            return None
+        distance = self.get_distances(np.array([[id1, id2]]))[0]
+        return None if np.isnan(distance) else float(distance)
+
+    def get_distances(self, pairs) -> np.ndarray:
+        """
+        Get the distances for many pairs of objects at once.
 
-        index1 = self.id_index_map[id1]
-        index2 = self.id_index_map[id2]
-        if index1 > index2:
-            index1, index2 = index2, index1
+        :param pairs: An array of shape (M, 2) with the IDs of the objects of each pair.
+        :return: An array of M distances, NaN for the pairs with an unknown ID.
+        """
+        pairs = np.asarray(pairs).reshape(-1, 2)
+        indices1, found1 = self.__find_indices(pairs[:, 0])
+        indices2, found2 = self.__find_indices(pairs[:, 1])
 
-        return self.matrix[index1, index2]
+        distances = np.full(len(pairs), np.nan, dtype=np.float32)
+        found = found1 & found2
+        distances[found & (indices1 == indices2)] = 0
+        different = found & (indices1 != indices2)
+        distances[different] = self.distances[self.__get_condensed_indices(indices1[different], indices2[different])]
+        return distances
 
     def get_all_distances(self, id):
         """
         Get the distances between the given object and all other objects.
 
         :param id: The ID of the object.
-        :return: A list of distances between the given object and all other objects.
+        :return: A list of distances between the given object and all other objects, in the order of the sorted IDs.
+        """
+        return self.get_distances(np.column_stack((np.full(len(self.object_ids), id), self.object_ids)))
+
+    def get_close_pairs(self, distance_threshold) -> list:
+        """
+        Get the pairs of objects that are closer than the given distance threshold.
+
+        :param distance_threshold: The distance threshold.
+        :return: A list of pairs (id1, id2) with id1 < id2.
+        """
+        condensed_indices = np.flatnonzero(self.distances < distance_threshold)
+        indices1, indices2 = self.__get_square_indices(condensed_indices)
+        return list(zip(self.object_ids[indices1].tolist(), self.object_ids[indices2].tolist()))
+
+    def get_all_pairs(self) -> list:
+        """
+        Get all pairs of objects of the matrix.
+
+        :return: A list of pairs (id1, id2) with id1 < id2.
+        """
+        indices1, indices2 = np.triu_indices(len(self.object_ids), k=1)
+        return list(zip(self.object_ids[indices1].tolist(), self.object_ids[indices2].tolist()))
+
+    def __find_indices(self, ids) -> (np.ndarray, np.ndarray):
+        """
+        Find the indices of the given IDs in the sorted IDs array.
+
+        :param ids: An array of IDs.
+        :return: A tuple with the array of indices and the mask of the IDs that were found.
         """
-        index = self.id_index_map[id]
-        return self.matrix[index, :]
+        ids = np.asarray(ids)
+        if len(self.object_ids) == 0:
+            return np.zeros(len(ids), dtype=int), np.zeros(len(ids), dtype=bool)
+
+        indices = np.minimum(np.searchsorted(self.object_ids, ids), len(self.object_ids) - 1)
+        return indices, self.object_ids[indices] == ids
+
+    def __get_condensed_indices(self, indices1, indices2):
+        """
+        Convert the (row, column) indices of the square matrix into the indices of the condensed buffer.
+        """
+        rows, columns = np.minimum(indices1, indices2), np.maximum(indices1, indices2)
+        size = len(self.object_ids)
+        return size * rows - rows * (rows + 1) // 2 + columns - rows - 1
+
+    def __get_square_indices(self, condensed_indices) -> (np.ndarray, np.ndarray):
+        """
+        Convert the indices of the condensed buffer into the (row, column) indices of the square matrix.
+        """
+        size = len(self.object_ids)
+        # Number of the elements in the buffer before the row r: r * (2 * size - r - 1) / 2
+        rows = np.floor((2 * size - 1 - np.sqrt((2 * size - 1) ** 2 - 8 * condensed_indices)) / 2).astype(int)
+        row_starts = rows * (2 * size - rows - 1) // 2
+        # Fix the rounding errors of the square root for large matrices
+        rows -= row_starts > condensed_indices
+        row_starts = rows * (2 * size - rows - 1) // 2
+        rows_ends = row_starts + size - rows - 1
+        rows += condensed_indices >= rows_ends
+        row_starts = rows * (2 * size - rows - 1) // 2
+        columns = condensed_indices - row_starts + rows + 1
+        return rows, columns
+
+
+class SparseDistanceMatrix:
+    """
+    This class is a sparse alternative to the DistanceMatrix. Only the distances between objects that are not further
+    than the given radius from each other are stored, so the memory grows with the number of close pairs instead of
+    the squared number of objects. The distance between two known objects that was not stored is infinite.
+    """
+
+    def __init__(self, object_ids, radius):
+        """
+        Initialize the SparseDistanceMatrix with the given object IDs and the radius of the stored distances.
+
+        :param object_ids: A list of object IDs.
+        :param radius: The maximal distance between two objects to store.
+        """
+        self.object_ids = np.unique(np.asarray(object_ids))
+        self.radius = radius
+        self.distances = {}  # (id1, id2) with id1 < id2 -> distance
+
+    @classmethod
+    def from_points(cls, object_ids, points, radius):
+        """
+        Create the SparseDistanceMatrix with the Euclidean distances between the given points that are not greater
+        than the radius. The close pairs are found with a KD-tree.
+
+        :param object_ids: A list of object IDs.
+        :param points: An array with the point of each object, in the order of object_ids.
+        :param radius: The maximal distance between two objects to store.
+        :return: The sparse distance matrix.
+        """
+        distance_matrix = cls(object_ids, radius)
+        if len(object_ids) < 2:
+            return distance_matrix
+
+        points = np.asarray(points, dtype=float)
+        pairs = cKDTree(points).query_pairs(r=radius, output_type='ndarray')
+        distances = np.linalg.norm(points[pairs[:, 0]] - points[pairs[:, 1]], axis=1)
+        object_ids = np.asarray(object_ids).tolist()
+        for (i, j), distance in zip(pairs.tolist(), distances.tolist()):
+            distance_matrix.add_distance(object_ids[i], object_ids[j], distance)
+
+        return distance_matrix
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The number of bytes used by the stored distances (the values only, without the dictionary overhead).
+        """
+        return len(self.distances) * np.dtype(float).itemsize
+
+    def add_distance(self, id1, id2, distance):
+        """
+        Add the distance between two objects to the sparse distance matrix.
+
+        :param id1: The ID of the first object.
+        :param id2: The ID of the second object.
+        :param distance: The distance between the two objects.
+        """
+        if id1 > id2:
+            id1, id2 = id2, id1
+        self.distances[(id1, id2)] = distance
+
+    def get_distance(self, id1, id2):
+        """
+        Get the distance between two objects.
+
+        :param id1: The ID of the first object.
+        :param id2: The ID of the second object.
+        :return: The distance between the two objects, infinity if it is greater than the radius.
+        """
+        distance = self.get_distances(np.array([[id1, id2]]))[0]
+        return None if np.isnan(distance) else float(distance)
+
+    def get_distances(self, pairs) -> np.ndarray:
+        """
+        Get the distances for many pairs of objects at once.
+
+        :param pairs: An array of shape (M, 2) with the IDs of the objects of each pair.
+        :return: An array of M distances, infinity for the pairs further than the radius, NaN for the pairs with
+        an unknown ID.
+        """
+        pairs = np.asarray(pairs).reshape(-1, 2)
+        found = np.isin(pairs, self.object_ids).all(axis=1)
+
+        distances = np.full(len(pairs), np.nan)
+        distances[found] = [
+            0.0 if id1 == id2 else self.distances.get((min(id1, id2), max(id1, id2)), np.inf)
+            for id1, id2 in pairs[found].tolist()
+        ]
+        return distances
+
+    def get_all_distances(self, id):
+        """
+        Get the distances between the given object and all other objects.
+
+        :param id: The ID of the object.
+        :return: A list of distances between the given object and all other objects, in the order of the sorted IDs.
+        """
+        return self.get_distances(np.column_stack((np.full(len(self.object_ids), id), self.object_ids)))
+
+    def get_close_pairs(self, distance_threshold) -> list:
+        """
+        Get the pairs of objects that are closer than the given distance threshold.
+
+        :param distance_threshold: The distance threshold, not greater than the radius of the matrix.
+        :return: A list of pairs (id1, id2) with id1 < id2.
+        """
+        return [pair for pair, distance in self.distances.items() if distance < distance_threshold]
+
+    def get_all_pairs(self) -> list:
+        """
+        Get all pairs of objects of the matrix, including the ones further than the radius.
+
+        :return: A list of pairs (id1, id2) with id1 < id2.
+        """
+        indices1, indices2 = np.triu_indices(len(self.object_ids), k=1)
+        return list(zip(self.object_ids[indices1].tolist(), self.object_ids[indices2].tolist()))
 
 
 class PeopleCoordinates:
@@ -71,39 +297,93 @@ class SocialDistanceService:
     """
     This class is responsible for managing and updating the violation pairs based on the social distance threshold,
     the number of last frames to consider, and the violation percentage.
+
+    With window_seconds the window is the frames of the last window_seconds seconds instead of the last_frames frames.
+    Every frame then stands for the time since the previous processed frame, and the violation percentage is the part of
+    the window time in which the pair was too close, so the violations do not depend on the frame rate or on skipped
+    frames. The first frame stands for the same time as the second one. At a constant frame rate fps,
+    window_seconds = last_frames / fps gives the violations of last_frames.
     """
 
-    def __init__(self, distance_threshold=2, last_frames: int = 5, violation_percentage: float = 0.8):
+    def __init__(self, distance_threshold=2, last_frames: int = 5, violation_percentage: float = 0.8,
+                 sparse: bool = False, history_size: int = None, instrumentation: Instrumentation = None,
+                 window_seconds: float = None):
         """
         Initialize the SocialDistanceService with the given parameters.
 
         :param distance_threshold: The minimum distance between two people to consider it a violation.
         :param last_frames: The number of last frames to consider for calculating the violation pairs.
         :param violation_percentage: The minimum percentage of frames in which a pair of people violate the social distance to consider them a violation pair.
+        :param sparse: If True, only the pairs closer than the distance threshold are searched (with a KD-tree) and
+        stored in a SparseDistanceMatrix. Recommended for large crowds.
+        :param history_size: The number of the latest frames to keep in the history, older frames are evicted. Defaults
+        to last_frames + 1, which is the minimum needed for the sliding window and the new violation pairs. With
+        window_seconds the history keeps the frames of the window and the frame before them instead.
+        :param instrumentation: The instrumentation which times the 'social_distance' stage and counts the 'people',
+        the 'pairs_evaluated' and the 'violations' of every frame. Disabled by default.
+        :param window_seconds: The duration of the window in seconds, which replaces last_frames. The frames then need
+        timestamps, which must not decrease with the frame index.
         """
+        if window_seconds is not None and window_seconds <= 0:
+            raise ValueError(f'window_seconds must be positive, got {window_seconds}')
+        if history_size is None:
+            history_size = last_frames + 1
+        if window_seconds is None and history_size < last_frames + 1:
+            raise ValueError(f'history_size must be at least last_frames + 1 = {last_frames + 1}, got {history_size}')
+
         self.__distance_threshold = distance_threshold
         self.__last_frames = last_frames
         self.__violation_percentage = violation_percentage
+        self.__sparse = sparse
+        self.__history_size = history_size
+        self.__window_seconds = window_seconds
+        # The window contains the frames with the position in (newest position - window length, newest position]
+        self.__window_length = window_seconds if window_seconds is not None else last_frames
+        # The time-weighted ratios are sums of float intervals, the frame ratios are compared exactly as before
+        self.__violation_ratio_tolerance = _EPSILON if window_seconds is not None else 0.0
         self.__distance_matrix_history = {}  # To store the distance matrix of each frame
         self.__violator_pairs_history = {}  # To store the violation pairs of each frame
-
-    def update_violation_pairs(self, frame_index: int, people_coordinates: PeopleCoordinates) -> ():
+        self.__frame_positions = {}  # frame index -> timestamp with window_seconds, otherwise the frame index
+        self.__frame_weights = {}  # frame index -> time since the previous frame with window_seconds, otherwise 1
+        self.__window_frames = deque()  # (index, weight) of the frames inside the sliding window, in increasing order
+        self.__window_weight = 0  # The total weight of the window frames
+        self.__close_frames_by_pair = {}  # pair -> deque of (index, weight) of the window frames where it was too close
+        self.__close_weight_by_pair = {}  # pair -> total weight of its close frames, only with window_seconds
+        self.__is_first_frame_weighted = window_seconds is None
+        self.__is_window_stale = False  # Whether the weights of the window frames changed
+        self.__newest_frame_index = None
+        self.__instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+
+    def update_violation_pairs(self, frame_index: int, people_coordinates: PeopleCoordinates,
+                               timestamp: float = None) -> ():
         """
         Update the violation pairs for the given frame index and people coordinates.
 
         :param frame_index: The index of the frame.
         :param people_coordinates: The coordinates of the people in the frame.
+        :param timestamp: The time of the frame in seconds, required with window_seconds and ignored otherwise.
         :return: A tuple containing all current violation pairs and new violation pairs.
+        :raises ValueError: If the frame is older than the history kept for the newest frame, see history_size.
         """
-        if frame_index not in self.__distance_matrix_history.keys():
-            self.__distance_matrix_history[frame_index] = self.__calculate_distance_matrix_for_single_frame(
-                frame_index,
-                people_coordinates
-            )
-
-        all_curr_violation_pairs = self.get_all_current_violation_pairs(frame_index)
-        new_curr_violation_pairs = self.get_new_current_violation_pairs(frame_index)
-
+        with self.__instrumentation.stage('social_distance'):
+            if frame_index not in self.__distance_matrix_history.keys():
+                oldest_frame_index = self.__get_oldest_history_frame_index()
+                if oldest_frame_index is not None and frame_index < oldest_frame_index:
+                    raise ValueError(f'The frame {frame_index} is older than the history, which starts at the frame '
+                                     f'{oldest_frame_index}')
+                self.__set_frame_position(frame_index, timestamp)
+                self.__distance_matrix_history[frame_index] = self.__calculate_distance_matrix_for_single_frame(
+                    frame_index,
+                    people_coordinates
+                )
+                self.__move_window(frame_index)
+
+            all_curr_violation_pairs = self.get_all_current_violation_pairs(frame_index)
+            new_curr_violation_pairs = self.get_new_current_violation_pairs(frame_index)
+            self.__evict_history()
+
+        self.__instrumentation.count('people', len(people_coordinates.object_ids))
+        self.__instrumentation.count('violations', len(all_curr_violation_pairs))
         return all_curr_violation_pairs, new_curr_violation_pairs
 
     def get_distance_for_pair(self, frame_index: int, pair: ()) -> float:
@@ -136,12 +416,12 @@ class SocialDistanceService:
         """
         return self.__calculate_new_current_violation_pairs(frame_index)
 
-    def get_distance_matrix(self, frame_index: int) -> DistanceMatrix:
+    def get_distance_matrix(self, frame_index: int):
         """
         Get the distance matrix for the given frame index.
 
         :param frame_index: The index of the frame.
-        :return: The distance matrix for the frame.
+        :return: The distance matrix (DistanceMatrix or SparseDistanceMatrix) for the frame.
         """
         return self.__distance_matrix_history[frame_index]
 
@@ -151,8 +431,104 @@ class SocialDistanceService:
     def get_new_current_violators_set(self, frame_index: int) -> set:
         return self.__compute_violator_set(self.get_new_current_violation_pairs(frame_index))
 
+    def get_memory_usage(self) -> dict:
+        """
+        Get the statistics of the data kept by the service. They stay flat for long-running processes.
+
+        :return: A dictionary with the number of frames in the histories, the number of frames in the sliding window,
+        the number of pairs tracked by the window and the number of bytes used by the stored distances.
+        """
+        return {
+            'distance_matrix_history_frames': len(self.__distance_matrix_history),
+            'violator_pairs_history_frames': len(self.__violator_pairs_history),
+            'window_frames': len(self.__window_frames),
+            'window_pairs': len(self.__close_frames_by_pair),
+            'distance_bytes': sum(distance_matrix.nbytes for distance_matrix in self.__distance_matrix_history.values()),
+        }
+
     # =================== Private methods ===================
 
+    def __get_oldest_history_frame_index(self):
+        """
+        Get the index of the oldest frame kept in the history for the newest frame: the frames older than the history
+        size from the newest frame are evicted, with window_seconds the frames older than the window except the last
+        one of them. None if no frame is evicted.
+        """
+        if self.__newest_frame_index is None:
+            return None
+        if self.__window_seconds is None:
+            return self.__newest_frame_index - self.__history_size + 1
+
+        window_start = self.__get_window_start(self.__newest_frame_index)
+        return max(
+            (index for index, position in self.__frame_positions.items() if position <= window_start),
+            default=None
+        )
+
+    def __evict_history(self):
+        """
+        Evict the frames older than the oldest frame of the history, see __get_oldest_history_frame_index.
+        """
+        oldest_frame_index = self.__get_oldest_history_frame_index()
+        if oldest_frame_index is None:
+            return
+
+        for history in (self.__distance_matrix_history, self.__violator_pairs_history, self.__frame_positions,
+                        self.__frame_weights):
+            for frame_index in [index for index in history if index < oldest_frame_index]:
+                del history[frame_index]
+
+    def __set_frame_position(self, frame_index: int, timestamp: float):
+        """
+        Store the position and the weight of a new frame. With window_seconds, the weight of the next frame changes too
+        if the new frame is inserted before it.
+
+        :param frame_index: The index of the frame.
+        :param timestamp: The time of the frame in seconds.
+        """
+        if self.__window_seconds is None:
+            self.__frame_positions[frame_index] = frame_index
+            self.__frame_weights[frame_index] = 1
+            return
+        if timestamp is None:
+            raise ValueError('The timestamp of the frame is required with window_seconds')
+
+        if self.__newest_frame_index is None or frame_index > self.__newest_frame_index:
+            previous_frame_index, next_frame_index = self.__newest_frame_index, None
+        else:
+            previous_frame_index = max((index for index in self.__frame_positions if index < frame_index), default=None)
+            next_frame_index = min(index for index in self.__frame_positions if index > frame_index)
+
+        if (previous_frame_index is not None and timestamp < self.__frame_positions[previous_frame_index]) or (
+                next_frame_index is not None and timestamp > self.__frame_positions[next_frame_index]):
+            raise ValueError(f'The timestamp {timestamp} of the frame {frame_index} is not in the order of the frames')
+
+        self.__frame_positions[frame_index] = timestamp
+        self.__frame_weights[frame_index] = 0.0 if previous_frame_index is None \
+            else timestamp - self.__frame_positions[previous_frame_index]
+        if next_frame_index is not None:
+            self.__frame_weights[next_frame_index] = self.__frame_positions[next_frame_index] - timestamp
+            self.__is_window_stale = True
+        if previous_frame_index is not None and not self.__is_first_frame_weighted:
+            self.__frame_weights[previous_frame_index] = self.__frame_weights[frame_index]
+            self.__is_first_frame_weighted = True
+            self.__is_window_stale = True
+
+    def __get_window_start(self, frame_index: int):
+        """
+        Get the position after which the frames are in the window which ends at the given frame.
+        """
+        return self.__frame_positions[frame_index] - self.__window_length + _EPSILON
+
+    def __get_oldest_frame_clip(self, frame_index: int, oldest_frame_index: int, oldest_frame_weight) -> float:
+        """
+        Get the part of the weight of the oldest frame of the window which is before the start of the window. It is
+        not 0 only with window_seconds, when the frame before the oldest frame is outside the window.
+        """
+        window_start = self.__frame_positions[frame_index] - self.__window_length
+        oldest_frame_start = self.__frame_positions[oldest_frame_index] - oldest_frame_weight
+        return max(window_start - oldest_frame_start, 0)
+
     def __calculate_all_current_violation_pairs(self, frame_index: int) -> set:
         """
         Calculate all current violation pairs for the given frame index.
@@ -160,47 +536,214 @@ class SocialDistanceService:
         :param frame_index: The index of the frame.
         :return: A set of all current violation pairs.
         """
-        violator_pairs = set()
+        if self.__window_frames and self.__window_frames[-1][0] == frame_index:
+            violator_pairs = self.__calculate_window_violation_pairs(frame_index)
+        else:
+            violator_pairs = self.__scan_all_current_violation_pairs(frame_index)
 
-        relevant_frames = set(range(max(0, frame_index - self.__last_frames + 1), frame_index + 1))
-        # Remove indexes that are not in the self.__distance_matrix_history.keys()
-        relevant_frames = set(relevant_frames).intersection(self.__distance_matrix_history.keys())
+        self.__violator_pairs_history[frame_index] = violator_pairs
+        return violator_pairs
+
+    def __move_window(self, frame_index: int):
+        """
+        Move the sliding window to the given frame, which was just added to the history.
 
+        Usually the frames come in increasing order, so the frame is simply appended to the window. Otherwise, or if
+        the weights of the frames changed, the window is rebuilt from the history.
+
+        :param frame_index: The index of the frame.
+        """
+        newest_frame_index = self.__newest_frame_index
+        self.__newest_frame_index = frame_index if newest_frame_index is None else max(newest_frame_index, frame_index)
+
+        if not self.__is_window_stale and ((newest_frame_index is None) or (
+                self.__window_frames and self.__window_frames[-1][0] == newest_frame_index < frame_index)):
+            self.__add_frame_to_window(frame_index)
+            return
+
+        self.__is_window_stale = False
+        self.__window_frames.clear()
+        self.__window_weight = 0
+        self.__close_frames_by_pair.clear()
+        self.__close_weight_by_pair.clear()
+        window_start = self.__get_window_start(frame_index)
+        for index in sorted(self.__distance_matrix_history):
+            if window_start < self.__frame_positions[index] and index <= frame_index:
+                self.__add_frame_to_window(index)
+
+    def __add_frame_to_window(self, frame_index: int):
+        """
+        Append the frame to the end of the sliding window and drop the frames that left the window.
+
+        :param frame_index: The index of the frame, greater than the indices of the frames in the window.
+        """
+        window_start = self.__get_window_start(frame_index)
+        weight = self.__frame_weights[frame_index]
+        self.__window_frames.append((frame_index, weight))
+        self.__window_weight += weight
+        while self.__frame_positions[self.__window_frames[0][0]] <= window_start:
+            self.__window_weight -= self.__window_frames.popleft()[1]
+
+        close_frames_by_pair = self.__close_frames_by_pair
+        close_weight_by_pair = self.__close_weight_by_pair
+        close_frame = (frame_index, weight)
+        close_pairs = self.get_distance_matrix(frame_index).get_close_pairs(self.__distance_threshold)
+        for pair in close_pairs:
+            close_frames_by_pair.setdefault(pair, deque()).append(close_frame)
+        if self.__window_seconds is not None:
+            # Without window_seconds all weights are 1 and the close weight of a pair is its number of close frames
+            for pair in close_pairs:
+                close_weight_by_pair[pair] = close_weight_by_pair.get(pair, 0) + weight
+
+    def __calculate_window_violation_pairs(self, frame_index: int) -> set:
+        """
+        Calculate all current violation pairs for the last frame of the sliding window. Only the pairs which were too
+        close at least once inside the window are checked, the frames that left the window are dropped on the way.
+        The total weights of the window and of the close frames of every pair are kept up to date, so a pair is checked
+        in constant time.
+
+        :param frame_index: The index of the last frame of the window.
+        :return: A set of all current violation pairs.
+        """
         distance_matrix = self.get_distance_matrix(frame_index)
-        for id1 in distance_matrix.id_index_map:
-            for id2 in distance_matrix.id_index_map:
-                if id1 < id2:  # To avoid duplicates
-                    distance_history = [self.get_distance_matrix(i).get_distance(id1, id2) for i in relevant_frames]
-                    filtered_distance_history = [distance for distance in distance_history if distance is not None]
-                    actual_violations_count = [
-                        distance < self.__distance_threshold
-                        for distance
-                        in filtered_distance_history
-                    ].count(True)
-
-                    if actual_violations_count / len(relevant_frames) >= self.__violation_percentage:
-                        violator_pairs.add((id1, id2))
+        if self.__violation_percentage <= 0:
+            window_frame_indices = [index for index, _ in self.__window_frames]
+            candidate_pairs = self.__get_candidate_pairs(distance_matrix, window_frame_indices)
+            self.__instrumentation.count('pairs_evaluated', len(candidate_pairs))
+            return set(candidate_pairs)
+
+        oldest_frame_index, oldest_frame_weight = self.__window_frames[0]
+        oldest_frame_clip = self.__get_oldest_frame_clip(frame_index, oldest_frame_index, oldest_frame_weight)
+        close_frames_by_pair = self.__close_frames_by_pair
+        close_weight_by_pair = self.__close_weight_by_pair
+        is_weighted = self.__window_seconds is not None
+        pairs = []
+        close_weights = []
+        for pair, close_frames in list(close_frames_by_pair.items()):
+            while close_frames and close_frames[0][0] < oldest_frame_index:
+                close_frame_weight = close_frames.popleft()[1]
+                if is_weighted:
+                    close_weight_by_pair[pair] -= close_frame_weight
+            if not close_frames:
+                del close_frames_by_pair[pair]
+                close_weight_by_pair.pop(pair, None)
+                continue
+            pairs.append(pair)
+            if not is_weighted:
+                close_weights.append(len(close_frames))
+            elif oldest_frame_clip and close_frames[0][0] == oldest_frame_index:
+                close_weights.append(close_weight_by_pair[pair] - oldest_frame_clip)
+            else:
+                close_weights.append(close_weight_by_pair[pair])
+
+        self.__instrumentation.count('pairs_evaluated', len(pairs))
+        if not pairs:
+            return set()
+
+        # Both people of the pair have to be in the current frame
+        present = np.isin(np.array(pairs), distance_matrix.object_ids).all(axis=1)
+        violation_ratios = self.__get_violation_ratios(
+            np.array(close_weights), self.__window_weight - oldest_frame_clip,
+            lambda: np.array([len(close_frames_by_pair[pair]) for pair in pairs]), len(self.__window_frames)
+        )
+        violating = present & (violation_ratios >= self.__violation_percentage - self.__violation_ratio_tolerance)
+        return {pair for pair, is_violating in zip(pairs, violating) if is_violating}
+
+    def __scan_all_current_violation_pairs(self, frame_index: int) -> set:
+        """
+        Calculate all current violation pairs for the given frame index by rescanning the distance history of every
+        pair. Used for the frames that are not at the end of the sliding window.
 
-        self.__violator_pairs_history[frame_index] = violator_pairs
+        :param frame_index: The index of the frame.
+        :return: A set of all current violation pairs.
+        """
+        violator_pairs = set()
+
+        # The frames of the history inside the window which ends at the frame
+        window_start = self.__get_window_start(frame_index)
+        relevant_frames = sorted(
+            index for index in self.__distance_matrix_history
+            if window_start < self.__frame_positions[index] and index <= frame_index
+        )
+
+        distance_matrix = self.get_distance_matrix(frame_index)
+        candidate_pairs = self.__get_candidate_pairs(distance_matrix, relevant_frames)
+        self.__instrumentation.count('pairs_evaluated', len(candidate_pairs))
+        if not candidate_pairs:
+            return violator_pairs
+
+        weights = [self.__frame_weights[i] for i in relevant_frames]
+        weights[0] -= self.__get_oldest_frame_clip(frame_index, relevant_frames[0], weights[0])
+
+        # Unknown IDs give NaN distances, which are never below the threshold
+        actual_violations_counts = np.zeros(len(candidate_pairs), dtype=int)
+        actual_violations_weights = np.zeros(len(candidate_pairs))
+        for i, weight in zip(relevant_frames, weights):
+            is_close = self.get_distance_matrix(i).get_distances(candidate_pairs) < self.__distance_threshold
+            actual_violations_counts += is_close
+            actual_violations_weights += weight * is_close
+
+        violation_ratios = self.__get_violation_ratios(
+            actual_violations_weights, sum(weights), lambda: actual_violations_counts, len(relevant_frames)
+        )
+        violating = violation_ratios >= self.__violation_percentage - self.__violation_ratio_tolerance
+        violator_pairs.update(pair for pair, is_violating in zip(candidate_pairs, violating) if is_violating)
         return violator_pairs
 
+    @staticmethod
+    def __get_violation_ratios(close_weights, window_weight, get_close_frames_counts,
+                               window_frames_count) -> np.ndarray:
+        """
+        Get the part of the window in which every pair was too close: the part of the window weight, or the part of
+        the window frames if the window has no weight (a single frame, or frames with the same timestamp).
+        """
+        if window_weight > 0:
+            return close_weights / window_weight
+        return get_close_frames_counts() / window_frames_count
+
+    def __get_candidate_pairs(self, distance_matrix, relevant_frames) -> list:
+        """
+        Get the pairs of people from the given frame which can be violation pairs.
+
+        In the sparse mode only the pairs that were close at least in one of the relevant frames are returned. It gives
+        the same result as checking all pairs as long as the violation percentage is positive.
+
+        :param distance_matrix: The distance matrix of the frame.
+        :param relevant_frames: The indices of the frames of the window.
+        :return: A list of pairs (id1, id2) with id1 < id2.
+        """
+        if not self.__sparse or self.__violation_percentage <= 0:
+            return distance_matrix.get_all_pairs()
+
+        close_pairs = set()
+        for i in relevant_frames:
+            close_pairs.update(self.get_distance_matrix(i).distances.keys())
+        if not close_pairs:
+            return []
+
+        close_pairs = list(close_pairs)
+        present = np.isin(np.array(close_pairs), distance_matrix.object_ids).all(axis=1)
+        return [pair for pair, is_present in zip(close_pairs, present) if is_present]
+
     def __calculate_new_current_violation_pairs(self, frame_index: int) -> set:
         """
-        Calculate new current violation pairs for the given frame index.
+        Calculate new current violation pairs for the given frame index: the violation pairs which were not violation
+        pairs in the previous processed frame.
 
         :param frame_index: The index of the frame.
         :return: A set of new current violation pairs.
         """
         curr_violator_pairs = self.get_all_current_violation_pairs(frame_index)
-        if frame_index == 0:
+        # The previous processed frame, which is not frame_index - 1 when frames are skipped
+        prev_frame_index = max((index for index in self.__distance_matrix_history if index < frame_index), default=None)
+        if prev_frame_index is None:
             return curr_violator_pairs
 
-        prev_violator_pairs = self.get_all_current_violation_pairs(frame_index - 1)
+        prev_violator_pairs = self.get_all_current_violation_pairs(prev_frame_index)
         new_violator_pairs = curr_violator_pairs - prev_violator_pairs
         return new_violator_pairs
 
-    def __calculate_distance_matrix_for_single_frame(self, frame_index,
-                                                     people_coordinates: PeopleCoordinates) -> DistanceMatrix:
+    def __calculate_distance_matrix_for_single_frame(self, frame_index, people_coordinates: PeopleCoordinates):
         """
         Calculate the distance matrix for a single frame.
 
@@ -208,14 +751,14 @@ class SocialDistanceService:
         :param people_coordinates: The coordinates of the people in the frame.
         :return: The distance matrix for the frame.
         """
-        distance_matrix = DistanceMatrix(people_coordinates.object_ids)
-
-        # Calculate the distance between every pair of objects and store it in the distance matrix
-        for i in range(len(people_coordinates.sb_xy)):
-            for j in range(i + 1, len(people_coordinates.sb_xy)):
-                distance = np.linalg.norm(people_coordinates.sb_xy[i] - people_coordinates.sb_xy[j])
-                distance_matrix.add_distance(people_coordinates.object_ids[i], people_coordinates.object_ids[j],
-                                             distance)
+        if self.__sparse:
+            distance_matrix = SparseDistanceMatrix.from_points(
+                people_coordinates.object_ids,
+                people_coordinates.sb_xy,
+                self.__distance_threshold
+            )
+        else:
+            distance_matrix = DistanceMatrix.from_points(people_coordinates.object_ids, people_coordinates.sb_xy)
 
         self.__distance_matrix_history[frame_index] = distance_matrix
         return distance_matrix
@@ -233,3 +776,177 @@ class SocialDistanceService:
             violator_set.add(pair[0])
             violator_set.add(pair[1])
         return violator_set
+
+
+class MultiWindowSocialDistanceService:
+    """
+    This class is a variant of SocialDistanceService which calculates the violation pairs of many
+    (last_frames, violation_percentage) configurations in one pass over the frames, for example to tune the parameters.
+
+    For every pair it keeps the frames of the longest window in which the pair was too close. The number of close
+    frames of a shorter window is the number of these frames after the start of that window, so the counts of all
+    window lengths are taken from the same frames. The violation pairs of every configuration are the same as the ones
+    of SocialDistanceService with this configuration. The frames have to come in increasing order.
+    """
+
+    def __init__(self, distance_threshold=2, last_frames_values=(5,), violation_percentages=(0.8,),
+                 sparse: bool = False):
+        """
+        Initialize the MultiWindowSocialDistanceService with the given parameters.
+
+        :param distance_threshold: The minimum distance between two people to consider it a violation.
+        :param last_frames_values: The numbers of last frames to consider for calculating the violation pairs.
+        :param violation_percentages: The minimum percentages of frames in which a pair of people violate the social
+        distance to consider them a violation pair.
+        :param sparse: If True, the pairs closer than the distance threshold are searched with a KD-tree.
+        """
+        self.__distance_threshold = distance_threshold
+        self.__last_frames_values = list(last_frames_values)
+        self.__violation_percentages = list(violation_percentages)
+        self.__sparse = sparse
+        self.__max_last_frames = max(self.__last_frames_values)
+        self.__window_frames = deque()  # The indices of the frames inside the longest window, in increasing order
+        self.__close_frames_by_pair = {}  # pair -> deque of the frames of the longest window in which it was too close
+        self.__newest_frame_index = None
+        self.__violation_pairs = {}  # configuration -> violation pairs of the newest frame
+
+    def get_configurations(self) -> list:
+        """
+        Get the evaluated configurations.
+
+        :return: A list of (last_frames, violation_percentage) tuples.
+        """
+        return [
+            (last_frames, violation_percentage)
+            for last_frames in self.__last_frames_values
+            for violation_percentage in self.__violation_percentages
+        ]
+
+    def update_violation_pairs(self, frame_index: int, people_coordinates: PeopleCoordinates) -> dict:
+        """
+        Update the violation pairs of every configuration for the given frame index and people coordinates.
+
+        :param frame_index: The index of the frame, greater than the indices of the previous frames.
+        :param people_coordinates: The coordinates of the people in the frame.
+        :return: A dictionary (last_frames, violation_percentage) -> set of all current violation pairs.
+        """
+        if self.__sparse:
+            distance_matrix = SparseDistanceMatrix.from_points(
+                people_coordinates.object_ids,
+                people_coordinates.sb_xy,
+                self.__distance_threshold
+            )
+        else:
+            distance_matrix = DistanceMatrix.from_points(people_coordinates.object_ids, people_coordinates.sb_xy)
+
+        return self.update_violation_pairs_from_close_pairs(
+            frame_index,
+            distance_matrix.object_ids,
+            distance_matrix.get_close_pairs(self.__distance_threshold)
+        )
+
+    def update_violation_pairs_from_close_pairs(self, frame_index: int, object_ids, close_pairs) -> dict:
+        """
+        Update the violation pairs of every configuration for the given frame index with the already calculated pairs
+        of people closer than the distance threshold.
+
+        :param frame_index: The index of the frame, greater than the indices of the previous frames.
+        :param object_ids: The IDs of the people in the frame.
+        :param close_pairs: The pairs (id1, id2) with id1 < id2 closer than the distance threshold.
+        :return: A dictionary (last_frames, violation_percentage) -> set of all current violation pairs.
+        """
+        if self.__newest_frame_index is not None and frame_index <= self.__newest_frame_index:
+            raise ValueError(f'Frame {frame_index} is not after the previous frame {self.__newest_frame_index}')
+        self.__newest_frame_index = frame_index
+
+        self.__window_frames.append(frame_index)
+        while self.__window_frames[0] <= frame_index - self.__max_last_frames:
+            self.__window_frames.popleft()
+        for pair in close_pairs:
+            self.__close_frames_by_pair.setdefault(pair, deque()).append(frame_index)
+
+        object_ids = np.unique(np.asarray(object_ids))
+        window_starts = frame_index - np.array(self.__last_frames_values) + 1
+        window_lengths = len(self.__window_frames) - np.searchsorted(np.array(self.__window_frames), window_starts)
+        pairs, close_frames_counts = self.__count_close_frames(object_ids, window_starts)
+
+        self.__violation_pairs = {}
+        all_pairs = None
+        for last_frames_position, last_frames in enumerate(self.__last_frames_values):
+            close_frames_ratios = close_frames_counts[:, last_frames_position] / window_lengths[last_frames_position]
+            for violation_percentage in self.__violation_percentages:
+                if violation_percentage <= 0:
+                    # Every pair of the frame violates
+                    if all_pairs is None:
+                        indices1, indices2 = np.triu_indices(len(object_ids), k=1)
+                        all_pairs = set(zip(object_ids[indices1].tolist(), object_ids[indices2].tolist()))
+                    violation_pairs = set(all_pairs)
+                else:
+                    violating = close_frames_ratios >= violation_percentage
+                    violation_pairs = {pair for pair, is_violating in zip(pairs, violating) if is_violating}
+                self.__violation_pairs[(last_frames, violation_percentage)] = violation_pairs
+
+        return self.__violation_pairs
+
+    def get_all_current_violation_pairs(self, frame_index: int, last_frames: int, violation_percentage: float) -> set:
+        """
+        Get all current violation pairs of the configuration for the newest frame.
+
+        :param frame_index: The index of the newest frame.
+        :param last_frames: The number of last frames of the configuration.
+        :param violation_percentage: The violation percentage of the configuration.
+        :return: A set of all current violation pairs.
+        """
+        if frame_index != self.__newest_frame_index:
+            raise KeyError(frame_index)
+        return self.__violation_pairs[(last_frames, violation_percentage)]
+
+    def get_all_current_violators_set(self, frame_index: int, last_frames: int, violation_percentage: float) -> set:
+        violator_set = set()
+        for pair in self.get_all_current_violation_pairs(frame_index, last_frames, violation_percentage):
+            violator_set.update(pair)
+        return violator_set
+
+    # =================== Private methods ===================
+
+    def __count_close_frames(self, object_ids: np.ndarray, window_starts: np.ndarray) -> ():
+        """
+        Count the close frames of the pairs of the current frame for every window length. The frames that left the
+        longest window are dropped on the way.
+
+        :param object_ids: The sorted IDs of the people in the frame.
+        :param window_starts: The index of the first frame of the window of every window length.
+        :return: A list of the pairs which were too close at least once in the longest window, both people of which are
+        in the frame, and an array of shape (pairs, window lengths) with the numbers of their close frames.
+        """
+        longest_window_start = self.__newest_frame_index - self.__max_last_frames + 1
+        pairs = []
+        close_frames = []
+        for pair, pair_close_frames in list(self.__close_frames_by_pair.items()):
+            while pair_close_frames and pair_close_frames[0] < longest_window_start:
+                pair_close_frames.popleft()
+            if not pair_close_frames:
+                del self.__close_frames_by_pair[pair]
+                continue
+            pairs.append(pair)
+            close_frames.append(pair_close_frames)
+
+        if not pairs:
+            return [], np.zeros((0, len(window_starts)), dtype=int)
+
+        present = np.isin(np.array(pairs), object_ids).all(axis=1)
+        pairs = [pair for pair, is_present in zip(pairs, present) if is_present]
+        close_frames = [pair_close_frames for pair_close_frames, is_present in zip(close_frames, present) if is_present]
+        if not pairs:
+            return [], np.zeros((0, len(window_starts)), dtype=int)
+
+        # The close frames of all pairs one after another, every pair starts at its offset
+        lengths = np.fromiter(map(len, close_frames), dtype=int, count=len(close_frames))
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        flat_close_frames = np.fromiter(
+            (frame for pair_close_frames in close_frames for frame in pair_close_frames),
+            dtype=np.int64,
+            count=lengths.sum()
+        )
+        inside_windows = flat_close_frames[:, np.newaxis] >= window_starts[np.newaxis, :]
+        return pairs, np.add.reduceat(inside_windows.astype(int), offsets, axis=0)
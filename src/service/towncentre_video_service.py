@@ -1,38 +1,93 @@
-import csv
+import os
+
+import numpy as np
 
 from config import GROUNDTRUTH_FILE_PATH, CAMERA_PARAMETERS_FILE_PATH, VIDEO_PATH
 from src.service.dataset_video_service import DatasetVideoService
+from src.utils.detections_store import DetectionsStore
+
+GROUNDTRUTH_CACHE_SUFFIX = '.npz'
 
 
 class TowncentreVideoService(DatasetVideoService):
-    def __init__(self):
-        super().__init__(VIDEO_PATH, GROUNDTRUTH_FILE_PATH, CAMERA_PARAMETERS_FILE_PATH)
+    """
+    The groundtruth file is parsed once and cached as arrays in a binary file next to it. The cache keeps the
+    modification time and the size of the groundtruth file and is parsed again when they change.
+    """
+
+    def __init__(self, video_path=VIDEO_PATH, groundtruth_file_path=GROUNDTRUTH_FILE_PATH,
+                 camera_parameters_file_path=CAMERA_PARAMETERS_FILE_PATH):
+        super().__init__(video_path, groundtruth_file_path, camera_parameters_file_path)
+
+    def get_groundtruth_cache_file_path(self):
+        return self.get_groundtruth_file_path() + GROUNDTRUTH_CACHE_SUFFIX
 
     def load_groundtruth_dict(self) -> dict:
-        groundtruth_dict = {}
-        with open(self.get_groundtruth_file_path(), 'r') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                object_id = int(row[0])
-                frame_id = int(row[1])
-                hx1 = float(row[4])
-                hy1 = float(row[5])
-                hx2 = float(row[6])
-                hy2 = float(row[7])
-                x1 = float(row[8])
-                y1 = float(row[9])
-                x2 = float(row[10])
-                y2 = float(row[11])
-                class_id = 0
-                confidence = 1
-                if frame_id not in groundtruth_dict:
-                    groundtruth_dict[frame_id] = []
-                groundtruth_dict[frame_id].append((object_id, x1, y1, x2, y2, (x1 + x2) / 2, y2, class_id, confidence))
-        return groundtruth_dict
+        # The object ids, the class ids and the confidences are ints, like in the groundtruth file
+        return self.get_groundtruth_store().to_dict(int_columns=('tracker_id', 'class_id', 'confidence'))
+
+    def load_groundtruth_store(self) -> DetectionsStore:
+        source_stat = os.stat(self.get_groundtruth_file_path())
+        source_key = np.array([source_stat.st_mtime_ns, source_stat.st_size], dtype=np.int64)
+
+        groundtruth_store = self.__read_groundtruth_cache(source_key)
+        if groundtruth_store is None:
+            groundtruth_store = self.parse_groundtruth_file(self.get_groundtruth_file_path())
+            self.__write_groundtruth_cache(groundtruth_store, source_key)
+        return groundtruth_store
+
+    @staticmethod
+    def parse_groundtruth_file(file_path) -> DetectionsStore:
+        """
+        Parses the groundtruth file of 'object_id,frame_id,head_valid,body_valid,hx1,hy1,hx2,hy2,x1,y1,x2,y2' lines,
+        like 'TownCentre-groundtruth.top'
+        """
+        rows = np.loadtxt(file_path, delimiter=',', ndmin=2).reshape(-1, 12)
+        x1, y1, x2, y2 = rows[:, 8], rows[:, 9], rows[:, 10], rows[:, 11]
+        class_id = np.zeros(len(rows))
+        confidence = np.ones(len(rows))
+        return DetectionsStore.from_rows(np.column_stack(
+            (rows[:, 1], rows[:, 0], x1, y1, x2, y2, (x1 + x2) / 2, y2, class_id, confidence)
+        ))
+
+    # ============= Private methods =============
+
+    def __read_groundtruth_cache(self, source_key: np.ndarray):
+        cache_file_path = self.get_groundtruth_cache_file_path()
+        if not os.path.exists(cache_file_path):
+            return None
+        with np.load(cache_file_path) as arrays:
+            if 'source_key' not in arrays or not np.array_equal(arrays['source_key'], source_key):
+                return None
+            return DetectionsStore(arrays['frame_indices'], arrays['frame_offsets'], arrays['detections'])
+
+    def __write_groundtruth_cache(self, groundtruth_store: DetectionsStore, source_key: np.ndarray) -> None:
+        cache_file_path = self.get_groundtruth_cache_file_path()
+        temp_file_path = cache_file_path + '.tmp'
+        try:
+            with open(temp_file_path, 'wb') as f:
+                np.savez(
+                    f,
+                    frame_indices=groundtruth_store.frame_indices,
+                    frame_offsets=groundtruth_store.frame_offsets,
+                    detections=groundtruth_store.detections,
+                    source_key=source_key
+                )
+            os.replace(temp_file_path, cache_file_path)
+        except OSError:
+            # The cache is optional, the groundtruth is parsed again next time
+            pass
 
     def load_camera_parameters(self) -> dict:
+        return self.parse_camera_parameters_file(self.get_camera_parameters_file_path())
+
+    @staticmethod
+    def parse_camera_parameters_file(file_path) -> dict:
+        """
+        Parses the calibration file of 'key = value' lines, like 'TownCentre-calibration.ci'
+        """
         parameters = {}
-        with open(self.get_camera_parameters_file_path(), 'r') as f:
+        with open(file_path, 'r') as f:
             lines = f.readlines()
             for line in lines:
                 key, value = line.strip().split(' = ')
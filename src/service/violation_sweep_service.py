@@ -0,0 +1,141 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.service.coordinates_converter import CoordinatesConverter
+from src.service.mot_metrics_service import MotMetricsService
+from src.service.social_distance_service import DistanceMatrix, SparseDistanceMatrix, \
+    MultiWindowSocialDistanceService
+from src.utils.detection_utils import DetectionUtils
+
+
+class SweepFrame:
+    """
+    The data of a frame shared by all configurations of a sweep: the detection rows and the pairs of people closer than
+    the distance threshold.
+    """
+
+    def __init__(self, frame_index: int, detections: np.ndarray, close_pairs: list):
+        self.frame_index = frame_index
+        self.detections = detections
+        self.close_pairs = close_pairs
+
+
+class ViolationSweepService:
+    """
+    This class evaluates the social distance validator for a grid of (last_frames, violation_percentage)
+    configurations, like SocialDistanceService with every configuration would do. The detections of every frame are
+    projected to the scene and their close pairs are found only once, then they are shared by all configurations.
+    The violators of all configurations are found in one pass over the frames with MultiWindowSocialDistanceService,
+    then the metrics of the configurations are calculated in parallel worker processes.
+    """
+
+    def __init__(self, coordinates_converter: CoordinatesConverter, distance_threshold=2, sparse: bool = False,
+                 workers: int = None):
+        """
+        Initialize the ViolationSweepService.
+
+        :param coordinates_converter: The converter of the image coordinates to the scene coordinates.
+        :param distance_threshold: The minimum distance between two people to consider it a violation.
+        :param sparse: If True, the close pairs are searched with a KD-tree, like SocialDistanceService(sparse=True).
+        :param workers: The number of worker processes, defaults to the number of CPUs. With 1 worker the
+        metrics are calculated in the current process.
+        """
+        self.__coordinates_converter = coordinates_converter
+        self.__distance_threshold = distance_threshold
+        self.__sparse = sparse
+        self.__workers = workers if workers is not None else os.cpu_count()
+
+    def prepare_frames(self, detections_dict) -> list:
+        """
+        Project the detections of every frame to the scene and find their close pairs.
+
+        :param detections_dict: A dictionary (or a DetectionsStore) frame index -> detection rows.
+        :return: A list of SweepFrame in increasing order of the frame index.
+        """
+        sweep_frames = []
+        for frame_index in sorted(detections_dict.keys()):
+            detections = np.asarray(detections_dict[frame_index], dtype=np.float64).reshape(-1, 9)
+            sb_xy = self.__coordinates_converter.convert_coordinates_to_scene_batch(detections[:, 5:7])
+            if self.__sparse:
+                distance_matrix = SparseDistanceMatrix.from_points(
+                    detections[:, 0], sb_xy, self.__distance_threshold
+                )
+            else:
+                distance_matrix = DistanceMatrix.from_points(detections[:, 0], sb_xy)
+            sweep_frames.append(SweepFrame(
+                frame_index, detections, distance_matrix.get_close_pairs(self.__distance_threshold)
+            ))
+        return sweep_frames
+
+    def sweep(self, true_detections_dict, pred_detections_dict, last_frames_values, violation_percentages) -> list:
+        """
+        Calculate MOTA and MOTP of the predicted violators against the true violators for every configuration.
+        The violators of all configurations are found in one pass over the frames.
+
+        :param true_detections_dict: The groundtruth detections, frame index -> detection rows.
+        :param pred_detections_dict: The predicted detections, frame index -> detection rows.
+        :param last_frames_values: The values of last_frames of the grid.
+        :param violation_percentages: The values of violation_percentage of the grid.
+        :return: A list of rows [last_frames, violation_percentage, mota, motp], in the order of the grid.
+        """
+        true_violators_dicts = self.get_violating_detections_dicts(
+            self.prepare_frames(true_detections_dict), last_frames_values, violation_percentages
+        )
+        pred_violators_dicts = self.get_violating_detections_dicts(
+            self.prepare_frames(pred_detections_dict), last_frames_values, violation_percentages
+        )
+        configurations = list(true_violators_dicts.keys())
+        true_violators_dicts = [true_violators_dicts[configuration] for configuration in configurations]
+        pred_violators_dicts = [pred_violators_dicts[configuration] for configuration in configurations]
+
+        if self.__workers <= 1:
+            metrics = list(map(calculate_mot_metrics, true_violators_dicts, pred_violators_dicts))
+        else:
+            with ProcessPoolExecutor(max_workers=self.__workers) as executor:
+                metrics = list(executor.map(calculate_mot_metrics, true_violators_dicts, pred_violators_dicts))
+
+        return [
+            [last_frames, violation_percentage, mota, motp]
+            for (last_frames, violation_percentage), (mota, motp) in zip(configurations, metrics)
+        ]
+
+    def get_violating_detections_dicts(self, sweep_frames: list, last_frames_values, violation_percentages) -> dict:
+        """
+        Find the detections of the violators of every frame for every configuration, in one pass over the frames with
+        MultiWindowSocialDistanceService.
+
+        :param sweep_frames: The frames prepared by prepare_frames.
+        :param last_frames_values: The values of last_frames of the grid.
+        :param violation_percentages: The values of violation_percentage of the grid.
+        :return: A dictionary (last_frames, violation_percentage) -> dictionary frame index -> list of detection rows of
+        the violators, only the frames with violators.
+        """
+        distance_service = MultiWindowSocialDistanceService(
+            self.__distance_threshold, last_frames_values, violation_percentages
+        )
+        violators_dicts = {configuration: {} for configuration in distance_service.get_configurations()}
+        for sweep_frame in sweep_frames:
+            violation_pairs = distance_service.update_violation_pairs_from_close_pairs(
+                sweep_frame.frame_index, sweep_frame.detections[:, 0], sweep_frame.close_pairs
+            )
+            for configuration, configuration_violation_pairs in violation_pairs.items():
+                violator_set = {object_id for pair in configuration_violation_pairs for object_id in pair}
+                if violator_set:
+                    violators = DetectionUtils.filter_detections_array_by_tracker_ids(
+                        sweep_frame.detections, violator_set
+                    )
+                    violators_dicts[configuration][sweep_frame.frame_index] = list(map(tuple, violators.tolist()))
+        return violators_dicts
+
+
+def calculate_mot_metrics(true_violators_dict: dict, pred_violators_dict: dict) -> tuple:
+    """
+    Calculate MOTA and MOTP of the predicted violators against the true violators of one configuration.
+    """
+    mot_metrics_service = MotMetricsService(
+        groundtruth_dict=true_violators_dict,
+        predictions_dict=pred_violators_dict
+    )
+    return mot_metrics_service.calculate_mot_metrics()
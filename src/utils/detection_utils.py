@@ -5,13 +5,55 @@ FILE_STRUCTURE = 'frame_index,tracker_id,x1,y1,x2,y2,bdcx,bdcy,class_id,confiden
 
 
 class DetectionUtils:
+    """
+    The detections of a frame are kept either as sv.Detections, as a list of row tuples or as an (N, 9) float array
+    of the same rows: tracker_id, x1, y1, x2, y2, bdcx, bdcy, class_id, confidence.
+    The conversions to sv.Detections go through the array form. The rows are built from the sv.Detections directly,
+    so the boxes and the confidences keep their dtype instead of being widened to float64.
+    """
+
+    @staticmethod
+    def convert_detections_from_sv_to_array(sv_detections: sv.Detections) -> np.ndarray:
+        xyxy = np.asarray(sv_detections.xyxy, dtype=np.float64).reshape(-1, 4)
+        detections = np.empty((len(xyxy), 9), dtype=np.float64)
+        detections[:, 0] = sv_detections.tracker_id
+        detections[:, 1:5] = xyxy
+        detections[:, 5] = (xyxy[:, 0] + xyxy[:, 2]) / 2
+        detections[:, 6] = xyxy[:, 3]
+        detections[:, 7] = sv_detections.class_id
+        detections[:, 8] = sv_detections.confidence
+        return detections
+
+    @staticmethod
+    def convert_detections_from_array_to_sv(detections: np.ndarray) -> sv.Detections:
+        """
+        The boxes and the confidences of the result are views of the array
+        """
+        detections = np.asarray(detections, dtype=np.float64).reshape(-1, 9)
+        return sv.Detections(
+            xyxy=detections[:, 1:5],
+            confidence=detections[:, 8],
+            class_id=detections[:, 7].astype(int),
+            tracker_id=detections[:, 0].astype(int)
+        )
+
     @staticmethod
     def convert_detections_from_sv_to_row(sv_detections: sv.Detections) -> []:
+        """
+        The boxes and the confidences keep the dtype of the sv.Detections, so the float32 values of YOLO are written
+        as short as they print (123.456, not 123.45600128173828)
+        """
+        xyxy = np.asarray(sv_detections.xyxy).reshape(-1, 4)
+        bottom_centers_x = (xyxy[:, 0] + xyxy[:, 2]).astype(np.float64) / 2
         return [
-            (int(tracker_id), detection[0], detection[1], detection[2], detection[3],
-             (detection[0] + detection[2]) / 2, detection[3], class_id, confidence)
-            for detection, tracker_id, confidence, class_id
-            in zip(sv_detections.xyxy, sv_detections.tracker_id, sv_detections.confidence, sv_detections.class_id)
+            (tracker_id, x1, y1, x2, y2, bdcx, y2, class_id, confidence)
+            for (x1, y1, x2, y2), bdcx, tracker_id, class_id, confidence in zip(
+                xyxy,
+                bottom_centers_x.tolist(),
+                np.asarray(sv_detections.tracker_id).astype(int).tolist(),
+                sv_detections.class_id.tolist(),
+                sv_detections.confidence
+            )
         ]
 
     @staticmethod
@@ -23,20 +65,7 @@ class DetectionUtils:
 
     @staticmethod
     def convert_detections_from_row_to_sv(row_detections: []) -> sv.Detections:
-        if len(row_detections) == 0:
-            return sv.Detections(
-                xyxy=np.empty((0, 4)),
-                confidence=np.empty(0),
-                tracker_id=np.empty(0),
-                class_id=np.empty(0),
-            )
-        else:
-            return sv.Detections(
-                xyxy=np.array([[x1, y1, x2, y2] for tracker_id, x1, y1, x2, y2, bdcx, bdcy, class_id, confidence in row_detections]),
-                confidence=np.array([class_id for tracker_id, x1, y1, x2, y2, bdcx, bdcy, class_id, confidence in row_detections]),
-                tracker_id=np.array([tracker_id for tracker_id, x1, y1, x2, y2, bdcx, bdcy, class_id, confidence in row_detections]),
-                class_id=np.array([class_id for tracker_id, x1, y1, x2, y2, bdcx, bdcy, class_id, confidence in row_detections])
-            )
+        return DetectionUtils.convert_detections_from_array_to_sv(np.array(row_detections, dtype=np.float64))
 
     @staticmethod
     def write_predictions_dict(predictions_dict: dict, file_path) -> None:
@@ -64,11 +93,48 @@ class DetectionUtils:
 
     @staticmethod
     def filter_detections_by_tracker_ids(sv_detections: sv.Detections, tracker_ids):
-        indices = [i for i, tracker_id in enumerate(sv_detections.tracker_id) if tracker_id in tracker_ids]
+        indices = DetectionUtils.get_tracker_ids_mask(sv_detections.tracker_id, tracker_ids)
         return sv.Detections(
             xyxy=sv_detections.xyxy[indices],
             mask=sv_detections.mask[indices] if sv_detections.mask is not None else None,
             confidence=sv_detections.confidence[indices] if sv_detections.confidence is not None else None,
             class_id=sv_detections.class_id[indices] if sv_detections.class_id is not None else None,
             tracker_id=sv_detections.tracker_id[indices] if sv_detections.tracker_id is not None else None
-        )
\ No newline at end of file
+        )
+
+    @staticmethod
+    def filter_detections_array_by_tracker_ids(detections: np.ndarray, tracker_ids) -> np.ndarray:
+        return detections[DetectionUtils.get_tracker_ids_mask(detections[:, 0], tracker_ids)]
+
+    @staticmethod
+    def get_tracker_ids_mask(detection_tracker_ids: np.ndarray, tracker_ids) -> np.ndarray:
+        """
+        Returns the boolean mask of the detections with the tracker id in tracker_ids.
+        For the tens of detections of a frame a set lookup is several times faster than np.isin,
+        which sorts both arrays
+        """
+        if not isinstance(tracker_ids, (set, frozenset)):
+            tracker_ids = set(np.asarray(tracker_ids).tolist())
+        return np.fromiter(
+            (tracker_id in tracker_ids for tracker_id in detection_tracker_ids.tolist()),
+            dtype=bool,
+            count=len(detection_tracker_ids)
+        )
+
+    @staticmethod
+    def calculate_iou_matrix(boxes1, boxes2) -> np.ndarray:
+        """
+        Calculates intersection over union for every pair of boxes given as (x1, y1, x2, y2) rows.
+        Returns a matrix of shape (len(boxes1), len(boxes2))
+        """
+        boxes1 = np.asarray(boxes1, dtype=float).reshape(-1, 4)
+        boxes2 = np.asarray(boxes2, dtype=float).reshape(-1, 4)
+
+        top_left = np.maximum(boxes1[:, np.newaxis, :2], boxes2[np.newaxis, :, :2])
+        bottom_right = np.minimum(boxes1[:, np.newaxis, 2:], boxes2[np.newaxis, :, 2:])
+        intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+
+        area1 = np.prod(boxes1[:, 2:] - boxes1[:, :2], axis=1)
+        area2 = np.prod(boxes2[:, 2:] - boxes2[:, :2], axis=1)
+        union = area1[:, np.newaxis] + area2[np.newaxis, :] - intersection
+        return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
@@ -0,0 +1,261 @@
+import itertools
+import os
+import struct
+import zipfile
+
+import numpy as np
+import supervision as sv
+
+from src.utils.detection_utils import DetectionUtils, FILE_STRUCTURE
+
+DETECTION_COLUMNS = FILE_STRUCTURE.split(',')[1:]  # tracker_id, x1, y1, x2, y2, bdcx, bdcy, class_id, confidence
+CSV_FORMAT = ['%d'] + ['%.15g'] * len(DETECTION_COLUMNS)
+
+
+class DetectionsStore:
+    """
+    This class keeps the detections of many frames in a columnar form: a single (N, 9) float array with the detection
+    rows of all frames, ordered by frame, and a frame index - the sorted frame indices and the offset of the first row
+    of every frame. The store is saved to and loaded from a .npz file in bulk.
+
+    It can be used in place of the predictions dictionary: store[frame_index] returns the (n, 9) rows of the frame
+    as a view, with the columns of FILE_STRUCTURE after frame_index. A store loaded with mmap=True reads the arrays
+    lazily from the file, so its startup time and resident memory do not depend on the file length.
+    """
+
+    def __init__(self, frame_indices, frame_offsets, detections):
+        """
+        Initialize the DetectionsStore with the given arrays.
+
+        :param frame_indices: The sorted indices of the frames.
+        :param frame_offsets: The offsets of the first row of every frame, plus the total number of rows at the end.
+        :param detections: The (N, 9) array of detection rows ordered by frame.
+        """
+        self.frame_indices = np.asanyarray(frame_indices, dtype=np.int64)
+        self.frame_offsets = np.asanyarray(frame_offsets, dtype=np.int64)
+        self.detections = np.asanyarray(detections, dtype=np.float64).reshape(-1, len(DETECTION_COLUMNS))
+
+    @classmethod
+    def from_dict(cls, detections_dict: dict):
+        """
+        Create the store from a dictionary frame index -> list of detection rows, like the predictions dictionary.
+        """
+        frame_indices = sorted(detections_dict.keys())
+        frame_offsets = np.zeros(len(frame_indices) + 1, dtype=np.int64)
+        frame_offsets[1:] = np.cumsum([len(detections_dict[frame_index]) for frame_index in frame_indices])
+        detections = np.array(
+            [detection for frame_index in frame_indices for detection in detections_dict[frame_index]],
+            dtype=np.float64
+        )
+        return cls(frame_indices, frame_offsets, detections)
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray):
+        """
+        Create the store from an (N, 10) array of rows laid out as FILE_STRUCTURE, with the frame index first.
+        """
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(DETECTION_COLUMNS) + 1)
+        rows = rows[np.argsort(rows[:, 0], kind='stable')]
+        frame_indices, first_rows = np.unique(rows[:, 0].astype(np.int64), return_index=True)
+        frame_offsets = np.append(first_rows, len(rows))
+        return cls(frame_indices, frame_offsets, rows[:, 1:])
+
+    @classmethod
+    def read_csv(cls, file_path):
+        """
+        Read the predictions file written by DetectionUtils.write_predictions_dict.
+        """
+        with open(file_path, 'r') as f:
+            file_structure = f.readline().strip()
+            if file_structure != FILE_STRUCTURE:
+                raise ValueError(
+                    f'Unexpected file structure: {file_structure}. Expected: {FILE_STRUCTURE}')
+            rows = np.loadtxt(f, delimiter=',', ndmin=2)
+        return cls.from_rows(rows)
+
+    @classmethod
+    def convert_csv(cls, csv_file_path, npz_file_path, chunk_rows: int = 100000) -> None:
+        """
+        Convert the predictions file to the .npz file of save without reading it into memory. The file is read
+        chunk_rows rows at a time, the rows are appended to a temporary raw file next to the .npz file, which is
+        memory-mapped when saved. Only the frame index grows with the length of the file.
+        The rows must be in the order of the frames, as PredictionsWriter and DetectionUtils.write_predictions_dict
+        write them.
+        """
+        rows_file_path = npz_file_path + '.rows.tmp'
+        frame_indices, frame_counts = [], []
+        rows_count = 0
+        try:
+            with open(csv_file_path, 'r') as f, open(rows_file_path, 'wb') as rows_file:
+                file_structure = f.readline().strip()
+                if file_structure != FILE_STRUCTURE:
+                    raise ValueError(
+                        f'Unexpected file structure: {file_structure}. Expected: {FILE_STRUCTURE}')
+                while True:
+                    lines = list(itertools.islice(f, chunk_rows))
+                    if not lines:
+                        break
+                    rows = np.loadtxt(lines, delimiter=',', ndmin=2).reshape(-1, len(DETECTION_COLUMNS) + 1)
+                    chunk_frame_indices = rows[:, 0].astype(np.int64)
+                    previous_frame_index = frame_indices[-1] if frame_indices else chunk_frame_indices[0]
+                    if chunk_frame_indices[0] < previous_frame_index or np.any(np.diff(chunk_frame_indices) < 0):
+                        raise ValueError(f'The rows of {csv_file_path} are not in the order of the frames')
+
+                    chunk_frame_indices, chunk_frame_counts = np.unique(chunk_frame_indices, return_counts=True)
+                    chunk_frame_indices, chunk_frame_counts = chunk_frame_indices.tolist(), chunk_frame_counts.tolist()
+                    if frame_indices and frame_indices[-1] == chunk_frame_indices[0]:
+                        # The frame continues from the previous chunk
+                        frame_counts[-1] += chunk_frame_counts.pop(0)
+                        chunk_frame_indices.pop(0)
+                    frame_indices += chunk_frame_indices
+                    frame_counts += chunk_frame_counts
+
+                    np.ascontiguousarray(rows[:, 1:]).tofile(rows_file)
+                    rows_count += len(rows)
+
+            frame_offsets = np.zeros(len(frame_indices) + 1, dtype=np.int64)
+            frame_offsets[1:] = np.cumsum(frame_counts)
+            if rows_count > 0:
+                detections = np.memmap(rows_file_path, dtype=np.float64, mode='r',
+                                       shape=(rows_count, len(DETECTION_COLUMNS)))
+            else:
+                detections = np.empty((0, len(DETECTION_COLUMNS)))
+            cls(frame_indices, frame_offsets, detections).save(npz_file_path)
+            del detections
+        finally:
+            if os.path.exists(rows_file_path):
+                os.remove(rows_file_path)
+
+    @classmethod
+    def load(cls, file_path, mmap: bool = False):
+        """
+        Load the store from the .npz file written by save.
+
+        :param file_path: The path of the file.
+        :param mmap: If True, the arrays are memory-mapped read-only instead of being read into memory.
+        """
+        if mmap:
+            return cls(*[
+                cls.__memmap_npz_array(file_path, name)
+                for name in ['frame_indices', 'frame_offsets', 'detections']
+            ])
+
+        with np.load(file_path) as arrays:
+            return cls(arrays['frame_indices'], arrays['frame_offsets'], arrays['detections'])
+
+    def save(self, file_path) -> None:
+        """
+        Save the store to a .npz file.
+        """
+        np.savez(
+            file_path,
+            frame_indices=self.frame_indices,
+            frame_offsets=self.frame_offsets,
+            detections=self.detections
+        )
+
+    def write_csv(self, file_path) -> None:
+        """
+        Write the store as a predictions file readable by DetectionUtils.read_predictions_dict.
+        """
+        with open(file_path, 'w') as f:
+            f.write(FILE_STRUCTURE + '\n')
+            np.savetxt(f, self.to_rows(), fmt=CSV_FORMAT, delimiter=',')
+
+    def get_sv_detections(self, frame_index) -> sv.Detections:
+        """
+        Get the detections of the frame in the supervision format. The boxes are a view of the store.
+        """
+        return DetectionUtils.convert_detections_from_array_to_sv(self[frame_index])
+
+    def to_rows(self) -> np.ndarray:
+        """
+        Get the (N, 10) array of rows laid out as FILE_STRUCTURE, with the frame index first.
+        """
+        frame_column = np.repeat(self.frame_indices, np.diff(self.frame_offsets))
+        return np.column_stack((frame_column, self.detections))
+
+    def to_dict(self, int_columns=()) -> dict:
+        """
+        Get the dictionary frame index -> list of detection tuples, like DetectionUtils.read_predictions_dict.
+
+        :param int_columns: The names of the columns (see DETECTION_COLUMNS) given as ints, e.g. the tracker_id of
+        the groundtruth. The other columns are floats.
+        """
+        if int_columns:
+            detections = list(zip(*[
+                self.detections[:, position].astype(np.int64).tolist() if name in int_columns
+                else self.detections[:, position].tolist()
+                for position, name in enumerate(DETECTION_COLUMNS)
+            ]))
+        else:
+            detections = list(map(tuple, self.detections.tolist()))
+        frame_offsets = self.frame_offsets.tolist()
+        return {
+            frame_index: detections[frame_offsets[position]:frame_offsets[position + 1]]
+            for position, frame_index in enumerate(self.frame_indices.tolist())
+        }
+
+    def keys(self) -> list:
+        return self.frame_indices.tolist()
+
+    def items(self):
+        for frame_index in self.keys():
+            yield frame_index, self[frame_index]
+
+    def __len__(self) -> int:
+        return len(self.frame_indices)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __contains__(self, frame_index) -> bool:
+        return self.__find_frame(frame_index) is not None
+
+    def __getitem__(self, frame_index) -> np.ndarray:
+        position = self.__find_frame(frame_index)
+        if position is None:
+            raise KeyError(frame_index)
+        return self.detections[self.frame_offsets[position]:self.frame_offsets[position + 1]]
+
+    # =================== Private methods ===================
+
+    @staticmethod
+    def __memmap_npz_array(file_path, name) -> np.ndarray:
+        """
+        Memory-map an array of an uncompressed .npz file. Such an array is an .npy file stored as is inside the zip
+        archive, so it is mapped at the offset of its data in the archive.
+        """
+        with zipfile.ZipFile(file_path) as zip_file:
+            info = zip_file.getinfo(name + '.npy')
+        if info.compress_type != zipfile.ZIP_STORED:
+            raise ValueError(f'Array {name} of {file_path} is compressed and can not be memory-mapped')
+
+        with open(file_path, 'rb') as f:
+            # The zip local file header: 30 bytes, then the file name and the extra field
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            elif version == (2, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            else:
+                raise ValueError(f'Unsupported .npy format version {version} of array {name} of {file_path}')
+            offset = f.tell()
+
+        if np.prod(shape) == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(file_path, dtype=dtype, mode='r', offset=offset, shape=shape,
+                         order='F' if fortran_order else 'C')
+
+    def __find_frame(self, frame_index):
+        """
+        Find the position of the frame in the frame index with a binary search, None if there is no such frame.
+        """
+        position = np.searchsorted(self.frame_indices, frame_index)
+        if position < len(self.frame_indices) and self.frame_indices[position] == frame_index:
+            return position
+        return None
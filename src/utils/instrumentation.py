@@ -0,0 +1,295 @@
+import csv
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class _NullStage:
+    """
+    The context manager returned by a disabled Instrumentation, it does nothing.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """
+    The context manager which adds its duration to the stage time of the current frame.
+    """
+    __slots__ = ('instrumentation', 'name', 'start')
+
+    def __init__(self, instrumentation, name: str):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.instrumentation.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Instrumentation:
+    """
+    This class collects the per-frame time of the processing stages (decoding, detection, tracking, projection, ...)
+    and per-frame counters (people, evaluated pairs, violations), to find the hot paths of a running pipeline without
+    a profiler.
+
+    The stages and the counters are recorded into the current frame until end_frame is called. The latest frames are
+    kept for the rolling summary, and all frames (or the latest trace_size frames) for the trace file. The listeners
+    get every finished frame, e.g. to export live metrics.
+    A disabled instance records nothing: stage returns a shared no-op context manager and count returns immediately,
+    so the instrumented code can always call them.
+    """
+
+    def __init__(self, enabled: bool = False, window_size: int = 100, trace_size: int = None):
+        """
+        Initialize the Instrumentation.
+
+        :param enabled: Whether the stages and the counters are recorded.
+        :param window_size: The number of the latest frames summarized by get_summary.
+        :param trace_size: The number of the latest frames kept for export_trace, all frames by default.
+        """
+        self.enabled = enabled
+        self.__window = deque(maxlen=window_size)
+        self.__trace = deque(maxlen=trace_size)
+        self.__total_frames = 0
+        self.__total_counters = {}
+        self.__stage_seconds = {}  # The stage times of the current frame
+        self.__counters = {}  # The counters of the current frame
+        self.__frame_start = None
+        self.__listeners = []
+        self.__lock = threading.Lock()
+
+    def stage(self, name: str):
+        """
+        Time the code inside the with statement as the stage of the current frame. The times of the same stage
+        are added up within a frame.
+
+        :param name: The name of the stage.
+        :return: A context manager.
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def iterate(self, name: str, iterable):
+        """
+        Time getting every item of the iterable as the stage of the current frame, e.g. decoding the video frames.
+
+        :param name: The name of the stage.
+        :param iterable: The iterable.
+        :return: The iterable itself if the instrumentation is disabled, otherwise a generator of its items.
+        """
+        if not self.enabled:
+            return iterable
+        return self.__iterate(name, iterable)
+
+    def add_time(self, name: str, seconds: float):
+        """
+        Add the time to the stage of the current frame.
+
+        :param name: The name of the stage.
+        :param seconds: The time in seconds.
+        """
+        if not self.enabled:
+            return
+        with self.__lock:
+            self.__start_frame(seconds)
+            self.__stage_seconds[name] = self.__stage_seconds.get(name, 0.0) + seconds
+
+    def count(self, name: str, value=1):
+        """
+        Add the value to the counter of the current frame.
+
+        :param name: The name of the counter.
+        :param value: The value to add.
+        """
+        if not self.enabled:
+            return
+        with self.__lock:
+            self.__start_frame()
+            self.__counters[name] = self.__counters.get(name, 0) + value
+
+    def add_listener(self, listener):
+        """
+        Add the function called with every finished frame, in the thread which finished it.
+
+        :param listener: A function listener(frame_index, stage_seconds, counters), where stage_seconds is a dictionary
+        stage name -> seconds and counters a dictionary counter name -> value of the frame.
+        """
+        self.__listeners.append(listener)
+
+    def end_frame(self, frame_index: int):
+        """
+        Finish the current frame: its stages and counters are stored with the frame time, which is the time since
+        the previous frame was finished (or since the first record of the first frame).
+
+        :param frame_index: The index of the frame.
+        """
+        if not self.enabled:
+            return
+        end = time.perf_counter()
+        with self.__lock:
+            frame = {
+                'frame_index': frame_index,
+                'frame_seconds': end - self.__frame_start if self.__frame_start is not None else 0.0,
+                'stage_seconds': self.__stage_seconds,
+                'counters': self.__counters,
+            }
+            self.__window.append(frame)
+            self.__trace.append(frame)
+            self.__total_frames += 1
+            for name, value in self.__counters.items():
+                self.__total_counters[name] = self.__total_counters.get(name, 0) + value
+            self.__stage_seconds = {}
+            self.__counters = {}
+            self.__frame_start = end
+
+        for listener in self.__listeners:
+            listener(frame_index, frame['stage_seconds'], frame['counters'])
+
+    def get_summary(self) -> dict:
+        """
+        Summarize the latest frames, see window_size. The stages and counters missing in a frame count as 0.
+
+        :return: A dictionary with the number of summarized frames, the frames per second, the frame time statistics,
+        per stage the time statistics in milliseconds and the share of the frame time, per counter the mean and the
+        maximum per frame and the total of all frames since the start.
+        """
+        with self.__lock:
+            frames = list(self.__window)
+            total_frames = self.__total_frames
+            total_counters = dict(self.__total_counters)
+
+        frame_seconds = np.array([frame['frame_seconds'] for frame in frames])
+        total_seconds = float(frame_seconds.sum())
+        summary = {
+            'frames': len(frames),
+            'total_frames': total_frames,
+            'fps': len(frames) / total_seconds if total_seconds > 0 else 0.0,
+            'frame_ms': self.__get_statistics(frame_seconds * 1000),
+            'stages': {},
+            'counters': {},
+        }
+
+        for name in self.__get_names(frames, 'stage_seconds'):
+            stage_seconds = np.array([frame['stage_seconds'].get(name, 0.0) for frame in frames])
+            summary['stages'][name] = self.__get_statistics(stage_seconds * 1000)
+            summary['stages'][name]['share'] = float(stage_seconds.sum()) / total_seconds if total_seconds > 0 else 0.0
+
+        for name in self.__get_names(frames, 'counters'):
+            values = np.array([frame['counters'].get(name, 0) for frame in frames])
+            summary['counters'][name] = {
+                'mean': float(values.mean()),
+                'max': values.max().item(),
+                'total': total_counters[name],
+            }
+        return summary
+
+    @staticmethod
+    def format_summary(summary: dict) -> str:
+        """
+        Format the summary returned by get_summary as a human-readable table.
+
+        :param summary: The summary.
+        :return: The formatted summary.
+        """
+        lines = [f'{"stage":<16} {"mean, ms":>9} {"p50, ms":>9} {"p95, ms":>9} {"max, ms":>9} {"share":>6}']
+        for name, stage in summary['stages'].items():
+            lines.append(f'{name:<16} {stage["mean"]:>9.2f} {stage["p50"]:>9.2f} {stage["p95"]:>9.2f} '
+                         f'{stage["max"]:>9.2f} {stage["share"]:>6.0%}')
+        lines.append(f'{"counter":<16} {"mean":>9} {"max":>9} {"total":>9}')
+        for name, counter in summary['counters'].items():
+            lines.append(f'{name:<16} {counter["mean"]:>9.1f} {counter["max"]:>9} {counter["total"]:>9}')
+        lines.append(f'frames: {summary["frames"]} of {summary["total_frames"]}, '
+                     f'frame time: {summary["frame_ms"]["mean"]:.2f} ms, fps: {summary["fps"]:.1f}')
+        return '\n'.join(lines)
+
+    def export_trace(self, file_path):
+        """
+        Write a row per traced frame with the frame index, the frame time and the stage times in milliseconds
+        (columns frame_ms and <stage>_ms) and the counters. The file is JSON if its extension is .json, otherwise CSV.
+
+        :param file_path: The path of the trace file.
+        """
+        with self.__lock:
+            frames = list(self.__trace)
+
+        stage_names = self.__get_names(frames, 'stage_seconds')
+        counter_names = self.__get_names(frames, 'counters')
+        rows = [
+            {
+                'frame_index': frame['frame_index'],
+                'frame_ms': frame['frame_seconds'] * 1000,
+                **{f'{name}_ms': frame['stage_seconds'].get(name, 0.0) * 1000 for name in stage_names},
+                **{name: frame['counters'].get(name, 0) for name in counter_names},
+            }
+            for frame in frames
+        ]
+
+        if str(file_path).endswith('.json'):
+            with open(file_path, 'w') as f:
+                json.dump(rows, f)
+            return
+
+        columns = ['frame_index', 'frame_ms'] + [f'{name}_ms' for name in stage_names] + counter_names
+        with open(file_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    # =================== Private methods ===================
+
+    def __iterate(self, name, iterable):
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.add_time(name, time.perf_counter() - start)
+            yield item
+
+    def __start_frame(self, elapsed_seconds=0.0):
+        """
+        Mark the start of the first frame at its first record, the time of a recorded stage is already elapsed.
+        """
+        if self.__frame_start is None:
+            self.__frame_start = time.perf_counter() - elapsed_seconds
+
+    @staticmethod
+    def __get_names(frames, key) -> list:
+        """
+        Get the names of the stages or the counters of the frames, in the order of their first appearance.
+        """
+        names = {}
+        for frame in frames:
+            names.update(dict.fromkeys(frame[key]))
+        return list(names)
+
+    @staticmethod
+    def __get_statistics(values: np.ndarray) -> dict:
+        if len(values) == 0:
+            return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+        return {
+            'mean': float(values.mean()),
+            'p50': float(np.percentile(values, 50)),
+            'p95': float(np.percentile(values, 95)),
+            'max': float(values.max()),
+        }
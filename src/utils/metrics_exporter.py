@@ -0,0 +1,208 @@
+import bisect
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# The upper bounds of the stage latency histogram buckets, in seconds
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class MetricsExporter:
+    """
+    This class serves the live metrics of the processing loop in the Prometheus text exposition format: the number of
+    processed frames and the FPS, a latency histogram per stage, and per counter of the frame (tracks, people,
+    violations, ...) its value in the latest frame and its total. The ratio of the latest frames with violations
+    is exported as the violation rate.
+
+    The loop feeds it frame by frame with observe_frame, usually as a listener of an enabled Instrumentation.
+    The endpoint is served on GET /metrics by a background thread between start and stop.
+    """
+
+    def __init__(self, port: int = 9100, host: str = '127.0.0.1', namespace: str = 'cvsdc',
+                 latency_buckets=DEFAULT_LATENCY_BUCKETS, window_size: int = 100):
+        """
+        Initialize the MetricsExporter.
+
+        :param port: The port of the endpoint, 0 to let the system choose a free one.
+        :param host: The address of the endpoint, local only by default.
+        :param namespace: The prefix of the metric names.
+        :param latency_buckets: The increasing upper bounds of the latency histogram buckets, in seconds.
+        :param window_size: The number of the latest frames used for the FPS and the violation rate.
+        """
+        self.__host = host
+        self.__port = port
+        self.__namespace = namespace
+        self.__latency_buckets = tuple(latency_buckets)
+        self.__frame_times = deque(maxlen=window_size)  # The time at which every of the latest frames was observed
+        self.__violating_frames = deque(maxlen=window_size)  # Whether every of the latest frames had violations
+        self.__frames_total = 0
+        self.__last_frame_index = None
+        self.__stage_histograms = {}  # stage name -> {'buckets': counts per bucket, 'sum': seconds, 'count': count}
+        self.__last_counters = {}
+        self.__total_counters = {}
+        self.__lock = threading.Lock()
+        self.__server = None
+        self.__thread = None
+
+    @property
+    def port(self) -> int:
+        """
+        The port of the endpoint, the chosen one if the exporter was started with port 0.
+        """
+        return self.__port
+
+    def observe_frame(self, frame_index: int, stage_seconds: dict, counters: dict):
+        """
+        Record a processed frame. The signature matches the listeners of Instrumentation.
+
+        :param frame_index: The index of the frame.
+        :param stage_seconds: A dictionary stage name -> time of the stage in the frame, in seconds.
+        :param counters: A dictionary counter name -> value in the frame.
+        """
+        with self.__lock:
+            self.__frame_times.append(time.monotonic())
+            self.__frames_total += 1
+            self.__last_frame_index = frame_index
+
+            for name, seconds in stage_seconds.items():
+                histogram = self.__stage_histograms.setdefault(
+                    name, {'buckets': [0] * (len(self.__latency_buckets) + 1), 'sum': 0.0, 'count': 0}
+                )
+                histogram['buckets'][bisect.bisect_left(self.__latency_buckets, seconds)] += 1
+                histogram['sum'] += seconds
+                histogram['count'] += 1
+
+            for name in self.__last_counters.keys() - counters.keys():
+                self.__last_counters[name] = 0
+            for name, value in counters.items():
+                self.__last_counters[name] = value
+                self.__total_counters[name] = self.__total_counters.get(name, 0) + value
+            self.__violating_frames.append(counters.get('violations', 0) > 0)
+
+    def render(self) -> str:
+        """
+        Render the current metrics in the Prometheus text exposition format.
+
+        :return: The exposition text.
+        """
+        prefix = self.__namespace
+        with self.__lock:
+            lines = [
+                f'# HELP {prefix}_frames_total The number of processed frames.',
+                f'# TYPE {prefix}_frames_total counter',
+                f'{prefix}_frames_total {self.__frames_total}',
+                f'# HELP {prefix}_fps The processed frames per second over the latest frames.',
+                f'# TYPE {prefix}_fps gauge',
+                f'{prefix}_fps {self.__get_fps()}',
+            ]
+            if self.__last_frame_index is not None:
+                lines += [
+                    f'# HELP {prefix}_last_frame_index The index of the latest processed frame.',
+                    f'# TYPE {prefix}_last_frame_index gauge',
+                    f'{prefix}_last_frame_index {self.__last_frame_index}',
+                ]
+
+            if self.__stage_histograms:
+                lines += [
+                    f'# HELP {prefix}_stage_latency_seconds The time of a processing stage per frame.',
+                    f'# TYPE {prefix}_stage_latency_seconds histogram',
+                ]
+            for name, histogram in self.__stage_histograms.items():
+                label = f'stage="{self.__escape(name)}"'
+                cumulative_count = 0
+                for bound, count in zip(self.__latency_buckets + (float('inf'),), histogram['buckets']):
+                    cumulative_count += count
+                    lines.append(f'{prefix}_stage_latency_seconds_bucket{{{label},le="{self.__format_bound(bound)}"}}'
+                                 f' {cumulative_count}')
+                lines.append(f'{prefix}_stage_latency_seconds_sum{{{label}}} {histogram["sum"]}')
+                lines.append(f'{prefix}_stage_latency_seconds_count{{{label}}} {histogram["count"]}')
+
+            for name, value in self.__last_counters.items():
+                lines += [
+                    f'# HELP {prefix}_{name} The {name} in the latest frame.',
+                    f'# TYPE {prefix}_{name} gauge',
+                    f'{prefix}_{name} {value}',
+                    f'# HELP {prefix}_{name}_total The {name} summed over all frames.',
+                    f'# TYPE {prefix}_{name}_total counter',
+                    f'{prefix}_{name}_total {self.__total_counters[name]}',
+                ]
+
+            violation_rate = sum(self.__violating_frames) / len(self.__violating_frames) \
+                if self.__violating_frames else 0.0
+            lines += [
+                f'# HELP {prefix}_violation_rate The ratio of the latest frames with violations.',
+                f'# TYPE {prefix}_violation_rate gauge',
+                f'{prefix}_violation_rate {violation_rate}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+    def start(self) -> int:
+        """
+        Start serving the endpoint in a background thread.
+
+        :return: The port of the endpoint.
+        """
+        if self.__server is not None:
+            raise RuntimeError('The metrics exporter is already started')
+
+        exporter = self
+
+        class MetricsRequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes are too frequent to log
+
+        self.__server = ThreadingHTTPServer((self.__host, self.__port), MetricsRequestHandler)
+        self.__server.daemon_threads = True
+        self.__port = self.__server.server_address[1]
+        self.__thread = threading.Thread(target=self.__server.serve_forever, name='metrics-exporter', daemon=True)
+        self.__thread.start()
+        return self.__port
+
+    def stop(self):
+        """
+        Stop serving the endpoint and wait for the background thread.
+        """
+        if self.__server is None:
+            return
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__thread.join()
+        self.__server = None
+        self.__thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    # =================== Private methods ===================
+
+    def __get_fps(self) -> float:
+        if len(self.__frame_times) < 2:
+            return 0.0
+        seconds = self.__frame_times[-1] - self.__frame_times[0]
+        return (len(self.__frame_times) - 1) / seconds if seconds > 0 else 0.0
+
+    @staticmethod
+    def __format_bound(bound) -> str:
+        return '+Inf' if bound == float('inf') else repr(float(bound))
+
+    @staticmethod
+    def __escape(label_value: str) -> str:
+        return label_value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
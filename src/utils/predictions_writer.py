@@ -0,0 +1,129 @@
+import os
+
+from src.utils.detection_utils import FILE_STRUCTURE
+
+
+class PredictionsWriter:
+    """
+    This class writes the predictions file incrementally, in the format of DetectionUtils.write_predictions_dict.
+    The rows of the frames are buffered and appended to the file in chunks of chunk_size frames, every chunk is
+    flushed to the disk, so the memory does not grow with the video length and an interrupted job keeps its progress.
+
+    With resume=True the writer continues an existing file. The last frame of the file may be incomplete, so it is
+    removed together with a partially written line, and start_frame_index is the frame from which the tracking has
+    to be restarted. The tracker of the restarted job numbers its tracks from 1 again, so its tracker ids are shifted
+    by tracker_id_offset, the greatest tracker id kept in the file.
+    """
+
+    def __init__(self, file_path, chunk_size: int = 100, resume: bool = False):
+        """
+        Initialize the PredictionsWriter and open the file.
+
+        :param file_path: The path of the predictions file.
+        :param chunk_size: The number of frames buffered before they are appended to the file.
+        :param resume: If True, an existing file is continued, otherwise it is overwritten.
+        """
+        if chunk_size < 1:
+            raise ValueError(f'chunk_size must be positive, got {chunk_size}')
+
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.start_frame_index = 0
+        self.tracker_id_offset = 0
+        self.last_flushed_frame_index = None
+
+        self.__buffer = []
+        self.__buffered_frames = 0
+        self.__last_frame_index = None
+
+        if resume and os.path.exists(file_path) and self.__recover():
+            self.__file = open(file_path, 'a')
+        else:
+            self.__file = open(file_path, 'w')
+            self.__file.write(FILE_STRUCTURE + '\n')
+            self.__sync()
+
+    def write(self, frame_index, detections) -> None:
+        """
+        Add the detection rows of the frame, laid out as DetectionUtils.convert_detections_from_sv_to_row returns them.
+        Frames without detections are not stored in the file.
+        """
+        for tracker_id, *detection in detections:
+            self.__buffer.append(
+                str(frame_index) + ',' + ','.join(map(str, [tracker_id + self.tracker_id_offset, *detection])) + '\n'
+            )
+        self.__buffered_frames += 1
+        self.__last_frame_index = frame_index
+
+        if self.__buffered_frames >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Append the buffered frames to the file and flush them to the disk.
+        """
+        if self.__buffered_frames == 0:
+            return
+        self.__file.writelines(self.__buffer)
+        self.__sync()
+        self.last_flushed_frame_index = self.__last_frame_index
+        self.__buffer = []
+        self.__buffered_frames = 0
+
+    def close(self) -> None:
+        """
+        Flush the buffered frames and close the file.
+        """
+        if self.__file.closed:
+            return
+        self.flush()
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # ============= Private methods =============
+
+    def __sync(self) -> None:
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+
+    def __recover(self) -> bool:
+        """
+        Cut the existing file after the last complete frame and set the resume state.
+        Returns False if the file has no complete header and has to be written from scratch.
+        """
+        with open(self.file_path, 'rb') as f:
+            header = f.readline()
+            if not header.endswith(b'\n'):
+                return False
+            file_structure = header.decode().strip()
+            if file_structure != FILE_STRUCTURE:
+                raise ValueError(f'Unexpected file structure: {file_structure}. Expected: {FILE_STRUCTURE}')
+
+            end_offset = len(header)
+            kept_frame_index, last_frame_index, last_frame_offset = None, None, end_offset
+            kept_max_tracker_id, frame_max_tracker_id = 0, 0
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                frame_index, tracker_id = map(lambda value: int(float(value)), line.split(b',')[:2])
+                if frame_index != last_frame_index:
+                    kept_max_tracker_id = max(kept_max_tracker_id, frame_max_tracker_id)
+                    frame_max_tracker_id = 0
+                    kept_frame_index = last_frame_index
+                    last_frame_index, last_frame_offset = frame_index, end_offset
+                frame_max_tracker_id = max(frame_max_tracker_id, tracker_id)
+                end_offset += len(line)
+
+        # The last frame may be cut by the interruption, it is tracked again
+        with open(self.file_path, 'r+b') as f:
+            f.truncate(last_frame_offset)
+
+        self.start_frame_index = 0 if last_frame_index is None else last_frame_index
+        self.tracker_id_offset = kept_max_tracker_id
+        self.last_flushed_frame_index = kept_frame_index
+        return True
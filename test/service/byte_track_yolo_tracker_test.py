@@ -1,6 +1,7 @@
 import unittest
 from unittest.mock import patch, MagicMock
 import numpy as np
+import supervision as sv
 
 from src.service.byte_track_yolo_tracker import ByteTrackYOLOTracker
 
@@ -33,6 +34,95 @@ class TestByteTrackYOLOTracker(unittest.TestCase):
 
         mock_from_ultralytics.assert_called_once()
 
+    @patch('src.service.byte_track_yolo_tracker.sv.Detections.from_ultralytics', autospec=True)
+    def test_update_tracker_batch(self, mock_from_ultralytics):
+        fake_frames = [np.random.rand(480, 640, 3) for _ in range(3)]
+        mock_from_ultralytics.side_effect = lambda ultralytics_detections: sv.Detections(
+            xyxy=np.array([[0, 0, 10, 10], [5, 5, 20, 20]], dtype=float),
+            confidence=np.array([0.9, 0.8]),
+            class_id=np.array([0, 2])
+        )
+
+        with patch.object(self.tracker, '_ByteTrackYOLOTracker__detection_model') as mock_model, \
+                patch.object(self.tracker, '_ByteTrackYOLOTracker__byte_tracker') as mock_byte_tracker:
+            mock_model.return_value = [MagicMock() for _ in fake_frames]
+            mock_byte_tracker.update_with_detections.side_effect = lambda sv_detections: sv_detections
+            result = self.tracker.update_tracker_batch(fake_frames, [0, 1, 2])
+
+        mock_model.assert_called_once()
+        self.assertEqual(mock_byte_tracker.update_with_detections.call_count, 3)
+        self.assertEqual(len(result), 3)
+        self.assertEqual(result[0].class_id.tolist(), [0])
+
+    def test_track_with_timestamps_skips_frames(self):
+        sv_detections = sv.Detections.empty()
+        with patch.object(self.tracker, '_ByteTrackYOLOTracker__byte_tracker') as mock_byte_tracker:
+            mock_byte_tracker.frame_id = 0
+            self.tracker.track(sv_detections, timestamp=1.0)
+            self.assertEqual(mock_byte_tracker.frame_id, 0)
+            # 0.5 s at 10 fps: 4 frames were skipped
+            self.tracker.track(sv_detections, timestamp=1.5)
+            self.assertEqual(mock_byte_tracker.frame_id, 4)
+            self.tracker.track(sv_detections, timestamp=1.6)
+            self.assertEqual(mock_byte_tracker.frame_id, 4)
+
+    @patch('src.service.byte_track_yolo_tracker.YOLO', autospec=True)
+    def test_update_tracker_with_detection_stride(self, _):
+        tracker = ByteTrackYOLOTracker(detection_stride=3)
+        with patch.object(tracker, '_ByteTrackYOLOTracker__detect',
+                          side_effect=self.__detect_moving_person) as mock_detect:
+            results = [tracker.update_tracker(frame_index, frame_index) for frame_index in range(12)]
+
+        self.assertEqual(mock_detect.call_count, 4)
+        self.assertEqual([len(sv_detections) for sv_detections in results], [1] * 12)
+        self.assertEqual(len({sv_detections.tracker_id[0] for sv_detections in results}), 1)
+        # After two detections the velocity is known and the predicted boxes follow the person
+        for frame_index in (7, 8, 10, 11):
+            np.testing.assert_allclose(results[frame_index].xyxy[0], self.__get_box(frame_index), atol=2)
+
+    @patch('src.service.byte_track_yolo_tracker.YOLO', autospec=True)
+    def test_update_tracker_detects_when_uncertain(self, _):
+        tracker = ByteTrackYOLOTracker(detection_stride=5, max_uncertainty=0.01)
+        with patch.object(tracker, '_ByteTrackYOLOTracker__detect',
+                          side_effect=self.__detect_moving_person) as mock_detect:
+            for frame_index in range(10):
+                tracker.update_tracker(frame_index, frame_index)
+
+        self.assertEqual(mock_detect.call_count, 10)
+
+    @patch('src.service.byte_track_yolo_tracker.YOLO', autospec=True)
+    def test_update_tracker_detects_when_moved(self, _):
+        tracker = ByteTrackYOLOTracker(detection_stride=10, max_motion=0.05)
+        with patch.object(tracker, '_ByteTrackYOLOTracker__detect',
+                          side_effect=self.__detect_moving_person) as mock_detect:
+            for frame_index in range(20):
+                tracker.update_tracker(frame_index, frame_index)
+
+        # The velocity is unknown until the second detection, then the person moves 3 px per frame and 5% of the
+        # height is 5 px, so every second frame is detected
+        detected_frames = [call.args[0] for call in mock_detect.call_args_list]
+        self.assertEqual(detected_frames, [0, 10, 12, 14, 16, 18])
+
+    def test_detection_stride_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            ByteTrackYOLOTracker(detection_stride=0)
+
+    def test_update_tracker_batch_with_wrong_indices(self):
+        with self.assertRaises(ValueError):
+            self.tracker.update_tracker_batch([np.zeros((4, 4, 3))], [0, 1])
+
+    # The frame is its index, the person moves 3 px to the right per frame
+    @staticmethod
+    def __get_box(frame_index) -> np.ndarray:
+        return np.array([100 + 3 * frame_index, 100, 140 + 3 * frame_index, 200], dtype=float)
+
+    def __detect_moving_person(self, frame_index) -> sv.Detections:
+        return sv.Detections(
+            xyxy=self.__get_box(frame_index)[np.newaxis],
+            confidence=np.array([0.9]),
+            class_id=np.array([0])
+        )
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -51,6 +51,25 @@ class TestCoordinatesConverter(unittest.TestCase):
 
         np.testing.assert_allclose(self.scene_point, scene_point_back, rtol=1e-5, atol=1e-8)
 
+    def test_convert_coordinates_to_scene_batch(self):
+        image_points = np.array([[100, -50], [959.5, 539.5], [1800, 1000]])
+        scene_points = self.converter.convert_coordinates_to_scene_batch(image_points)
+        expected = np.array([self.converter.convert_coordinates_to_scene(point) for point in image_points])
+
+        self.assertEqual(scene_points.shape, (3, 3))
+        np.testing.assert_allclose(scene_points, expected, rtol=1e-7, atol=1e-9)
+
+    def test_convert_coordinates_to_scene_batch__empty(self):
+        scene_points = self.converter.convert_coordinates_to_scene_batch(np.array([]))
+        self.assertEqual(scene_points.shape, (0, 3))
+
+    def test_convert_coordinates_to_image_batch(self):
+        scene_points = np.array([[-2, -2, 0], [0, 0, 0], [3, 5, 0]])
+        image_points = self.converter.convert_coordinates_to_image_batch(scene_points)
+        expected = np.array([self.converter.convert_coordinates_to_image(point) for point in scene_points])
+
+        np.testing.assert_allclose(image_points, expected, rtol=1e-7, atol=1e-9)
+
     def test_convert_coordinates_to_image__vertically_down__zero_point(self):
         self.params['RotationX'] = 0.9927129910375885
         self.params['RotationY'] = 0
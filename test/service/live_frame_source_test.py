@@ -0,0 +1,63 @@
+import os
+import tempfile
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+from src.service.live_frame_source import LiveFrameSource
+
+
+class LiveFrameSourceTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.video_path = os.path.join(self.temp_dir.name, 'video.avi')
+        writer = cv2.VideoWriter(self.video_path, cv2.VideoWriter_fourcc(*'MJPG'), 50, (32, 24))
+        for i in range(20):
+            writer.write(np.full((24, 32, 3), i * 10, dtype=np.uint8))
+        writer.release()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_all(self, frame_source, delay=0.0):
+        live_frames = []
+        while True:
+            live_frame = frame_source.read(timeout=5)
+            if live_frame is None:
+                return live_frames
+            live_frames.append(live_frame)
+            time.sleep(delay)
+
+    def test_read_all_frames_without_realtime(self):
+        with LiveFrameSource(self.video_path, realtime=False) as frame_source:
+            live_frames = self.read_all(frame_source, delay=0.005)
+            stats = frame_source.get_stats()
+
+        self.assertEqual(frame_source.fps, 50)
+        self.assertEqual(frame_source.resolution, (32, 24))
+        self.assertEqual([live_frame.frame_index for live_frame in live_frames], list(range(20)))
+        self.assertAlmostEqual(live_frames[5].timestamp, 0.1)
+        self.assertEqual(stats, {'captured_frames': 20, 'delivered_frames': 20, 'dropped_frames': 0, 'drop_rate': 0.0})
+
+    def test_drop_stale_frames_in_realtime(self):
+        with LiveFrameSource(self.video_path) as frame_source:
+            live_frames = self.read_all(frame_source, delay=0.07)
+            stats = frame_source.get_stats()
+
+        frame_indices = [live_frame.frame_index for live_frame in live_frames]
+        self.assertEqual(frame_indices, sorted(set(frame_indices)))
+        self.assertGreater(stats['dropped_frames'], 0)
+        self.assertEqual(stats['captured_frames'], 20)
+        self.assertEqual(stats['delivered_frames'] + stats['dropped_frames'], 20)
+        for live_frame in live_frames:
+            self.assertAlmostEqual(live_frame.timestamp, live_frame.frame_index / 50)
+
+    def test_cannot_open_source(self):
+        with self.assertRaises(IOError):
+            LiveFrameSource(os.path.join(self.temp_dir.name, 'missing.avi')).start()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+import supervision as sv
+
+from src.service.live_frame_source import LiveFrame
+from src.service.live_monitoring_service import LiveMonitoringService
+from src.service.social_distance_service import SocialDistanceService
+from src.utils.instrumentation import Instrumentation
+
+
+class FakeFrameSource:
+    def __init__(self, live_frames):
+        self.live_frames = list(live_frames)
+
+    def read(self):
+        return self.live_frames.pop(0) if self.live_frames else None
+
+    def get_stats(self):
+        return {'captured_frames': 10, 'delivered_frames': 3, 'dropped_frames': 7, 'drop_rate': 0.7}
+
+
+class LiveMonitoringServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.tracker = MagicMock()
+        # Two people, 1 m apart on the scene
+        self.tracker.update_tracker.return_value = sv.Detections(
+            xyxy=np.array([[0, 0, 2, 2], [0, 0, 2, 3]], dtype=float),
+            confidence=np.array([0.9, 0.8]),
+            class_id=np.array([0, 0]),
+            tracker_id=np.array([1, 2])
+        )
+        self.coordinates_converter = MagicMock()
+        self.coordinates_converter.convert_coordinates_to_scene_batch.side_effect = lambda points: points - [0, 2]
+        self.instrumentation = Instrumentation(enabled=True)
+        self.service = LiveMonitoringService(
+            self.tracker, self.coordinates_converter, SocialDistanceService(2, violation_percentage=0.5, window_seconds=0.2),
+            self.instrumentation
+        )
+        frame = np.zeros((4, 4, 3), dtype=np.uint8)
+        self.live_frames = [LiveFrame(frame_index, frame_index / 25, 0.0, frame) for frame_index in (0, 3, 9)]
+
+    def test_run_with_skipped_frames(self):
+        callback = MagicMock()
+        report = self.service.run(FakeFrameSource(self.live_frames), callback)
+
+        self.assertEqual([call.args[1:] for call in self.tracker.update_tracker.call_args_list],
+                         [(0, 0.0), (3, 0.12), (9, 0.36)])
+        new_violation_pairs = [call.args[3] for call in callback.call_args_list]
+        self.assertEqual(new_violation_pairs, [{(1, 2)}, set(), set()])
+        self.assertEqual(callback.call_args_list[2].args[2], {(1, 2)})
+
+        self.assertEqual(report['processed_frames'], 3)
+        self.assertEqual(report['drop_rate'], 0.7)
+        self.assertGreater(report['latency_ms']['p50'], 0)
+        self.assertIn('dropped frames: 7 (70%)', LiveMonitoringService.format_report(report))
+
+        summary = self.instrumentation.get_summary()
+        self.assertEqual(summary['counters']['skipped_frames']['total'], 7)
+        self.assertIn('annotation', summary['stages'])
+
+    def test_frames_limit(self):
+        report = self.service.run(FakeFrameSource(self.live_frames), frames_limit=2)
+        self.assertEqual(report['processed_frames'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
 import unittest
 
+import motmetrics as mm
+import numpy as np
+
 from src.service.mot_metrics_service import MotMetricsService
+from src.utils.detections_store import DetectionsStore
 
 
 class TestMotMetricsService(unittest.TestCase):
@@ -34,6 +38,93 @@ class TestMotMetricsService(unittest.TestCase):
         self.assertIsNotNone(motp)
         self.assertIsInstance(mota, float)
         self.assertIsInstance(motp, float)
+        self.assertEqual((mota, motp), (1.0, 0.0))
+
+    def test_evaluates_all_frames(self):
+        groundtruth_dict = {
+            0: [(1, 10, 10, 20, 20)],
+            1: [(1, 12, 10, 22, 20)],
+            2: [(1, 14, 10, 24, 20)],
+            4: [(1, 18, 10, 28, 20)],
+        }
+        # The frame 1 has no predictions, the frame 3 has no groundtruth
+        predictions_dict = {
+            0: [(7, 10, 10, 20, 20)],
+            2: [(7, 14, 10, 24, 20)],
+            3: [(7, 16, 10, 26, 20)],
+            4: [(7, 18, 10, 28, 20)],
+        }
+        metrics = MotMetricsService(predictions_dict, groundtruth_dict).calculate_metrics(
+            ['num_frames', 'num_misses', 'num_false_positives', 'mota']
+        )
+        self.assertEqual(metrics['num_frames'], 5)
+        self.assertEqual(metrics['num_misses'], 1)
+        self.assertEqual(metrics['num_false_positives'], 1)
+        self.assertAlmostEqual(metrics['mota'], 1 / 2)
+
+    def test_ignores_predictions_outside_groundtruth_frames(self):
+        groundtruth_dict = {
+            2: [(1, 10, 10, 20, 20)],
+            3: [(1, 12, 10, 22, 20)],
+        }
+        # The video is tracked before and after its annotated part
+        predictions_dict = {frame: [(7, 10 + 2 * (frame - 2), 10, 20 + 2 * (frame - 2), 20)] for frame in range(8)}
+        service = MotMetricsService(predictions_dict, groundtruth_dict)
+        self.assertEqual(service.get_frames(), [2, 3])
+        metrics = service.calculate_metrics(['num_frames', 'num_false_positives', 'mota'])
+        self.assertEqual(metrics['num_frames'], 2)
+        self.assertEqual(metrics['num_false_positives'], 0)
+        self.assertEqual(metrics['mota'], 1.0)
+
+        metrics = MotMetricsService(predictions_dict, groundtruth_dict, frames=range(8)).calculate_metrics(
+            ['num_frames', 'num_false_positives']
+        )
+        self.assertEqual(metrics['num_frames'], 8)
+        self.assertEqual(metrics['num_false_positives'], 6)
+
+    def test_calculate_metrics_extended(self):
+        groundtruth_dict = {frame: [(1, 10, 10, 20, 20), (2, 40, 40, 50, 50)] for frame in range(4)}
+        # The predicted IDs are swapped in the middle of the sequence
+        predictions_dict = {
+            frame: [(1, 10, 10, 20, 20), (2, 40, 40, 50, 50)] if frame < 2 else [(2, 10, 10, 20, 20)]
+            for frame in range(4)
+        }
+        metrics = MotMetricsService(predictions_dict, groundtruth_dict).calculate_metrics()
+        self.assertEqual(sorted(metrics.keys()), ['idf1', 'mota', 'motp', 'num_frames', 'num_switches'])
+        self.assertEqual(metrics['num_switches'], 1)
+        self.assertLess(metrics['idf1'], 1)
+
+    def test_iou_distances_match_motmetrics(self):
+        rng = np.random.default_rng(0)
+        groundtruth_dict = {}
+        predictions_dict = {}
+        for frame in range(5):
+            xy = rng.uniform(0, 100, size=(6, 2))
+            wh = rng.uniform(10, 30, size=(6, 2))
+            groundtruth_dict[frame] = [(i, *xy[i], *(xy[i] + wh[i])) for i in range(6)]
+            shifted = xy + rng.normal(0, 3, size=xy.shape)
+            predictions_dict[frame] = [(i, *shifted[i], *(shifted[i] + wh[i])) for i in range(4)]
+
+        expected = mm.MOTAccumulator(auto_id=True)
+        for frame in range(5):
+            gt = np.array(groundtruth_dict[frame])
+            pred = np.array(predictions_dict[frame])
+            # motmetrics takes the boxes as x, y, width, height
+            gt_xywh = np.column_stack((gt[:, 1:3], gt[:, 3:5] - gt[:, 1:3]))
+            pred_xywh = np.column_stack((pred[:, 1:3], pred[:, 3:5] - pred[:, 1:3]))
+            expected.update(gt[:, 0], pred[:, 0], mm.distances.iou_matrix(gt_xywh, pred_xywh, max_iou=0.5))
+
+        actual = MotMetricsService(predictions_dict, groundtruth_dict).build_accumulator()
+        np.testing.assert_allclose(actual.mot_events['D'].to_numpy(), expected.mot_events['D'].to_numpy())
+
+    def test_detections_store(self):
+        groundtruth_dict = {0: [(1, 10, 10, 20, 20, 15, 20, 0, 1)], 2: [(1, 11, 10, 21, 20, 16, 20, 0, 1)]}
+        predictions_dict = {0: [(3, 10, 10, 20, 20, 15, 20, 0, 0.9)], 1: [(3, 11, 10, 21, 20, 16, 20, 0, 0.9)]}
+        expected = MotMetricsService(predictions_dict, groundtruth_dict).calculate_metrics()
+        actual = MotMetricsService(
+            DetectionsStore.from_dict(predictions_dict), DetectionsStore.from_dict(groundtruth_dict)
+        ).calculate_metrics()
+        self.assertEqual(actual, expected)
 
 
 if __name__ == "__main__":
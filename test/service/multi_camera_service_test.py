@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+import supervision as sv
+
+from src.benchmark.crowd_generator import CAMERA_PARAMETERS
+from src.service.coordinates_converter import CoordinatesConverter
+from src.service.multi_camera_service import MultiCameraService, CameraStream
+
+
+class StubTracker:
+    """
+    Tracks a standing person and a second one, who is 5 m away and steps next to the first one from the frame 10.
+    The frame index is read from the brightness of the frame
+    """
+
+    def __init__(self, *args):
+        pass
+
+    def update_tracker(self, frame, frame_index) -> sv.Detections:
+        decoded_frame_index = int(round(frame.mean() / 8))
+        second_x = 1000 if decoded_frame_index >= 10 else 1800
+        return sv.Detections(
+            xyxy=np.array([[940, 800, 980, 900], [second_x - 20, 800, second_x + 20, 900]], dtype=np.float32),
+            confidence=np.full(2, 0.9, dtype=np.float32),
+            class_id=np.zeros(2, dtype=int),
+            tracker_id=np.array([1, 2])
+        )
+
+
+def write_video(video_path, frames_count):
+    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), 25, (64, 64))
+    for frame_index in range(frames_count):
+        writer.write(np.full((64, 64, 3), frame_index * 8, dtype=np.uint8))
+    writer.release()
+
+
+class MultiCameraServiceTest(unittest.TestCase):
+    def test_build_report(self):
+        camera_reports = {
+            'entrance': {
+                'frames': 100,
+                'seconds': 4.0,
+                'violation_events': [
+                    {'frame_index': 3, 'pair': (1, 2), 'distance': 1.5},
+                    {'frame_index': 50, 'pair': (2, 7), 'distance': 0.9},
+                ],
+            },
+            'hall': {'frames': 60, 'seconds': 3.0, 'violation_events': []},
+        }
+
+        report = MultiCameraService.build_report(camera_reports)
+
+        self.assertEqual(report['cameras']['entrance'], {'frames': 100, 'seconds': 4.0, 'fps': 25.0,
+                                                         'violation_events': 2})
+        self.assertEqual(report['cameras']['hall']['fps'], 20.0)
+        self.assertEqual(report['total_frames'], 160)
+        self.assertEqual(report['total_violation_events'], 2)
+        self.assertEqual(report['violation_events'][1],
+                         {'camera': 'entrance', 'frame_index': 50, 'pair': (2, 7), 'distance': 0.9})
+
+    def test_load_camera_streams(self):
+        with tempfile.TemporaryDirectory() as directory_path:
+            for name in ['camera2', 'camera1']:
+                open(os.path.join(directory_path, name + '.mp4'), 'w').close()
+                with open(os.path.join(directory_path, name + '.ci'), 'w') as f:
+                    f.write('FocalLengthX = 2696.35888671875\nTranslationZ = 12.5\n')
+            open(os.path.join(directory_path, 'notes.txt'), 'w').close()
+
+            camera_streams = MultiCameraService.load_camera_streams(directory_path)
+
+        self.assertEqual([camera_stream.name for camera_stream in camera_streams], ['camera1', 'camera2'])
+        self.assertEqual(camera_streams[0].video_path, os.path.join(directory_path, 'camera1.mp4'))
+        self.assertEqual(camera_streams[0].camera_parameters, {'FocalLengthX': 2696.35888671875, 'TranslationZ': 12.5})
+
+    def test_process_with_duplicate_names(self):
+        camera_streams = [CameraStream('camera', 'a.mp4', {}), CameraStream('camera', 'b.mp4', {})]
+        with self.assertRaises(ValueError):
+            MultiCameraService(workers=1).process(camera_streams)
+
+    @patch('src.service.multi_camera_service.ProcessPoolExecutor', ThreadPoolExecutor)
+    @patch('src.service.multi_camera_service.ByteTrackYOLOTracker', StubTracker)
+    def test_process(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            camera_streams = []
+            for name, frames_count in [('entrance', 20), ('hall', 8)]:
+                video_path = os.path.join(temp_dir, name + '.mp4')
+                write_video(video_path, frames_count)
+                camera_streams.append(CameraStream(name, video_path, CAMERA_PARAMETERS))
+
+            service = MultiCameraService(workers=2, last_frames=1, violation_percentage=1.0, frames_limit=15)
+            report = service.process(camera_streams)
+
+        scene_points = CoordinatesConverter(CAMERA_PARAMETERS).convert_coordinates_to_scene_batch(
+            np.array([[960, 900], [1000, 900]], dtype=np.float32)
+        )
+        self.assertEqual(report['cameras']['entrance']['frames'], 15)
+        self.assertEqual(report['cameras']['entrance']['violation_events'], 1)
+        self.assertEqual(report['cameras']['hall']['frames'], 8)
+        self.assertEqual(report['cameras']['hall']['violation_events'], 0)
+        self.assertEqual(report['total_frames'], 23)
+        self.assertEqual(report['total_violation_events'], 1)
+        # The pair is reported once, in the frame where the second person comes close
+        event = report['violation_events'][0]
+        self.assertEqual((event['camera'], event['frame_index'], event['pair']), ('entrance', 10, (1, 2)))
+        self.assertAlmostEqual(event['distance'], np.linalg.norm(scene_points[0] - scene_points[1]), places=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
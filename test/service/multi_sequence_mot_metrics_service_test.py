@@ -0,0 +1,43 @@
+import unittest
+
+from src.service.mot_metrics_service import MotMetricsService
+from src.service.multi_sequence_mot_metrics_service import MultiSequenceMotMetricsService
+
+
+class MultiSequenceMotMetricsServiceTest(unittest.TestCase):
+    def setUp(self):
+        perfect_groundtruth = {frame: [(1, 10, 10, 20, 20), (2, 40, 40, 50, 50)] for frame in range(3)}
+        perfect_predictions = {frame: [(5, 10, 10, 20, 20), (6, 40, 40, 50, 50)] for frame in range(3)}
+        missed_groundtruth = {frame: [(1, 10, 10, 20, 20), (2, 40, 40, 50, 50)] for frame in range(4)}
+        missed_predictions = {frame: [(5, 10, 10, 20, 20)] for frame in range(4)}
+        self.sequences = {
+            'perfect': (perfect_predictions, perfect_groundtruth),
+            'missed': (missed_predictions, missed_groundtruth),
+        }
+
+    def test_calculate_metrics(self):
+        summary = MultiSequenceMotMetricsService(workers=1).calculate_metrics(self.sequences)
+
+        self.assertEqual(list(summary.index), ['perfect', 'missed', 'OVERALL'])
+        self.assertEqual(summary.loc['perfect', 'mota'], 1.0)
+        self.assertEqual(summary.loc['missed', 'mota'], 0.5)
+        self.assertEqual(summary.loc['OVERALL', 'num_frames'], 7)
+        self.assertAlmostEqual(summary.loc['OVERALL', 'mota'], 1 - 4 / 14)
+
+        for name, (predictions, groundtruth) in self.sequences.items():
+            expected = MotMetricsService(predictions, groundtruth).calculate_metrics()
+            for metric, value in expected.items():
+                self.assertAlmostEqual(summary.loc[name, metric], value)
+
+    def test_calculate_metrics_in_worker_processes(self):
+        serial = MultiSequenceMotMetricsService(workers=1).calculate_metrics(self.sequences)
+        parallel = MultiSequenceMotMetricsService(workers=2).calculate_metrics(self.sequences)
+        self.assertTrue(parallel.equals(serial))
+
+    def test_no_sequences(self):
+        with self.assertRaises(ValueError):
+            MultiSequenceMotMetricsService(workers=1).calculate_metrics({})
+
+
+if __name__ == '__main__':
+    unittest.main()
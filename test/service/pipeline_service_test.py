@@ -0,0 +1,59 @@
+import time
+import unittest
+
+from src.service.pipeline_service import PipelineService
+
+
+class PipelineServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.pipeline_service = PipelineService(queue_size=2)
+
+    def test_run_keeps_order(self):
+        results = []
+
+        stats = self.pipeline_service.run(
+            source=range(50),
+            stages=[('double', lambda item: item * 2), ('increment', lambda item: item + 1), ('store', results.append)],
+            source_name='decode'
+        )
+
+        self.assertEqual(results, [item * 2 + 1 for item in range(50)])
+        self.assertEqual(list(stats['stages'].keys()), ['decode', 'double', 'increment', 'store'])
+        for stage in stats['stages'].values():
+            self.assertEqual(stage['items'], 50)
+        self.assertEqual(list(stats['queues'].keys()),
+                         ['decode -> double', 'double -> increment', 'increment -> store'])
+
+    def test_run_queues_are_bounded(self):
+        def slow_store(item):
+            time.sleep(0.002)
+
+        stats = self.pipeline_service.run(source=range(30), stages=[('store', slow_store)])
+
+        queue_stats = stats['queues']['source -> store']
+        self.assertLessEqual(queue_stats['max_occupancy'], 2)
+        self.assertGreater(queue_stats['mean_occupancy'], 0)
+        self.assertGreater(stats['items_per_second'], 0)
+
+    def test_run_reraises_stage_error(self):
+        def fail_on_five(item):
+            if item == 5:
+                raise RuntimeError('stage failed')
+            return item
+
+        with self.assertRaises(RuntimeError):
+            self.pipeline_service.run(source=range(1000), stages=[('fail', fail_on_five), ('store', lambda item: None)])
+
+    def test_run_without_stages(self):
+        with self.assertRaises(ValueError):
+            self.pipeline_service.run(source=range(3), stages=[])
+
+    def test_format_stats(self):
+        stats = self.pipeline_service.run(source=range(3), stages=[('store', lambda item: None)])
+        formatted = PipelineService.format_stats(stats)
+        self.assertIn('store', formatted)
+        self.assertIn('source -> store', formatted)
+
+
+if __name__ == '__main__':
+    unittest.main()
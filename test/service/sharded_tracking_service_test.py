@@ -0,0 +1,102 @@
+import itertools
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+import supervision as sv
+
+from src.service.sharded_tracking_service import ShardedTrackingService
+
+
+def make_row(tracker_id, x, y):
+    return tracker_id, x, y, x + 10, y + 20, x + 5, y + 20, 0, 0.9
+
+
+class StubTracker:
+    """
+    Tracks a person walking right, and from the frame 20 a standing one, with its own track IDs like a new
+    ByteTrackYOLOTracker of a worker. The frame index is read from the brightness of the frame
+    """
+    instance_counter = itertools.count(1)
+
+    def __init__(self, *args):
+        first_id = 10 * next(StubTracker.instance_counter)
+        self.tracker_ids = np.array([first_id, first_id + 1])
+
+    def update_tracker(self, frame, frame_index) -> sv.Detections:
+        decoded_frame_index = int(round(frame.mean() / 8))
+        boxes = [[5 * decoded_frame_index, 0, 5 * decoded_frame_index + 10, 20], [300, 300, 310, 320]]
+        count = 1 if decoded_frame_index < 20 else 2
+        return sv.Detections(
+            xyxy=np.array(boxes[:count], dtype=np.float32),
+            confidence=np.full(count, 0.9, dtype=np.float32),
+            class_id=np.zeros(count, dtype=int),
+            tracker_id=self.tracker_ids[:count]
+        )
+
+
+class ShardedTrackingServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.service = ShardedTrackingService(workers=2, segment_overlap=3)
+
+    def test_get_segment_boundaries(self):
+        self.assertEqual(self.service.get_segment_boundaries(20), [0, 10, 20])
+        self.assertEqual(self.service.get_segment_boundaries(1), [0, 1])
+        self.assertEqual(ShardedTrackingService(workers=3).get_segment_boundaries(10), [0, 3, 7, 10])
+
+    def test_stitch_segments(self):
+        # Person A walks right, person B walks down, person C appears in the second segment only
+        segment0 = {
+            frame_index: [make_row(5, frame_index * 2, 0), make_row(9, 100, frame_index * 2)]
+            for frame_index in range(0, 10)
+        }
+        segment1 = {
+            frame_index: [make_row(1, 100, frame_index * 2), make_row(2, frame_index * 2, 0)]
+            + ([make_row(3, 300, 300)] if frame_index >= 12 else [])
+            for frame_index in range(7, 20)
+        }
+
+        stitched = self.service.stitch_segments([segment0, segment1], [0, 10, 20])
+
+        self.assertEqual(sorted(stitched.keys()), list(range(20)))
+        self.assertEqual(stitched[0], [make_row(1, 0, 0), make_row(2, 100, 0)])
+        self.assertEqual(stitched[10], [make_row(2, 100, 20), make_row(1, 20, 0)])
+        self.assertEqual(stitched[12][2], make_row(3, 300, 300))
+
+    def test_stitch_segments_without_overlap_match(self):
+        segment0 = {frame_index: [make_row(1, 0, 0)] for frame_index in range(0, 10)}
+        segment1 = {frame_index: [make_row(1, 500, 500)] for frame_index in range(7, 20)}
+
+        stitched = self.service.stitch_segments([segment0, segment1], [0, 10, 20])
+
+        self.assertEqual(stitched[9][0][0], 1)
+        self.assertEqual(stitched[10][0][0], 2)
+
+    @patch('src.service.sharded_tracking_service.ProcessPoolExecutor', ThreadPoolExecutor)
+    @patch('src.service.sharded_tracking_service.ByteTrackYOLOTracker', StubTracker)
+    def test_track_video(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            video_path = os.path.join(temp_dir, 'video.mp4')
+            writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), 25, (64, 64))
+            for frame_index in range(30):
+                writer.write(np.full((64, 64, 3), frame_index * 8, dtype=np.uint8))
+            writer.release()
+
+            service = ShardedTrackingService(workers=3, segment_overlap=4)
+            stitched = service.track_video(video_path)
+
+        self.assertEqual(sorted(stitched.keys()), list(range(30)))
+        for frame_index, rows in stitched.items():
+            # The walking person keeps the ID 1 across the segment boundaries 10 and 20
+            self.assertEqual(rows[0][0], 1, frame_index)
+            self.assertEqual(rows[0][1], 5 * frame_index)
+        self.assertEqual({rows[1][0] for frame_index, rows in stitched.items() if frame_index >= 20}, {2})
+        self.assertEqual([len(stitched[frame_index]) for frame_index in (19, 20)], [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
 import unittest
-from src.service.social_distance_service import SocialDistanceService, PeopleCoordinates
+from src.service.social_distance_service import SocialDistanceService, PeopleCoordinates, DistanceMatrix, \
+    SparseDistanceMatrix, MultiWindowSocialDistanceService
+from src.utils.instrumentation import Instrumentation
 import numpy as np
 
 
@@ -43,6 +45,332 @@ class TestSocialDistanceService(unittest.TestCase):
         self.assertEqual(all_curr_violation_pairs, {(1, 2)})
         self.assertEqual(new_curr_violation_pairs, set())
 
+    def test_distance_matrix_for_single_frame(self):
+        object_ids = np.array([3, 7, 9, 12])
+        sb_xy = np.array([[0, 0, 0], [3, 4, 0], [1, 1, 0], [-2, 0, 0]])
+        self.social_distance_service.update_violation_pairs(0, PeopleCoordinates(object_ids, sb_xy))
+
+        distance_matrix = self.social_distance_service.get_distance_matrix(0)
+        for i in range(len(object_ids)):
+            for j in range(len(object_ids)):
+                self.assertAlmostEqual(distance_matrix.get_distance(object_ids[i], object_ids[j]),
+                                       np.linalg.norm(sb_xy[i] - sb_xy[j]), places=5)
+        self.assertAlmostEqual(self.social_distance_service.get_distance_for_pair(0, (7, 12)), np.sqrt(41), places=5)
+
+    def test_distance_matrix_for_single_frame_with_single_person(self):
+        people_coordinates = PeopleCoordinates(np.array([1]), np.array([[0, 0]]))
+        all_curr_violation_pairs, _ = self.social_distance_service.update_violation_pairs(0, people_coordinates)
+        self.assertEqual(all_curr_violation_pairs, set())
+        self.assertEqual(self.social_distance_service.get_distance_matrix(0).matrix.shape, (1, 1))
+
+    def test_sliding_window_matches_history_scan(self):
+        rng = np.random.default_rng(1)
+        object_ids = np.arange(20)
+        sb_xy = rng.uniform(0, 10, size=(20, 2))
+        for last_frames, violation_percentage in [(1, 0.5), (3, 0.3), (5, 0.8), (4, 0)]:
+            service = SocialDistanceService(2, last_frames, violation_percentage)
+            for frame_index in range(15):
+                sb_xy = sb_xy + rng.normal(0, 0.5, size=sb_xy.shape)
+                present = rng.random(20) > 0.2
+                service.update_violation_pairs(frame_index, PeopleCoordinates(object_ids[present], sb_xy[present]))
+
+                expected = service._SocialDistanceService__scan_all_current_violation_pairs(frame_index)
+                self.assertEqual(service.get_all_current_violation_pairs(frame_index), expected)
+
+    def test_history_is_bounded(self):
+        people_coordinates = PeopleCoordinates(np.array([1, 2]), np.array([[0, 0], [0, 1.5]]))
+        for frame_index in range(100):
+            self.social_distance_service.update_violation_pairs(frame_index, people_coordinates)
+
+        memory_usage = self.social_distance_service.get_memory_usage()
+        self.assertEqual(memory_usage['distance_matrix_history_frames'], 3)
+        self.assertEqual(memory_usage['violator_pairs_history_frames'], 3)
+        self.assertEqual(memory_usage['window_frames'], 2)
+        self.assertEqual(memory_usage['window_pairs'], 1)
+        self.assertEqual(memory_usage['distance_bytes'], 3 * 4)
+        self.assertEqual(self.social_distance_service.get_all_current_violation_pairs(99), {(1, 2)})
+        with self.assertRaises(KeyError):
+            self.social_distance_service.get_distance_matrix(96)
+
+    def test_history_size_is_configurable(self):
+        service = SocialDistanceService(2, 2, 0.5, history_size=10)
+        people_coordinates = PeopleCoordinates(np.array([1, 2]), np.array([[0, 0], [0, 1.5]]))
+        for frame_index in range(20):
+            service.update_violation_pairs(frame_index, people_coordinates)
+        self.assertEqual(service.get_memory_usage()['distance_matrix_history_frames'], 10)
+
+        with self.assertRaises(ValueError):
+            SocialDistanceService(2, 5, 0.5, history_size=5)
+
+    def test_new_violation_pairs_with_skipped_frames(self):
+        close = PeopleCoordinates(np.array([1, 2]), np.array([[0, 0], [0, 1.5]]))
+        far = PeopleCoordinates(np.array([1, 2]), np.array([[0, 0], [0, 3]]))
+        self.assertEqual(self.social_distance_service.update_violation_pairs(5, close), ({(1, 2)}, {(1, 2)}))
+        self.assertEqual(self.social_distance_service.update_violation_pairs(8, close), ({(1, 2)}, set()))
+        self.assertEqual(self.social_distance_service.update_violation_pairs(20, far), (set(), set()))
+        self.assertEqual(self.social_distance_service.update_violation_pairs(23, close), ({(1, 2)}, {(1, 2)}))
+
+    def test_out_of_order_frame_outside_history(self):
+        service = SocialDistanceService(2, 5, 0.8)
+        people_coordinates = PeopleCoordinates(np.array([1, 2]), np.array([[0, 0], [0, 1.5]]))
+        service.update_violation_pairs(100, people_coordinates)
+        with self.assertRaises(ValueError):
+            service.update_violation_pairs(5, people_coordinates)
+        with self.assertRaises(KeyError):
+            service.get_distance_matrix(5)
+
+        # A frame inside the history is still accepted out of order
+        self.assertEqual(service.update_violation_pairs(95, people_coordinates), ({(1, 2)}, {(1, 2)}))
+        self.assertEqual(service.get_all_current_violators_set(95), {1, 2})
+        self.assertEqual(service.get_distance_for_pair(95, (1, 2)), 1.5)
+        self.assertEqual(service.get_all_current_violators_set(100), {1, 2})
+
+    def test_instrumentation_counters(self):
+        instrumentation = Instrumentation(enabled=True)
+        service = SocialDistanceService(2, 2, 0.5, instrumentation=instrumentation)
+        service.update_violation_pairs(0, PeopleCoordinates(np.array([1, 2, 3]), np.array([[0, 0], [0, 1.5], [9, 9]])))
+        instrumentation.end_frame(0)
+        service.update_violation_pairs(1, PeopleCoordinates(np.array([1, 2]), np.array([[0, 0], [0, 3]])))
+        instrumentation.end_frame(1)
+
+        summary = instrumentation.get_summary()
+        self.assertEqual(summary['counters']['people']['total'], 5)
+        self.assertEqual(summary['counters']['pairs_evaluated']['total'], 2)
+        self.assertEqual(summary['counters']['violations']['total'], 2)
+        self.assertIn('social_distance', summary['stages'])
+
+
+class TestTimeWindowSocialDistanceService(unittest.TestCase):
+    def setUp(self):
+        self.close = PeopleCoordinates(np.array([1, 2]), np.array([[0, 0], [0, 1.5]]))
+        self.far = PeopleCoordinates(np.array([1, 2]), np.array([[0, 0], [0, 3]]))
+
+    def update(self, service, frames):
+        return [service.update_violation_pairs(frame_index, people_coordinates, timestamp)
+                for frame_index, timestamp, people_coordinates in frames]
+
+    def test_same_violation_pairs_as_frame_window_at_constant_frame_rate(self):
+        rng = np.random.default_rng(3)
+        object_ids = np.arange(20)
+        for last_frames, violation_percentage, sparse in [(1, 0.5, False), (3, 0.3, False), (5, 0.8, True), (4, 0, False)]:
+            frame_service = SocialDistanceService(2, last_frames, violation_percentage, sparse=sparse)
+            time_service = SocialDistanceService(2, violation_percentage=violation_percentage, sparse=sparse,
+                                                 window_seconds=last_frames / 25)
+            sb_xy = rng.uniform(0, 10, size=(20, 2))
+            for frame_index in range(30):
+                sb_xy = sb_xy + rng.normal(0, 0.5, size=sb_xy.shape)
+                present = rng.random(20) > 0.2
+                people_coordinates = PeopleCoordinates(object_ids[present], sb_xy[present])
+                self.assertEqual(
+                    time_service.update_violation_pairs(frame_index, people_coordinates, frame_index / 25),
+                    frame_service.update_violation_pairs(frame_index, people_coordinates)
+                )
+
+    def test_sliding_window_matches_history_scan(self):
+        rng = np.random.default_rng(4)
+        object_ids = np.arange(20)
+        sb_xy = rng.uniform(0, 10, size=(20, 2))
+        timestamps = np.cumsum(rng.uniform(0.01, 0.2, size=40))
+        for window_seconds, violation_percentage in [(0.1, 0.5), (0.5, 0.3), (1.0, 0.8)]:
+            service = SocialDistanceService(2, violation_percentage=violation_percentage,
+                                            window_seconds=window_seconds)
+            for frame_index, timestamp in enumerate(timestamps):
+                sb_xy = sb_xy + rng.normal(0, 0.5, size=sb_xy.shape)
+                present = rng.random(20) > 0.2
+                service.update_violation_pairs(frame_index, PeopleCoordinates(object_ids[present], sb_xy[present]),
+                                               timestamp)
+
+                expected = service._SocialDistanceService__scan_all_current_violation_pairs(frame_index)
+                self.assertEqual(service.get_all_current_violation_pairs(frame_index), expected)
+
+    def test_frames_are_weighted_by_time(self):
+        # The pair was close for 0.2 s of the last second, the frame count would give 2 of 3 frames
+        service = SocialDistanceService(2, violation_percentage=0.5, window_seconds=1.0)
+        results = self.update(service, [(0, 0.0, self.close), (1, 0.1, self.close), (2, 0.2, self.close),
+                                        (10, 1.0, self.far)])
+        self.assertEqual(results[2], ({(1, 2)}, set()))
+        self.assertEqual(results[3], (set(), set()))
+
+        frame_service = SocialDistanceService(2, 10, 0.5)
+        self.assertEqual(self.update(frame_service, [(0, None, self.close), (1, None, self.close),
+                                                     (2, None, self.close), (10, None, self.far)])[3],
+                         ({(1, 2)}, set()))
+
+    def test_oldest_frame_is_clipped_to_window(self):
+        # At 1.2 s the window starts at 0.2 s, so only 0.3 s of the close frame at 0.5 s is inside it
+        frames = [(0, 0.0, self.close), (5, 0.5, self.close), (12, 1.2, self.far)]
+        self.assertEqual(self.update(SocialDistanceService(2, violation_percentage=0.3, window_seconds=1.0), frames)[2],
+                         ({(1, 2)}, set()))
+        self.assertEqual(self.update(SocialDistanceService(2, violation_percentage=0.35, window_seconds=1.0), frames)[2],
+                         (set(), set()))
+
+    def test_history_is_bounded(self):
+        service = SocialDistanceService(2, violation_percentage=0.5, window_seconds=1.0)
+        for frame_index in range(100):
+            service.update_violation_pairs(frame_index, self.close, frame_index / 10)
+
+        memory_usage = service.get_memory_usage()
+        self.assertEqual(memory_usage['distance_matrix_history_frames'], 11)
+        self.assertEqual(memory_usage['window_frames'], 10)
+        self.assertEqual(memory_usage['window_pairs'], 1)
+
+    def test_timestamps_are_validated(self):
+        service = SocialDistanceService(2, window_seconds=1.0)
+        with self.assertRaises(ValueError):
+            service.update_violation_pairs(0, self.close)
+        service.update_violation_pairs(1, self.close, 1.0)
+        with self.assertRaises(ValueError):
+            service.update_violation_pairs(2, self.close, 0.5)
+        with self.assertRaises(ValueError):
+            SocialDistanceService(2, window_seconds=0)
+
+    def test_out_of_order_frame_outside_history(self):
+        service = SocialDistanceService(2, window_seconds=1.0)
+        for frame_index in range(30):
+            service.update_violation_pairs(frame_index, self.close, frame_index / 10)
+        with self.assertRaises(ValueError):
+            service.update_violation_pairs(-1, self.close, -0.1)
+        # The frame 19 at 1.9 s is the last one before the window (1.9 s, 2.9 s] and is kept
+        self.assertEqual(service.get_all_current_violators_set(19), {1, 2})
+
+
+class TestDistanceMatrix(unittest.TestCase):
+    def setUp(self):
+        self.object_ids = np.array([12, 3, 7, 9])
+        self.points = np.array([[-2, 0], [0, 0], [3, 4], [1, 1]])
+        self.distance_matrix = DistanceMatrix.from_points(self.object_ids, self.points)
+
+    def test_from_points(self):
+        self.assertEqual(self.distance_matrix.object_ids.tolist(), [3, 7, 9, 12])
+        self.assertEqual(self.distance_matrix.distances.dtype, np.float32)
+        self.assertEqual(self.distance_matrix.nbytes, 6 * 4)
+        self.assertAlmostEqual(self.distance_matrix.get_distance(3, 7), 5)
+        self.assertAlmostEqual(self.distance_matrix.get_distance(12, 7), np.sqrt(41), places=5)
+        self.assertEqual(self.distance_matrix.get_distance(9, 9), 0)
+        self.assertIsNone(self.distance_matrix.get_distance(9, 4))
+
+    def test_get_distances(self):
+        pairs = np.array([[3, 7], [7, 3], [12, 9], [3, 3], [3, 100]])
+        distances = self.distance_matrix.get_distances(pairs)
+        np.testing.assert_allclose(distances[:4], [5, 5, np.sqrt(10), 0], rtol=1e-6)
+        self.assertTrue(np.isnan(distances[4]))
+
+    def test_get_all_distances(self):
+        np.testing.assert_allclose(self.distance_matrix.get_all_distances(3), [0, 5, np.sqrt(2), 2], rtol=1e-6)
+
+    def test_get_close_pairs(self):
+        rng = np.random.default_rng(2)
+        for size in [0, 1, 2, 3, 10, 57]:
+            object_ids = rng.permutation(size * 2)[:size]
+            points = rng.uniform(0, 10, size=(size, 2))
+            distance_matrix = DistanceMatrix.from_points(object_ids, points)
+
+            expected = {
+                (min(object_ids[i], object_ids[j]), max(object_ids[i], object_ids[j]))
+                for i in range(size) for j in range(i + 1, size)
+                if np.float32(np.linalg.norm(points[i] - points[j])) < 3
+            }
+            self.assertEqual(set(distance_matrix.get_close_pairs(3)), expected)
+            self.assertEqual(len(distance_matrix.get_all_pairs()), size * (size - 1) // 2)
+
+
+class TestSparseSocialDistanceService(unittest.TestCase):
+    def setUp(self):
+        self.social_distance_service = SocialDistanceService(2, 2, 0.5, sparse=True)
+
+    def test_update_violation_pairs_with_previous_data(self):
+        people_coordinates0 = PeopleCoordinates(np.array([1, 2]), np.array([[0, 0], [0, 2]]))
+        self.social_distance_service.update_violation_pairs(0, people_coordinates0)
+        people_coordinates1 = PeopleCoordinates(np.array([1, 2]), np.array([[0, 0], [0, 1.5]]))
+        all_curr_violation_pairs, new_curr_violation_pairs = self.social_distance_service.update_violation_pairs(1, people_coordinates1)
+        self.assertEqual(all_curr_violation_pairs, {(1, 2)})
+        self.assertEqual(new_curr_violation_pairs, {(1, 2)})
+
+    def test_sparse_distance_matrix_stores_close_pairs_only(self):
+        people_coordinates = PeopleCoordinates(np.array([5, 3, 8]), np.array([[0, 0], [0, 1], [10, 10]]))
+        self.social_distance_service.update_violation_pairs(0, people_coordinates)
+
+        distance_matrix = self.social_distance_service.get_distance_matrix(0)
+        self.assertIsInstance(distance_matrix, SparseDistanceMatrix)
+        self.assertEqual(distance_matrix.distances, {(3, 5): 1.0})
+        self.assertEqual(distance_matrix.get_distance(5, 3), 1.0)
+        self.assertEqual(distance_matrix.get_distance(5, 8), np.inf)
+        self.assertIsNone(distance_matrix.get_distance(5, 4))
+
+    def test_same_violation_pairs_as_dense_mode(self):
+        rng = np.random.default_rng(0)
+        dense_service = SocialDistanceService(2, 4, 0.5)
+        sparse_service = SocialDistanceService(2, 4, 0.5, sparse=True)
+        object_ids = np.arange(30)
+        sb_xy = rng.uniform(0, 15, size=(30, 2))
+        for frame_index in range(10):
+            sb_xy = sb_xy + rng.normal(0, 0.5, size=sb_xy.shape)
+            present = rng.random(30) > 0.2
+            people_coordinates = PeopleCoordinates(object_ids[present], sb_xy[present])
+            self.assertEqual(dense_service.update_violation_pairs(frame_index, people_coordinates),
+                             sparse_service.update_violation_pairs(frame_index, people_coordinates))
+
+
+class TestMultiWindowSocialDistanceService(unittest.TestCase):
+    def test_same_violation_pairs_as_single_configuration(self):
+        last_frames_values = [1, 3, 5]
+        violation_percentages = [0, 0.3, 0.5, 0.8, 1.0]
+        for sparse in [False, True]:
+            rng = np.random.default_rng(2)
+            multi_window_service = MultiWindowSocialDistanceService(
+                2, last_frames_values, violation_percentages, sparse=sparse
+            )
+            services = {
+                configuration: SocialDistanceService(2, *configuration, sparse=sparse)
+                for configuration in multi_window_service.get_configurations()
+            }
+            object_ids = np.arange(20)
+            sb_xy = rng.uniform(0, 10, size=(20, 2))
+            for frame_index in range(15):
+                sb_xy = sb_xy + rng.normal(0, 0.5, size=sb_xy.shape)
+                present = rng.random(20) > 0.2
+                people_coordinates = PeopleCoordinates(object_ids[present], sb_xy[present])
+
+                violation_pairs = multi_window_service.update_violation_pairs(frame_index, people_coordinates)
+                self.assertEqual(len(violation_pairs), 15)
+                for configuration, service in services.items():
+                    expected, _ = service.update_violation_pairs(frame_index, people_coordinates)
+                    self.assertEqual(violation_pairs[configuration], expected, (sparse, frame_index, configuration))
+                    self.assertEqual(
+                        multi_window_service.get_all_current_violators_set(frame_index, *configuration),
+                        service.get_all_current_violators_set(frame_index)
+                    )
+
+    def test_same_violation_pairs_on_arange_percentages(self):
+        # np.arange gives percentages like 0.30000000000000004, which 3 close frames of 10 do not reach
+        violation_percentages = np.arange(0.1, 1.1, 0.1)
+        multi_window_service = MultiWindowSocialDistanceService(2, [10], violation_percentages)
+        services = {
+            configuration: SocialDistanceService(2, *configuration)
+            for configuration in multi_window_service.get_configurations()
+        }
+        for frame_index in range(10):
+            # The pair is too close in the frames 0, 1 and 2 only
+            distance = 1 if frame_index < 3 else 3
+            people_coordinates = PeopleCoordinates(np.array([1, 2]), np.array([[0, 0], [0, distance]]))
+            violation_pairs = multi_window_service.update_violation_pairs(frame_index, people_coordinates)
+            for configuration, service in services.items():
+                expected, _ = service.update_violation_pairs(frame_index, people_coordinates)
+                self.assertEqual(violation_pairs[configuration], expected, (frame_index, configuration))
+
+        self.assertEqual(services[(10, violation_percentages[2])].get_all_current_violation_pairs(9), set())
+        self.assertEqual(services[(10, violation_percentages[1])].get_all_current_violation_pairs(9), {(1, 2)})
+
+    def test_frames_in_increasing_order(self):
+        service = MultiWindowSocialDistanceService(2, [2], [0.5])
+        people_coordinates = PeopleCoordinates(np.array([1, 2]), np.array([[0, 0], [0, 1.5]]))
+        service.update_violation_pairs(3, people_coordinates)
+        with self.assertRaises(ValueError):
+            service.update_violation_pairs(3, people_coordinates)
+        with self.assertRaises(KeyError):
+            service.get_all_current_violation_pairs(2, 2, 0.5)
+        self.assertEqual(service.get_all_current_violation_pairs(3, 2, 0.5), {(1, 2)})
+
 
 if __name__ == '__main__':
     unittest.main()
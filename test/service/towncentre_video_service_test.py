@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 
@@ -5,17 +7,54 @@ from src.service.towncentre_video_service import TowncentreVideoService
 
 
 class TowncentreVideoServiceTest(unittest.TestCase):
-    @patch('csv.reader')
-    @patch('builtins.open', new_callable=MagicMock)
-    def test_load_groundtruth_dict(self, mock_open, mock_csv_reader):
-        mock_csv_reader.return_value = iter([
-            ["0", "0", "1", "1", "270.828", "794.098", "309.037", "834.066", "235.925", "770.142", "371.546",
-             "1101.029"]
-        ])
-        service = TowncentreVideoService()
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.groundtruth_file_path = os.path.join(self.temp_dir.name, 'groundtruth.top')
+        with open(self.groundtruth_file_path, 'w') as f:
+            f.write('0,0,1,1,270.828,794.098,309.037,834.066,235.925,770.142,371.546,1101.029\n')
+            f.write('1,1,1,1,1.0,2.0,3.0,4.0,10.0,20.0,30.0,40.0\n')
+            f.write('2,0,1,1,1.0,2.0,3.0,4.0,50.0,60.0,70.0,80.0\n')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_load_groundtruth_dict(self):
+        service = TowncentreVideoService(groundtruth_file_path=self.groundtruth_file_path)
         result = service.get_groundtruth_dict()
-        expected = {0: [(0, 235.925, 770.142, 371.546, 1101.029, (235.925 + 371.546) / 2, 1101.029, 0)]}
+        expected = {
+            0: [(0, 235.925, 770.142, 371.546, 1101.029, (235.925 + 371.546) / 2, 1101.029, 0, 1),
+                (2, 50.0, 60.0, 70.0, 80.0, 60.0, 80.0, 0, 1)],
+            1: [(1, 10.0, 20.0, 30.0, 40.0, 20.0, 40.0, 0, 1)]
+        }
         self.assertEqual(expected, result)
+        object_id, *box, class_id, confidence = result[0][0]
+        self.assertEqual((type(object_id), type(class_id), type(confidence)), (int, int, int))
+        self.assertEqual({type(value) for value in box}, {float})
+
+    def test_load_groundtruth_store(self):
+        service = TowncentreVideoService(groundtruth_file_path=self.groundtruth_file_path)
+        result = service.get_groundtruth_store()
+        self.assertEqual(result.keys(), [0, 1])
+        self.assertEqual(result[0][:, 0].tolist(), [0, 2])
+        self.assertEqual(result[1].tolist(), [[1, 10.0, 20.0, 30.0, 40.0, 20.0, 40.0, 0, 1]])
+
+    def test_groundtruth_cache(self):
+        service = TowncentreVideoService(groundtruth_file_path=self.groundtruth_file_path)
+        expected = service.get_groundtruth_dict()
+        self.assertTrue(os.path.exists(service.get_groundtruth_cache_file_path()))
+
+        with patch.object(TowncentreVideoService, 'parse_groundtruth_file') as mock_parse:
+            result = TowncentreVideoService(groundtruth_file_path=self.groundtruth_file_path).get_groundtruth_dict()
+            mock_parse.assert_not_called()
+        self.assertEqual(expected, result)
+
+    def test_groundtruth_cache_invalidated(self):
+        TowncentreVideoService(groundtruth_file_path=self.groundtruth_file_path).get_groundtruth_dict()
+        with open(self.groundtruth_file_path, 'a') as f:
+            f.write('3,2,1,1,1.0,2.0,3.0,4.0,1.0,2.0,3.0,4.0\n')
+
+        result = TowncentreVideoService(groundtruth_file_path=self.groundtruth_file_path).get_groundtruth_dict()
+        self.assertEqual(sorted(result.keys()), [0, 1, 2])
 
     @patch('builtins.open', new_callable=MagicMock)
     def test_load_camera_parameters(self, mock_open):
@@ -0,0 +1,90 @@
+import unittest
+
+import numpy as np
+
+from src.benchmark.crowd_generator import CAMERA_PARAMETERS
+from src.metrics.measure_social_distance_validator_with_dataset import get_violating_detections_dict
+from src.service.coordinates_converter import CoordinatesConverter
+from src.service.mot_metrics_service import MotMetricsService
+from src.service.social_distance_service import SocialDistanceService
+from src.service.violation_sweep_service import ViolationSweepService
+
+
+def generate_detections_dict(converter: CoordinatesConverter, people_count, frames_count, seed):
+    """
+    People walking randomly on a 10x10 meters square, some of them leave the frames
+    """
+    rng = np.random.default_rng(seed)
+    scene_points = rng.uniform(-5, 5, size=(people_count, 2))
+    detections_dict = {}
+    for frame_index in range(frames_count):
+        scene_points += rng.normal(0, 0.3, size=scene_points.shape)
+        visible = rng.random(people_count) > 0.1
+        image_points = converter.convert_coordinates_to_image_batch(
+            np.column_stack((scene_points, np.zeros(people_count)))
+        )
+        detections_dict[frame_index] = [
+            (float(object_id), x - 10, y - 40, x + 10, y, x, y, 0, 0.9)
+            for object_id, (x, y) in enumerate(image_points.tolist())
+            if visible[object_id]
+        ]
+    return detections_dict
+
+
+class ViolationSweepServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.converter = CoordinatesConverter(CAMERA_PARAMETERS)
+        self.true_detections_dict = generate_detections_dict(self.converter, 12, 30, seed=0)
+        self.pred_detections_dict = generate_detections_dict(self.converter, 12, 30, seed=1)
+        self.configurations = [(1, 0.5), (3, 0.0), (4, 0.7), (6, 1.0)]
+
+    def test_get_violating_detections_dicts(self):
+        sweep_service = ViolationSweepService(self.converter, distance_threshold=2, workers=1)
+        sweep_frames = sweep_service.prepare_frames(self.true_detections_dict)
+        violators_dicts = sweep_service.get_violating_detections_dicts(sweep_frames, [1, 3, 4, 6], [0.0, 0.5, 0.7, 1.0])
+
+        self.assertEqual(len(violators_dicts), 16)
+        for last_frames, violation_percentage in self.configurations:
+            expected = get_violating_detections_dict(
+                self.true_detections_dict,
+                SocialDistanceService(2, last_frames, violation_percentage),
+                self.converter
+            )
+            actual = violators_dicts[(last_frames, violation_percentage)]
+            self.assertEqual(expected, actual, (last_frames, violation_percentage))
+
+    def test_sweep(self):
+        sweep_service = ViolationSweepService(self.converter, distance_threshold=2, workers=1)
+        actual = sweep_service.sweep(self.true_detections_dict, self.pred_detections_dict, [1, 4], [0.5, 0.9])
+
+        self.assertEqual([row[:2] for row in actual], [[1, 0.5], [1, 0.9], [4, 0.5], [4, 0.9]])
+        for last_frames, violation_percentage, mota, motp in actual:
+            true_violators_dict = get_violating_detections_dict(
+                self.true_detections_dict, SocialDistanceService(2, last_frames, violation_percentage), self.converter
+            )
+            pred_violators_dict = get_violating_detections_dict(
+                self.pred_detections_dict, SocialDistanceService(2, last_frames, violation_percentage), self.converter
+            )
+            expected_mota, expected_motp = MotMetricsService(
+                groundtruth_dict=true_violators_dict, predictions_dict=pred_violators_dict
+            ).calculate_mot_metrics()
+            np.testing.assert_equal([mota, motp], [expected_mota, expected_motp])
+
+    def test_sweep_in_worker_processes(self):
+        serial = ViolationSweepService(self.converter, workers=1).sweep(
+            self.true_detections_dict, self.pred_detections_dict, [2, 5], [0.6]
+        )
+        parallel = ViolationSweepService(self.converter, workers=2).sweep(
+            self.true_detections_dict, self.pred_detections_dict, [2, 5], [0.6]
+        )
+        np.testing.assert_equal(parallel, serial)
+
+    def test_sparse(self):
+        dense_frames = ViolationSweepService(self.converter).prepare_frames(self.true_detections_dict)
+        sparse_frames = ViolationSweepService(self.converter, sparse=True).prepare_frames(self.true_detections_dict)
+        for dense_frame, sparse_frame in zip(dense_frames, sparse_frames):
+            self.assertEqual(sorted(dense_frame.close_pairs), sorted(sparse_frame.close_pairs))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, mock_open
 
@@ -35,6 +37,39 @@ class DetectionUtilsTest(unittest.TestCase):
         actual = self.detectionUtils.convert_detections_from_row_to_sv(self.row_detections)
         self.assertEqual(actual.xyxy.tolist(), expected.xyxy.tolist())
         self.assertEqual(actual.tracker_id.tolist(), expected.tracker_id.tolist())
+        self.assertEqual(actual.confidence.tolist(), expected.confidence.tolist())
+        self.assertEqual(actual.class_id.tolist(), expected.class_id.tolist())
+
+    def test_convert_detections_from_row_to_sv_empty(self):
+        actual = self.detectionUtils.convert_detections_from_row_to_sv([])
+        self.assertEqual(actual.xyxy.shape, (0, 4))
+        self.assertEqual(len(actual.tracker_id), 0)
+
+    def test_convert_detections_from_sv_to_array(self):
+        expected = np.array(self.row_detections)
+        actual = self.detectionUtils.convert_detections_from_sv_to_array(self.sv_detections)
+        np.testing.assert_array_equal(actual, expected)
+
+    def test_convert_detections_from_array_to_sv(self):
+        detections = np.array(self.row_detections)
+        actual = self.detectionUtils.convert_detections_from_array_to_sv(detections)
+        self.assertEqual(actual.xyxy.tolist(), self.sv_detections.xyxy.tolist())
+        self.assertEqual(actual.confidence.tolist(), self.sv_detections.confidence.tolist())
+        self.assertEqual(actual.tracker_id.tolist(), self.sv_detections.tracker_id.tolist())
+        self.assertTrue(np.shares_memory(actual.xyxy, detections))
+
+    def test_filter_detections_by_tracker_ids(self):
+        actual = self.detectionUtils.filter_detections_by_tracker_ids(self.sv_detections, {2, 3})
+        self.assertEqual(actual.tracker_id.tolist(), [2])
+        self.assertEqual(actual.xyxy.tolist(), [[5, 6, 7, 8]])
+        self.assertEqual(len(self.detectionUtils.filter_detections_by_tracker_ids(self.sv_detections, set())), 0)
+
+    def test_filter_detections_array_by_tracker_ids(self):
+        detections = np.array(self.row_detections)
+        actual = self.detectionUtils.filter_detections_array_by_tracker_ids(detections, {1.0})
+        np.testing.assert_array_equal(actual, detections[:1])
+        actual = self.detectionUtils.filter_detections_array_by_tracker_ids(detections, np.array([2]))
+        np.testing.assert_array_equal(actual, detections[1:])
 
     @patch('builtins.open', new_callable=mock_open,
            read_data="frame_index,tracker_id,x1,y1,x2,y2,bdcx,bdcy,class_id,confidence\n5,19,6.0,7.0,8.0,9.0,3.0,2.0,0.0,0.9\n")
@@ -51,6 +86,32 @@ class DetectionUtilsTest(unittest.TestCase):
         mock_file().write.assert_any_call("frame_index,tracker_id,x1,y1,x2,y2,bdcx,bdcy,class_id,confidence\n")
         mock_file().write.assert_any_call("5,19,6.0,7.0,8.0,9.0,3.0,2.0,0,0.9\n")
 
+    def test_write_float32_detections_round_trip(self):
+        sv_detections = sv.Detections(
+            xyxy=np.array([[123.456, 10.5, 200.1, 300.7]], dtype=np.float32),
+            tracker_id=np.array([3]),
+            class_id=np.array([0]),
+            confidence=np.array([0.87], dtype=np.float32),
+        )
+        rows = DetectionUtils.convert_detections_from_sv_to_row(sv_detections)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, 'predictions.csv')
+            DetectionUtils.write_predictions_dict({7: rows}, file_path)
+            with open(file_path) as f:
+                text = f.read()
+            read_rows = DetectionUtils.read_predictions_dict(file_path)[7]
+
+        # The float32 values are written as short as they print, the bottom center is their mean in float64
+        self.assertEqual(text.splitlines()[1], '7,3,123.456,10.5,200.1,300.7,161.7779998779297,300.7,0,0.87')
+        np.testing.assert_array_equal(np.array(read_rows, dtype=np.float32), np.array(rows, dtype=np.float32))
+
+    def test_calculate_iou_matrix(self):
+        boxes1 = np.array([[0, 0, 10, 10], [20, 20, 30, 30]])
+        boxes2 = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [100, 100, 110, 110]])
+        expected = np.array([[1, 1 / 3, 0], [0, 0, 0]])
+        np.testing.assert_allclose(DetectionUtils.calculate_iou_matrix(boxes1, boxes2), expected)
+        self.assertEqual(DetectionUtils.calculate_iou_matrix(boxes1, np.empty((0, 4))).shape, (2, 0))
+
 
 if __name__ == '__main__':
     unittest.main()
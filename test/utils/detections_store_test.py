@@ -0,0 +1,139 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.utils.detection_utils import DetectionUtils
+from src.utils.detections_store import DetectionsStore
+
+
+class DetectionsStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.detections_dict = {
+            5: [(19, 6.0, 7.0, 8.0, 9.0, 7.0, 9.0, 0, 0.9), (20, 1.5, 2.0, 3.5, 4.0, 2.5, 4.0, 0, 0.75)],
+            2: [(3, 10.0, 11.0, 12.0, 13.0, 11.0, 13.0, 0, 0.5)],
+            7: [],
+        }
+        self.store = DetectionsStore.from_dict(self.detections_dict)
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_from_dict(self):
+        self.assertEqual(self.store.frame_indices.tolist(), [2, 5, 7])
+        self.assertEqual(self.store.frame_offsets.tolist(), [0, 1, 3, 3])
+        self.assertEqual(self.store.detections.shape, (3, 9))
+        self.assertEqual(len(self.store), 3)
+
+    def test_getitem(self):
+        self.assertEqual(self.store[5].tolist(), [list(row) for row in self.detections_dict[5]])
+        self.assertEqual(self.store[7].shape, (0, 9))
+        self.assertIn(2, self.store)
+        self.assertNotIn(3, self.store)
+        with self.assertRaises(KeyError):
+            _ = self.store[3]
+
+    def test_to_dict(self):
+        self.assertEqual(self.store.to_dict(), self.detections_dict)
+
+    def test_to_dict_with_int_columns(self):
+        result = self.store.to_dict(int_columns=('tracker_id', 'class_id'))
+        self.assertEqual(result, self.detections_dict)
+        self.assertEqual([type(value) for value in result[2][0]], [int] + [float] * 6 + [int, float])
+        self.assertEqual(DetectionsStore.from_dict({}).to_dict(int_columns=('tracker_id',)), {})
+
+    def test_save_and_load(self):
+        file_path = os.path.join(self.temp_dir.name, 'predictions.npz')
+        self.store.save(file_path)
+
+        loaded = DetectionsStore.load(file_path)
+
+        np.testing.assert_array_equal(loaded.frame_indices, self.store.frame_indices)
+        np.testing.assert_array_equal(loaded.frame_offsets, self.store.frame_offsets)
+        np.testing.assert_array_equal(loaded.detections, self.store.detections)
+
+    def test_load_with_mmap(self):
+        file_path = os.path.join(self.temp_dir.name, 'predictions.npz')
+        self.store.save(file_path)
+
+        loaded = DetectionsStore.load(file_path, mmap=True)
+
+        self.assertIsInstance(loaded.detections, np.memmap)
+        self.assertEqual(loaded.to_dict(), self.detections_dict)
+        self.assertTrue(np.shares_memory(loaded[5], loaded.detections))
+        self.assertEqual(loaded[7].shape, (0, 9))
+        del loaded
+
+    def test_load_with_mmap_empty(self):
+        file_path = os.path.join(self.temp_dir.name, 'predictions.npz')
+        DetectionsStore.from_dict({}).save(file_path)
+
+        loaded = DetectionsStore.load(file_path, mmap=True)
+
+        self.assertEqual(len(loaded), 0)
+        self.assertEqual(loaded.to_dict(), {})
+
+    def test_get_sv_detections(self):
+        sv_detections = self.store.get_sv_detections(5)
+        self.assertEqual(sv_detections.xyxy.tolist(), [[6, 7, 8, 9], [1.5, 2, 3.5, 4]])
+        self.assertEqual(sv_detections.tracker_id.tolist(), [19, 20])
+        self.assertEqual(sv_detections.confidence.tolist(), [0.9, 0.75])
+        self.assertEqual(sv_detections.class_id.tolist(), [0, 0])
+
+    def test_csv_round_trip(self):
+        csv_path = os.path.join(self.temp_dir.name, 'predictions.top')
+        DetectionUtils.write_predictions_dict(self.detections_dict, csv_path)
+
+        store = DetectionsStore.read_csv(csv_path)
+        # Frames without detections are not written to the CSV file
+        self.assertEqual(store.to_dict(), {key: value for key, value in self.detections_dict.items() if value})
+
+        store.write_csv(csv_path)
+        self.assertEqual(DetectionUtils.read_predictions_dict(csv_path), store.to_dict())
+
+    def test_read_csv_with_wrong_structure(self):
+        csv_path = os.path.join(self.temp_dir.name, 'predictions.top')
+        with open(csv_path, 'w') as f:
+            f.write('frame,id\n1,2\n')
+        with self.assertRaises(ValueError):
+            DetectionsStore.read_csv(csv_path)
+
+    def test_convert_csv(self):
+        csv_path = os.path.join(self.temp_dir.name, 'predictions.top')
+        npz_path = os.path.join(self.temp_dir.name, 'predictions.npz')
+        detections_dict = {**self.detections_dict, 9: [(4, 1.0, 2.0, 3.0, 4.0, 2.0, 4.0, 0, 0.6)] * 3}
+        DetectionUtils.write_predictions_dict(dict(sorted(detections_dict.items())), csv_path)
+
+        # The chunks of 2 rows split the frames 5 and 9
+        DetectionsStore.convert_csv(csv_path, npz_path, chunk_rows=2)
+        store = DetectionsStore.load(npz_path)
+        expected_store = DetectionsStore.read_csv(csv_path)
+        np.testing.assert_array_equal(store.frame_indices, expected_store.frame_indices)
+        np.testing.assert_array_equal(store.frame_offsets, expected_store.frame_offsets)
+        np.testing.assert_array_equal(store.detections, expected_store.detections)
+        self.assertEqual(os.listdir(self.temp_dir.name).count('predictions.npz.rows.tmp'), 0)
+
+    def test_convert_csv_empty(self):
+        csv_path = os.path.join(self.temp_dir.name, 'predictions.top')
+        npz_path = os.path.join(self.temp_dir.name, 'predictions.npz')
+        DetectionUtils.write_predictions_dict({}, csv_path)
+
+        DetectionsStore.convert_csv(csv_path, npz_path)
+        store = DetectionsStore.load(npz_path)
+        self.assertEqual(len(store), 0)
+        self.assertEqual(store.detections.shape, (0, 9))
+
+    def test_convert_csv_with_unordered_frames(self):
+        csv_path = os.path.join(self.temp_dir.name, 'predictions.top')
+        npz_path = os.path.join(self.temp_dir.name, 'predictions.npz')
+        DetectionUtils.write_predictions_dict(self.detections_dict, csv_path)
+
+        with self.assertRaises(ValueError):
+            DetectionsStore.convert_csv(csv_path, npz_path, chunk_rows=2)
+        self.assertEqual(os.listdir(self.temp_dir.name), ['predictions.top'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import csv
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from src.utils.instrumentation import Instrumentation
+
+
+class InstrumentationTest(unittest.TestCase):
+    def setUp(self):
+        self.instrumentation = Instrumentation(enabled=True, window_size=2)
+
+    def record_frame(self, frame_index, people):
+        with self.instrumentation.stage('detect'):
+            time.sleep(0.002)
+        self.instrumentation.count('people', people)
+        self.instrumentation.end_frame(frame_index)
+
+    def test_summary(self):
+        for frame_index, people in enumerate([1, 2, 4]):
+            self.record_frame(frame_index, people)
+
+        summary = self.instrumentation.get_summary()
+        self.assertEqual(summary['frames'], 2)
+        self.assertEqual(summary['total_frames'], 3)
+        self.assertEqual(summary['counters']['people'], {'mean': 3.0, 'max': 4, 'total': 7})
+        self.assertGreaterEqual(summary['stages']['detect']['p50'], 2.0)
+        self.assertLessEqual(summary['stages']['detect']['share'], 1.0)
+        self.assertGreater(summary['fps'], 0)
+        self.assertIn('detect', Instrumentation.format_summary(summary))
+
+    def test_stage_times_are_added_up_within_frame(self):
+        self.instrumentation.add_time('detect', 0.1)
+        self.instrumentation.add_time('detect', 0.2)
+        self.instrumentation.end_frame(0)
+        self.assertAlmostEqual(self.instrumentation.get_summary()['stages']['detect']['mean'], 300.0)
+
+    def test_iterate(self):
+        items = list(self.instrumentation.iterate('decode', [1, 2]))
+        self.instrumentation.end_frame(0)
+        self.assertEqual(items, [1, 2])
+        self.assertIn('decode', self.instrumentation.get_summary()['stages'])
+
+    def test_export_trace(self):
+        self.record_frame(0, 1)
+        self.instrumentation.count('violations', 1)
+        self.instrumentation.end_frame(1)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            csv_path = os.path.join(temp_dir, 'trace.csv')
+            json_path = os.path.join(temp_dir, 'trace.json')
+            self.instrumentation.export_trace(csv_path)
+            self.instrumentation.export_trace(json_path)
+
+            with open(csv_path, newline='') as f:
+                csv_rows = list(csv.DictReader(f))
+            with open(json_path) as f:
+                json_rows = json.load(f)
+
+        self.assertEqual(list(csv_rows[0].keys()), ['frame_index', 'frame_ms', 'detect_ms', 'people', 'violations'])
+        self.assertEqual([row['violations'] for row in csv_rows], ['0', '1'])
+        self.assertEqual([row['frame_index'] for row in json_rows], [0, 1])
+        self.assertEqual(json_rows[1]['detect_ms'], 0.0)
+
+    def test_disabled(self):
+        instrumentation = Instrumentation()
+        items = [1, 2]
+        self.assertIs(instrumentation.iterate('decode', items), items)
+        with instrumentation.stage('detect'):
+            pass
+        instrumentation.count('people', 3)
+        instrumentation.end_frame(0)
+
+        summary = instrumentation.get_summary()
+        self.assertEqual(summary['total_frames'], 0)
+        self.assertEqual(summary['stages'], {})
+        self.assertEqual(summary['counters'], {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import urllib.error
+import urllib.request
+
+from src.utils.instrumentation import Instrumentation
+from src.utils.metrics_exporter import MetricsExporter, CONTENT_TYPE
+
+
+class MetricsExporterTest(unittest.TestCase):
+    def setUp(self):
+        self.exporter = MetricsExporter(port=0, latency_buckets=(0.01, 0.1))
+
+    def tearDown(self):
+        self.exporter.stop()
+
+    def test_render(self):
+        self.exporter.observe_frame(0, {'detect': 0.005}, {'tracks': 3, 'violations': 0})
+        self.exporter.observe_frame(1, {'detect': 0.05, 'track': 0.001}, {'tracks': 4, 'violations': 2})
+        lines = self.exporter.render().splitlines()
+
+        self.assertIn('cvsdc_frames_total 2', lines)
+        self.assertIn('cvsdc_last_frame_index 1', lines)
+        self.assertIn('# TYPE cvsdc_stage_latency_seconds histogram', lines)
+        self.assertIn('cvsdc_stage_latency_seconds_bucket{stage="detect",le="0.01"} 1', lines)
+        self.assertIn('cvsdc_stage_latency_seconds_bucket{stage="detect",le="0.1"} 2', lines)
+        self.assertIn('cvsdc_stage_latency_seconds_bucket{stage="detect",le="+Inf"} 2', lines)
+        self.assertIn('cvsdc_stage_latency_seconds_count{stage="track"} 1', lines)
+        self.assertIn('cvsdc_tracks 4', lines)
+        self.assertIn('cvsdc_tracks_total 7', lines)
+        self.assertIn('cvsdc_violations 2', lines)
+        self.assertIn('cvsdc_violation_rate 0.5', lines)
+
+    def test_missing_counter_is_zero_in_latest_frame(self):
+        self.exporter.observe_frame(0, {}, {'people': 3})
+        self.exporter.observe_frame(1, {}, {})
+        lines = self.exporter.render().splitlines()
+        self.assertIn('cvsdc_people 0', lines)
+        self.assertIn('cvsdc_people_total 3', lines)
+
+    def test_serve_over_http(self):
+        instrumentation = Instrumentation(enabled=True)
+        instrumentation.add_listener(self.exporter.observe_frame)
+        with instrumentation.stage('detect'):
+            instrumentation.count('tracks', 5)
+        instrumentation.end_frame(0)
+
+        port = self.exporter.start()
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=5) as response:
+            self.assertEqual(response.status, 200)
+            self.assertEqual(response.headers['Content-Type'], CONTENT_TYPE)
+            body = response.read().decode('utf-8')
+        self.assertIn('cvsdc_tracks 5', body.splitlines())
+        self.assertIn('cvsdc_stage_latency_seconds_count{stage="detect"} 1', body.splitlines())
+
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/other', timeout=5)
+        self.assertEqual(context.exception.code, 404)
+
+    def test_stop(self):
+        port = self.exporter.start()
+        with self.assertRaises(RuntimeError):
+            self.exporter.start()
+        self.exporter.stop()
+        with self.assertRaises(urllib.error.URLError):
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
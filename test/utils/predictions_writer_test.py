@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+
+from src.utils.detection_utils import DetectionUtils, FILE_STRUCTURE
+from src.utils.predictions_writer import PredictionsWriter
+
+
+class PredictionsWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, 'predictions.csv')
+        self.detections_dict = {
+            0: [(1, 1.0, 2.0, 3.0, 4.0, 2.0, 4.0, 0, 0.5)],
+            1: [(1, 1.5, 2.0, 3.5, 4.0, 2.5, 4.0, 0, 0.6), (2, 6.0, 7.0, 8.0, 9.0, 7.0, 9.0, 0, 0.9)],
+            2: [(2, 6.5, 7.0, 8.5, 9.0, 7.5, 9.0, 0, 0.8), (3, 10.0, 11.0, 12.0, 13.0, 11.0, 13.0, 0, 0.7)],
+        }
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_write_readable_by_read_predictions_dict(self):
+        with PredictionsWriter(self.file_path, chunk_size=2) as writer:
+            for frame_index, detections in self.detections_dict.items():
+                writer.write(frame_index, detections)
+
+        self.assertEqual(DetectionUtils.read_predictions_dict(self.file_path), self.detections_dict)
+
+    def test_flush_in_chunks(self):
+        writer = PredictionsWriter(self.file_path, chunk_size=2)
+        writer.write(0, self.detections_dict[0])
+        self.assertIsNone(writer.last_flushed_frame_index)
+        self.assertEqual(DetectionUtils.read_predictions_dict(self.file_path), {})
+
+        writer.write(1, self.detections_dict[1])
+        self.assertEqual(writer.last_flushed_frame_index, 1)
+        self.assertEqual(DetectionUtils.read_predictions_dict(self.file_path), {
+            0: self.detections_dict[0], 1: self.detections_dict[1]
+        })
+        writer.close()
+
+    def test_resume(self):
+        with PredictionsWriter(self.file_path, chunk_size=1) as writer:
+            for frame_index, detections in self.detections_dict.items():
+                writer.write(frame_index, detections)
+        # An interrupted write of the next frame
+        with open(self.file_path, 'a') as f:
+            f.write('3,3,10.5,11.0,12')
+
+        writer = PredictionsWriter(self.file_path, resume=True)
+        # The last complete frame may be incomplete as well, it is dropped and tracked again
+        self.assertEqual(writer.start_frame_index, 2)
+        self.assertEqual(writer.last_flushed_frame_index, 1)
+        self.assertEqual(writer.tracker_id_offset, 2)
+
+        writer.write(2, [(1, 6.5, 7.0, 8.5, 9.0, 7.5, 9.0, 0, 0.8)])
+        writer.close()
+
+        self.assertEqual(DetectionUtils.read_predictions_dict(self.file_path), {
+            0: self.detections_dict[0],
+            1: self.detections_dict[1],
+            2: [(3, 6.5, 7.0, 8.5, 9.0, 7.5, 9.0, 0, 0.8)],
+        })
+
+    def test_resume_without_file(self):
+        with PredictionsWriter(self.file_path, resume=True) as writer:
+            self.assertEqual(writer.start_frame_index, 0)
+            self.assertEqual(writer.tracker_id_offset, 0)
+
+        with open(self.file_path) as f:
+            self.assertEqual(f.read(), FILE_STRUCTURE + '\n')
+
+    def test_resume_unexpected_file_structure(self):
+        with open(self.file_path, 'w') as f:
+            f.write('a,b,c\n')
+
+        with self.assertRaises(ValueError):
+            PredictionsWriter(self.file_path, resume=True)
+
+
+if __name__ == '__main__':
+    unittest.main()